@@ -5,10 +5,94 @@
 
 import re
 import anthropic
-from typing import List, Optional, Dict, Any, Union
+from contextvars import ContextVar
+from typing import List, Optional, Dict, Any, Union, Iterator, Iterable, Callable, Generator, Tuple
 from config import config
 from llm_router import llm_router
 
+# 当前查询的上一次生成是否失败（返回的是致歉文本），按线程/任务隔离
+_generation_failed: ContextVar[bool] = ContextVar("generation_failed", default=False)
+
+
+class _ThinkingStreamFilter:
+    """流式过滤<thinking>...</thinking>内容，标签可能被拆分到多个片段中"""
+    
+    OPEN_TAG = "<thinking>"
+    CLOSE_TAG = "</thinking>"
+    
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+    
+    def feed(self, text: str) -> str:
+        """输入一个片段，返回可以立即输出的文本"""
+        self._buffer += text
+        output = []
+        
+        # 处理缓冲区中所有完整的标签
+        while True:
+            tag = self.CLOSE_TAG if self._inside else self.OPEN_TAG
+            pos = self._buffer.find(tag)
+            if pos == -1:
+                break
+            if not self._inside:
+                output.append(self._buffer[:pos])
+            self._buffer = self._buffer[pos + len(tag):]
+            self._inside = not self._inside
+        
+        # 保留可能是标签前缀的结尾部分，等待下一个片段
+        tag = self.CLOSE_TAG if self._inside else self.OPEN_TAG
+        keep = 0
+        for n in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+            if self._buffer.endswith(tag[:n]):
+                keep = n
+                break
+        
+        ready = self._buffer[:len(self._buffer) - keep]
+        self._buffer = self._buffer[len(self._buffer) - keep:]
+        if not self._inside:
+            output.append(ready)
+        return "".join(output)
+    
+    def flush(self) -> str:
+        """流结束时输出剩余文本"""
+        rest = "" if self._inside else self._buffer
+        self._buffer = ""
+        return rest
+
+
+class _ReasoningStreamFilter:
+    """
+    流式扣留DeepSeek-R1未加标签的思考内容
+    
+    在清理规则确定答案开始位置之前不输出任何文本，之后原样透传；
+    完整答案仍以done事件中清理后的文本为准
+    """
+    
+    def __init__(self, find_answer_start: Callable[[str], int]):
+        self._find_answer_start = find_answer_start
+        self._buffer = ""
+        self._started = False
+    
+    def feed(self, text: str) -> str:
+        """输入一个片段，返回可以立即输出的文本"""
+        if self._started:
+            return text
+        self._buffer += text
+        start = self._find_answer_start(self._buffer)
+        if start == -1:
+            return ""
+        self._started = True
+        ready = self._buffer[start:].lstrip()
+        self._buffer = ""
+        return ready
+    
+    def flush(self) -> str:
+        """流结束时返回仍被扣留的文本（未找到答案开始位置时为全部文本）"""
+        rest = self._buffer
+        self._buffer = ""
+        return rest
+
 
 class AIGenerator:
     """统一的AI生成器 - 支持Claude和DeepSeek双模型路由"""
@@ -35,6 +119,39 @@ All responses must be:
 5. **Example-supported** - Include relevant examples from the course materials
 """
     
+    # 单轮模式系统提示：检索已在本地完成，上下文随问题一起提供
+    CONTEXT_SYSTEM_PROMPT = """You are an AI assistant specialized in course materials and educational content. Relevant excerpts from the course materials have already been retrieved for each question and are provided together with it.
+
+Response Requirements:
+- **Always base answers on the provided course material excerpts**
+- **No meta-commentary** - no reasoning process, search explanations, or "based on the excerpts" phrases
+- If the excerpts contain no relevant information, state clearly that the topic is not covered in the course materials
+
+All responses must be:
+1. **Source-based** - Derived from the provided course materials
+2. **Brief and focused** - Get to the point quickly
+3. **Educational** - Maintain instructional value
+4. **Clear** - Use accessible language
+5. **Example-supported** - Include relevant examples from the course materials
+"""
+    
+    # DeepSeek-R1答案的开始标记（通常在思考后有明确的转折），按优先级排列
+    # 注意：移除了 "\n\n1." 避免误删编号列表前的答案内容
+    ANSWER_MARKERS = [
+        "\n\nThe available course materials",
+        "\n\nBased on the course materials",
+        "\n\nFrom the course content",
+        "\n\nAccording to the materials",
+        "\n\nThe course covers",
+        "\n\n**",  # 粗体标题开始
+        "\n\n###",  # Markdown标题
+        "\n\n##",
+        "\n\nIn the context of",
+        "\n\nTo answer your question",
+        "\n\nHere's",  # 常见答案开始
+        "\n\nRAG",  # 直接定义开始
+    ]
+    
     def __init__(self, api_key: str = None, model: str = None):
         """
         初始化AI生成器
@@ -48,12 +165,16 @@ All responses must be:
         if self.provider == "deepseek":
             # 使用路由器，不需要直接初始化客户端
             self.client = None
+            self.async_client = None
             self.model = None
         else:
             # Claude提供商
             self.client = anthropic.Anthropic(
                 api_key=api_key or config.ANTHROPIC_API_KEY
             )
+            self.async_client = anthropic.AsyncAnthropic(
+                api_key=api_key or config.ANTHROPIC_API_KEY
+            )
             self.model = model or config.ANTHROPIC_MODEL
         
         # 预构建基础参数
@@ -66,7 +187,8 @@ All responses must be:
                          query: str,
                          conversation_history: Optional[str] = None,
                          tools: Optional[List] = None,
-                         tool_manager=None) -> str:
+                         tool_manager=None,
+                         speculative_query: Optional[str] = None) -> str:
         """
         生成AI响应，支持工具使用和对话上下文
         
@@ -75,38 +197,377 @@ All responses must be:
             conversation_history: 对话历史（可选）
             tools: 可用工具列表
             tool_manager: 工具管理器
+            speculative_query: 原始用户问题，提供时在工具选择调用期间并行执行推测性检索
             
         Returns:
             生成的响应字符串
         """
+        session = self._start_speculation(speculative_query, tools, tool_manager)
+        if session:
+            tool_manager = session
+        
+        try:
+            return self._generate(self._response_flow(query, conversation_history, tools, tool_manager))
+        finally:
+            if session:
+                session.finish()
+    
+    async def agenerate_response(self, 
+                                 query: str,
+                                 conversation_history: Optional[str] = None,
+                                 tools: Optional[List] = None,
+                                 tool_manager=None,
+                                 speculative_query: Optional[str] = None) -> str:
+        """
+        生成AI响应（异步版本），LLM调用使用异步客户端，工具执行在查询线程池中进行
+        
+        参数与返回值同generate_response
+        """
+        session = self._start_speculation(speculative_query, tools, tool_manager)
+        if session:
+            tool_manager = session
+        
+        try:
+            return await self._agenerate(self._response_flow(query, conversation_history, tools, tool_manager))
+        finally:
+            if session:
+                session.finish()
+    
+    def generate_response_stream(self, 
+                                 query: str,
+                                 conversation_history: Optional[str] = None,
+                                 tools: Optional[List] = None,
+                                 tool_manager=None,
+                                 speculative_query: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        流式生成AI响应：工具调用轮次不变，最终答案轮次流式输出
+        
+        参数同generate_response
+        
+        Yields:
+            事件字典：
+            - {"type": "tool_result"}: 工具执行完成，来源已可获取
+            - {"type": "token", "text": ...}: 答案文本片段
+            - {"type": "done", "answer": ..., "failed": ...}: 清理后的完整答案，failed表示生成失败
+        """
+        session = self._start_speculation(speculative_query, tools, tool_manager)
+        if session:
+            tool_manager = session
+        
+        try:
+            yield from self._generate_stream(self._response_flow(query, conversation_history, tools, tool_manager))
+        finally:
+            if session:
+                session.finish()
+    
+    def _start_speculation(self, speculative_query: Optional[str], tools: Optional[List], tool_manager):
+        """在工具选择调用之前启动推测性检索，返回包装后的工具管理器"""
+        if speculative_query and tools and hasattr(tool_manager, 'start_speculation'):
+            return tool_manager.start_speculation(speculative_query)
+        return None
+    
+    def generate_with_context(self, 
+                              query: str,
+                              context: str,
+                              conversation_history: Optional[str] = None) -> str:
+        """
+        基于已检索的上下文单轮生成响应，跳过工具选择的LLM调用
+        
+        Args:
+            query: 用户的问题或请求
+            context: 本地检索得到的课程内容
+            conversation_history: 对话历史（可选）
+            
+        Returns:
+            生成的响应字符串
+        """
+        return self._generate(self._context_flow(query, context, conversation_history))
+    
+    async def agenerate_with_context(self, 
+                                     query: str,
+                                     context: str,
+                                     conversation_history: Optional[str] = None) -> str:
+        """基于已检索的上下文单轮生成响应（异步版本）"""
+        return await self._agenerate(self._context_flow(query, context, conversation_history))
+    
+    def generate_with_context_stream(self, 
+                                     query: str,
+                                     context: str,
+                                     conversation_history: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        基于已检索的上下文单轮流式生成响应
+        
+        Yields:
+            与generate_response_stream相同的token/done事件
+        """
+        yield from self._generate_stream(self._context_flow(query, context, conversation_history))
+    
+    def _build_context_query(self, query: str, context: str) -> str:
+        """将用户问题与检索到的课程内容组合为单条消息"""
+        return f"{query}\n\nCourse material excerpts:\n{context}"
+    
+    def _response_flow(self, 
+                       query: str,
+                       conversation_history: Optional[str] = None,
+                       tools: Optional[List] = None,
+                       tool_manager=None,
+                       system_prompt: Optional[str] = None) -> Generator[tuple, Any, tuple]:
+        """
+        生成流程的唯一实现，由同步、异步和流式驱动器共同执行
+        
+        以生成器形式逐步产出需要执行的步骤，驱动器执行后将结果发送回来：
+        - ("tool_call", messages, openai_tools): DeepSeek强制工具调用轮次，返回响应对象
+        - ("claude", params): Claude消息调用，返回响应对象
+        - ("run_tools", tool_manager, func, *args): 执行工具（异步驱动器在查询线程池中执行）
+        
+        Returns:
+            最终答案轮次的请求，由驱动器以普通或流式方式执行：
+            ("chat", messages)、("claude", params)，或已得到最终文本时的("text", answer)
+        """
         if self.provider == "deepseek":
-            return self._generate_deepseek_response(
-                query, conversation_history, tools, tool_manager
+            messages = self._build_openai_messages(query, conversation_history, system_prompt)
+            openai_tools = self._prepare_openai_tools(tools)
+            if not openai_tools:
+                return ("chat", messages)
+            
+            response = yield ("tool_call", messages, openai_tools)
+            if self._has_openai_tool_calls(response) and tool_manager:
+                yield ("run_tools", tool_manager, self._execute_openai_tool_calls, response, messages, tool_manager)
+                return ("chat", messages)
+            
+            content = yield ("run_tools", tool_manager, self._handle_missing_tool_call,
+                             response, query, messages, openai_tools, tool_manager)
+            return ("text", self._clean_thinking_content(content))
+        
+        api_params = self._build_claude_params(query, conversation_history, tools, system_prompt)
+        if not (tools and tool_manager):
+            return ("claude", api_params)
+        
+        # 工具选择轮次，工具执行后再获取最终答案
+        response = yield ("claude", api_params)
+        if response.stop_reason != "tool_use":
+            return ("text", response.content[0].text)
+        final_params = yield ("run_tools", tool_manager, self._execute_claude_tool_calls,
+                              response, api_params, tool_manager)
+        return ("claude", final_params)
+    
+    def _context_flow(self, query: str, context: str, conversation_history: Optional[str]):
+        """单轮模式的生成流程：没有工具步骤，直接生成答案"""
+        return self._response_flow(
+            self._build_context_query(query, context),
+            conversation_history,
+            system_prompt=self.CONTEXT_SYSTEM_PROMPT
+        )
+    
+    def _run_step(self, step: tuple) -> Any:
+        """同步执行生成流程中的一个步骤或最终答案请求"""
+        kind = step[0]
+        if kind == "tool_call":
+            return llm_router.call_with_tools(
+                messages=step[1],
+                tools=step[2],
+                tool_choice="required",  # 强制使用工具
+                **self.base_params
             )
-        else:
-            return self._generate_claude_response(
-                query, conversation_history, tools, tool_manager
+        if kind == "chat":
+            return llm_router.call_simple_chat(messages=step[1], **self.base_params)
+        if kind == "claude":
+            return self.client.messages.create(**step[1])
+        if kind == "run_tools":
+            _, _, func, *args = step
+            return func(*args)
+        raise ValueError(f"Unknown generation step: {kind}")
+    
+    async def _arun_step(self, step: tuple) -> Any:
+        """异步执行生成流程中的一个步骤或最终答案请求"""
+        kind = step[0]
+        if kind == "tool_call":
+            return await llm_router.acall_with_tools(
+                messages=step[1],
+                tools=step[2],
+                tool_choice="required",  # 强制使用工具
+                **self.base_params
             )
+        if kind == "chat":
+            return await llm_router.acall_simple_chat(messages=step[1], **self.base_params)
+        if kind == "claude":
+            return await self.async_client.messages.create(**step[1])
+        if kind == "run_tools":
+            _, tool_manager, func, *args = step
+            if tool_manager is not None:
+                # 阻塞的检索在查询线程池中执行，来源随结果带回当前上下文
+                return await tool_manager.run_with_sources(func, *args)
+            return func(*args)
+        raise ValueError(f"Unknown generation step: {kind}")
+    
+    def _run_flow(self, flow: Generator) -> Tuple[tuple, int]:
+        """同步执行生成流程中的全部步骤，返回(最终答案请求, 已执行步骤数)"""
+        steps = 0
+        try:
+            step = next(flow)
+            while True:
+                result = self._run_step(step)
+                steps += 1
+                step = flow.send(result)
+        except StopIteration as stop:
+            return stop.value, steps
+    
+    async def _arun_flow(self, flow: Generator) -> Tuple[tuple, int]:
+        """异步执行生成流程中的全部步骤，返回(最终答案请求, 已执行步骤数)"""
+        steps = 0
+        try:
+            step = next(flow)
+            while True:
+                result = await self._arun_step(step)
+                steps += 1
+                step = flow.send(result)
+        except StopIteration as stop:
+            return stop.value, steps
+    
+    def _answer_text(self, request: tuple, result: Any) -> str:
+        """从最终答案请求的调用结果中取出答案文本"""
+        if request[0] == "chat":
+            return self._clean_thinking_content(result)
+        return result.content[0].text
+    
+    def last_generation_failed(self) -> bool:
+        """当前线程/任务上一次生成是否失败，失败时返回的致歉文本不应被缓存"""
+        return _generation_failed.get()
+    
+    def _generate(self, flow: Generator) -> str:
+        """同步驱动器：执行生成流程并返回最终答案"""
+        _generation_failed.set(False)
+        try:
+            request, _ = self._run_flow(flow)
+            if request[0] == "text":
+                return request[1]
+            return self._answer_text(request, self._run_step(request))
+        except Exception as e:
+            print(f"[ERROR] 响应生成失败（{self.provider}）: {e}")
+            _generation_failed.set(True)
+            return f"抱歉，我遇到了一些技术问题。请稍后再试。"
+    
+    async def _agenerate(self, flow: Generator) -> str:
+        """异步驱动器：执行生成流程并返回最终答案"""
+        _generation_failed.set(False)
+        try:
+            request, _ = await self._arun_flow(flow)
+            if request[0] == "text":
+                return request[1]
+            return self._answer_text(request, await self._arun_step(request))
+        except Exception as e:
+            print(f"[ERROR] 异步响应生成失败（{self.provider}）: {e}")
+            _generation_failed.set(True)
+            return f"抱歉，我遇到了一些技术问题。请稍后再试。"
+    
+    def _generate_stream(self, flow: Generator) -> Iterator[Dict[str, Any]]:
+        """流式驱动器：同步执行工具轮次，最终答案轮次流式输出"""
+        try:
+            request, steps = self._run_flow(flow)
+            if steps:
+                yield {"type": "tool_result"}
+            
+            kind = request[0]
+            if kind == "text":
+                yield from self._single_answer_events(request[1])
+            elif kind == "chat":
+                text_stream = llm_router.call_chat_stream(messages=request[1], **self.base_params)
+                yield from self._stream_answer(text_stream, clean=True)
+            else:
+                with self.client.messages.stream(**request[1]) as stream:
+                    yield from self._stream_answer(stream.text_stream, clean=False)
+            
+        except Exception as e:
+            print(f"[ERROR] 流式响应生成失败（{self.provider}）: {e}")
+            yield from self._single_answer_events("抱歉，我遇到了一些技术问题。请稍后再试。", failed=True)
+    
+    def _stream_answer(self, text_stream: Iterable[str], clean: bool) -> Iterator[Dict[str, Any]]:
+        """将文本流转换为token事件，结束时输出完整答案"""
+        thinking_filter = _ThinkingStreamFilter()
+        # R1的思考内容可能没有标签，需按清理规则扣留到答案开始
+        reasoning_filter = None
+        if clean and config.CLEAN_R1_THINKING:
+            reasoning_filter = _ReasoningStreamFilter(self._find_answer_start)
+        parts = []
+        
+        for text in text_stream:
+            parts.append(text)
+            visible = thinking_filter.feed(text)
+            if visible and reasoning_filter:
+                visible = reasoning_filter.feed(visible)
+            if visible:
+                yield {"type": "token", "text": visible}
+        
+        rest = thinking_filter.flush()
+        if reasoning_filter:
+            rest = reasoning_filter.feed(rest)
+            held = reasoning_filter.flush()
+            if held:
+                # 直到结束都无法确定答案开始位置，输出整体清理后的文本
+                rest += self._clean_thinking_content(held)
+        if rest:
+            yield {"type": "token", "text": rest}
+        
+        answer = "".join(parts)
+        yield {"type": "done", "answer": self._clean_thinking_content(answer) if clean else answer, "failed": False}
+    
+    def _single_answer_events(self, answer: str, failed: bool = False) -> Iterator[Dict[str, Any]]:
+        """将非流式获得的完整答案转换为事件"""
+        yield {"type": "token", "text": answer}
+        yield {"type": "done", "answer": answer, "failed": failed}
     
-    def _generate_deepseek_response(self, 
-                                   query: str,
-                                   conversation_history: Optional[str] = None,
-                                   tools: Optional[List] = None,
-                                   tool_manager=None) -> str:
-        """使用DeepSeek（通过路由器）生成响应"""
+    def _has_openai_tool_calls(self, response) -> bool:
+        """检查OpenAI格式响应是否包含工具调用"""
+        return bool(hasattr(response.choices[0].message, 'tool_calls') and 
+                    response.choices[0].message.tool_calls)
+    
+    def _handle_missing_tool_call(self, 
+                                  response,
+                                  query: str,
+                                  messages: List[Dict],
+                                  openai_tools: Optional[List[Dict]],
+                                  tool_manager=None) -> str:
+        """处理模型未调用工具的情况，返回未清理的响应内容"""
+        
+        # 如果模型没有调用工具（不应该发生，因为我们强制了tool_choice="required"）
+        # 但为了保险起见，我们仍然处理这种情况
+        content = response.choices[0].message.content or ""
+        
+        # 检查是否有工具管理器但没有调用工具（意外情况）
+        if tool_manager and openai_tools:
+            print("[WARNING] 模型未调用工具，尽管设置了required。自动触发搜索...")
+            # 从用户查询中提取关键信息
+            user_query = query if isinstance(query, str) else messages[-1]["content"]
+            # 执行默认搜索
+            try:
+                search_result = tool_manager.execute_tool("search_course_content", query=user_query)
+                # 如果有搜索结果，附加说明
+                if search_result and "No relevant course content found" not in search_result:
+                    content += "\n\n[Note: Auto-search performed to ensure source availability]"
+            except Exception as e:
+                print(f"[ERROR] 自动搜索失败: {e}")
         
-        # 构建消息列表（OpenAI格式）
+        return content
+    
+    def _build_openai_messages(self, 
+                               query: str, 
+                               conversation_history: Optional[str],
+                               system_prompt: Optional[str] = None) -> List[Dict]:
+        """构建OpenAI格式的消息列表（系统提示 + 用户问题）"""
         messages = []
         
         # 系统消息
-        system_content = self.SYSTEM_PROMPT
+        system_content = system_prompt or self.SYSTEM_PROMPT
         if conversation_history:
             system_content += f"\n\nPrevious conversation:\n{conversation_history}"
         
         messages.append({"role": "system", "content": system_content})
         messages.append({"role": "user", "content": query})
         
-        # 处理工具格式 
+        return messages
+    
+    def _prepare_openai_tools(self, tools: Optional[List]) -> Optional[List[Dict]]:
+        """将工具定义统一为OpenAI格式"""
         openai_tools = None
         if tools:
             # 检查工具是否已经是OpenAI格式（第一个工具有"type": "function"）
@@ -117,60 +578,7 @@ All responses must be:
             else:
                 # Claude格式，需要转换
                 openai_tools = self._convert_tools_to_openai(tools)
-        
-        try:
-            # 使用路由器调用 - 强制工具调用以确保一致性
-            if openai_tools:
-                # 强制要求模型使用工具（如果有工具可用）
-                enhanced_params = self.base_params.copy()
-                enhanced_params["tool_choice"] = "required"  # 强制使用工具
-                
-                response = llm_router.call_with_tools(
-                    messages=messages,
-                    tools=openai_tools,
-                    **enhanced_params
-                )
-            else:
-                response_text = llm_router.call_simple_chat(
-                    messages=messages,
-                    **self.base_params
-                )
-                # 清理思考内容
-                return self._clean_thinking_content(response_text)
-            
-            # 处理工具调用响应
-            if (hasattr(response.choices[0].message, 'tool_calls') and 
-                response.choices[0].message.tool_calls and tool_manager):
-                return self._handle_openai_tool_execution(
-                    response, messages, openai_tools, tool_manager
-                )
-            
-            # 如果模型没有调用工具（不应该发生，因为我们强制了tool_choice="required"）
-            # 但为了保险起见，我们仍然处理这种情况
-            content = response.choices[0].message.content or ""
-            
-            # 检查是否有工具管理器但没有调用工具（意外情况）
-            if tool_manager and openai_tools:
-                print("[WARNING] 模型未调用工具，尽管设置了required。自动触发搜索...")
-                # 自动执行一次搜索，提取用户查询的关键词
-                import re
-                # 从用户查询中提取关键信息
-                user_query = query if isinstance(query, str) else messages[-1]["content"]
-                # 执行默认搜索
-                try:
-                    search_result = tool_manager.execute_tool("search_course_content", query=user_query)
-                    # 如果有搜索结果，附加说明
-                    if search_result and "No relevant course content found" not in search_result:
-                        content += "\n\n[Note: Auto-search performed to ensure source availability]"
-                except Exception as e:
-                    print(f"[ERROR] 自动搜索失败: {e}")
-            
-            # 清理思考内容
-            return self._clean_thinking_content(content)
-            
-        except Exception as e:
-            print(f"[ERROR] DeepSeek响应生成失败: {e}")
-            return f"抱歉，我遇到了一些技术问题。请稍后再试。"
+        return openai_tools
     
     def _clean_thinking_content(self, response_text: str) -> str:
         """
@@ -195,30 +603,7 @@ All responses must be:
         cleaned = re.sub(r'<thinking>.*?</thinking>', '', response_text, flags=re.DOTALL)
         
         # 步骤2：智能识别答案开始位置
-        # 寻找答案的开始标记（通常在思考后有明确的转折）
-        # 注意：移除了 "\n\n1." 避免误删编号列表前的答案内容
-        answer_markers = [
-            "\n\nThe available course materials",
-            "\n\nBased on the course materials",
-            "\n\nFrom the course content",
-            "\n\nAccording to the materials",
-            "\n\nThe course covers",
-            "\n\n**",  # 粗体标题开始
-            "\n\n###",  # Markdown标题
-            "\n\n##",
-            "\n\nIn the context of",
-            "\n\nTo answer your question",
-            "\n\nHere's",  # 常见答案开始
-            "\n\nRAG",  # 直接定义开始
-        ]
-        
-        # 尝试找到答案的开始位置
-        answer_start = -1
-        for marker in answer_markers:
-            pos = cleaned.find(marker)
-            if pos != -1:
-                answer_start = pos
-                break
+        answer_start = self._find_answer_marker(cleaned)
         
         # 如果找到了明确的答案开始位置，直接返回答案部分
         if answer_start != -1:
@@ -267,156 +652,15 @@ All responses must be:
         
         for para in paragraphs:
             para_stripped = para.strip()
-            para_lower = para_stripped.lower()
             
             # 跳过空段落
             if not para_stripped:
                 continue
             
-            # 首先检测是否是思考内容（即使看起来像答案标题）
-            # 这样可以避免元评论被误判为答案
-            is_meta_comment = False
-            meta_comment_patterns = [
-                # 原有的元评论模式
-                "the search results",
-                "the user's question", 
-                "the user is asking",
-                "need to ensure",
-                "need to extract",
-                "check that",
-                "avoid any extra",
-                "as per the instructions",
-                "from the course content provided",
-                "the lesson mentions",
-                "from lesson",
-                "lesson discusses",
-                "putting this together",
-                
-                # 新增：叙述性开头模式
-                "first, looking",
-                "looking at lesson",
-                "now, examining",
-                "next, considering",
-                "starting with",
-                "beginning with",
-                
-                # 新增：主观判断模式
-                "seems like",
-                "appears to",
-                "suggests that",
-                "might be",
-                "could be",
-                "it seems",
-                "this seems",
-                "that seems",
-                
-                # 新增：过渡性语句模式
-                "putting this all together",
-                "putting it all together",
-                "all together",
-                "so, thinking",
-                "thinking ahead",
-                "thinking about",
-                "considering this",
-                "in summary",
-                "to summarize",
-                
-                # 新增：引用描述模式
-                "it mentions",
-                "it talks about",
-                "it discusses",
-                "it highlights",
-                "it emphasizes",
-                "the lesson talks",
-                "the course mentions",
-                "the material discusses",
-                
-                # 新增：操作性描述模式
-                "looking through",
-                "going through",
-                "examining the",
-                "reviewing the",
-                "checking the",
-            ]
-            for pattern in meta_comment_patterns:
-                if pattern in para_lower:
-                    is_meta_comment = True
-                    skipped_paragraphs.append(para)
-                    break
-            
-            # 如果是元评论，跳过后续检测
-            if is_meta_comment:
-                continue
-            
-            # 检测真实答案的开始（通常是结构化内容）
-            if not found_real_answer:
-                # 检查是否是列表项、标题或正式陈述
-                # 注意：正式定义（如 "RAG (Retrieval-Augmented Generation)"）也是答案
-                if (para_stripped.startswith(('1.', '2.', '3.', '•', '-', '*', '**', '##')) or
-                    para_stripped.startswith(('The available', 'Based on the course', 'According to', 
-                                            'In the context', 'Key points', 'Core principles',
-                                            'Best practices', 'Key benefits', 'Main benefits')) or
-                    # 检测带冒号的标题（如 "Best practices for prompt engineering from course materials:"）
-                    (': ' in para_stripped and para_stripped.endswith(':') and 
-                     len(para_stripped) < 100) or
-                    # 检测正式定义或技术说明（包含括号解释的术语）
-                    ('(' in para_stripped[:100] and ')' in para_stripped[:150] and 
-                     not any(ind in para_lower for ind in ['i ', "i'm", "let me"]))):
-                    found_real_answer = True
-                    filtered_paragraphs.append(para)
-                    continue
-            
-            # 如果已经找到真实答案，继续添加后续段落
-            if found_real_answer:
-                filtered_paragraphs.append(para)
-                continue
-            
-            # 检测思考内容的特征
-            is_thinking = False
-            
-            # 第一人称检测
-            first_person_indicators = ['i ', "i'm", "i'll", "i've", "let me", "i need", "i should", "my "]
-            for indicator in first_person_indicators:
-                if indicator in para_lower:
-                    is_thinking = True
-                    break
-            
-            # 过程性语言检测
-            if not is_thinking:
-                process_words = [
-                    # 原有的过程词
-                    'searching', 'looking', 'checking', 'recalling', 'synthesizing', 
-                    'wait', 'hmm', 'okay', 'actually', 'but the user',
-                    
-                    # 新增：认知过程词
-                    'analyzing', 'examining', 'considering', 'reviewing',
-                    'exploring', 'investigating', 'assessing', 'evaluating',
-                    
-                    # 新增：转折和推测词
-                    'perhaps', 'maybe', 'probably', 'possibly',
-                    'although', 'however', 'nonetheless', 'interestingly',
-                    
-                    # 新增：元认知表达
-                    'i notice', 'i see', 'i find', 'i observe',
-                    'it appears', 'it looks like', 'from what i',
-                ]
-                for word in process_words:
-                    if word in para_lower:
-                        is_thinking = True
-                        break
-            
-            # 额外检查：如果段落是正式的技术定义或说明，不应该被过滤
-            # 例如："RAG (Retrieval-Augmented Generation) technology..."
-            if is_thinking:
-                # 检查是否是技术定义（包含缩写和全称）
-                if ('(' in para_stripped[:100] and ')' in para_stripped[:150] and
-                    'technology' in para_lower or 'framework' in para_lower or 
-                    'system' in para_lower or 'method' in para_lower or
-                    'approach' in para_lower or 'technique' in para_lower):
-                    is_thinking = False  # 这是技术定义，不是思考内容
-            
-            # 如果不是思考内容，保留该段落
-            if not is_thinking:
+            kind = self._classify_paragraph(para_stripped, found_real_answer)
+            if kind == "answer":
+                found_real_answer = True
+            if kind in ("answer", "keep"):
                 filtered_paragraphs.append(para)
             else:
                 skipped_paragraphs.append(para)
@@ -464,18 +708,199 @@ All responses must be:
         
         return result
     
-    def _generate_claude_response(self, 
-                                 query: str,
-                                 conversation_history: Optional[str] = None,
-                                 tools: Optional[List] = None,
-                                 tool_manager=None) -> str:
-        """使用Claude生成响应（保持原有逻辑）"""
+    def _classify_paragraph(self, para_stripped: str, found_real_answer: bool) -> str:
+        """
+        按清理规则判断DeepSeek-R1响应中的一个段落
+        
+        Args:
+            para_stripped: 去除首尾空白的非空段落
+            found_real_answer: 之前的段落是否已进入真实答案部分
+            
+        Returns:
+            "meta"（元评论）、"thinking"（思考内容）、"answer"（真实答案开始）或"keep"（保留）
+        """
+        para_lower = para_stripped.lower()
+        
+        # 首先检测是否是思考内容（即使看起来像答案标题）
+        # 这样可以避免元评论被误判为答案
+        meta_comment_patterns = [
+            # 原有的元评论模式
+            "the search results",
+            "the user's question", 
+            "the user is asking",
+            "need to ensure",
+            "need to extract",
+            "check that",
+            "avoid any extra",
+            "as per the instructions",
+            "from the course content provided",
+            "the lesson mentions",
+            "from lesson",
+            "lesson discusses",
+            "putting this together",
+        
+            # 新增：叙述性开头模式
+            "first, looking",
+            "looking at lesson",
+            "now, examining",
+            "next, considering",
+            "starting with",
+            "beginning with",
+        
+            # 新增：主观判断模式
+            "seems like",
+            "appears to",
+            "suggests that",
+            "might be",
+            "could be",
+            "it seems",
+            "this seems",
+            "that seems",
+        
+            # 新增：过渡性语句模式
+            "putting this all together",
+            "putting it all together",
+            "all together",
+            "so, thinking",
+            "thinking ahead",
+            "thinking about",
+            "considering this",
+            "in summary",
+            "to summarize",
+        
+            # 新增：引用描述模式
+            "it mentions",
+            "it talks about",
+            "it discusses",
+            "it highlights",
+            "it emphasizes",
+            "the lesson talks",
+            "the course mentions",
+            "the material discusses",
+        
+            # 新增：操作性描述模式
+            "looking through",
+            "going through",
+            "examining the",
+            "reviewing the",
+            "checking the",
+        ]
+        for pattern in meta_comment_patterns:
+            if pattern in para_lower:
+                return "meta"
+        
+        # 检测真实答案的开始（通常是结构化内容）
+        if not found_real_answer:
+            # 检查是否是列表项、标题或正式陈述
+            # 注意：正式定义（如 "RAG (Retrieval-Augmented Generation)"）也是答案
+            if (para_stripped.startswith(('1.', '2.', '3.', '•', '-', '*', '**', '##')) or
+                para_stripped.startswith(('The available', 'Based on the course', 'According to', 
+                                        'In the context', 'Key points', 'Core principles',
+                                        'Best practices', 'Key benefits', 'Main benefits')) or
+                # 检测带冒号的标题（如 "Best practices for prompt engineering from course materials:"）
+                (': ' in para_stripped and para_stripped.endswith(':') and 
+                 len(para_stripped) < 100) or
+                # 检测正式定义或技术说明（包含括号解释的术语）
+                ('(' in para_stripped[:100] and ')' in para_stripped[:150] and 
+                 not any(ind in para_lower for ind in ['i ', "i'm", "let me"]))):
+                return "answer"
+        
+        # 如果已经找到真实答案，继续添加后续段落
+        if found_real_answer:
+            return "keep"
+        
+        # 检测思考内容的特征
+        is_thinking = False
+        
+        # 第一人称检测
+        first_person_indicators = ['i ', "i'm", "i'll", "i've", "let me", "i need", "i should", "my "]
+        for indicator in first_person_indicators:
+            if indicator in para_lower:
+                is_thinking = True
+                break
+        
+        # 过程性语言检测
+        if not is_thinking:
+            process_words = [
+                # 原有的过程词
+                'searching', 'looking', 'checking', 'recalling', 'synthesizing', 
+                'wait', 'hmm', 'okay', 'actually', 'but the user',
+        
+                # 新增：认知过程词
+                'analyzing', 'examining', 'considering', 'reviewing',
+                'exploring', 'investigating', 'assessing', 'evaluating',
+        
+                # 新增：转折和推测词
+                'perhaps', 'maybe', 'probably', 'possibly',
+                'although', 'however', 'nonetheless', 'interestingly',
+        
+                # 新增：元认知表达
+                'i notice', 'i see', 'i find', 'i observe',
+                'it appears', 'it looks like', 'from what i',
+            ]
+            for word in process_words:
+                if word in para_lower:
+                    is_thinking = True
+                    break
+        
+        # 额外检查：如果段落是正式的技术定义或说明，不应该被过滤
+        # 例如："RAG (Retrieval-Augmented Generation) technology..."
+        if is_thinking:
+            # 检查是否是技术定义（包含缩写和全称）
+            if ('(' in para_stripped[:100] and ')' in para_stripped[:150] and
+                'technology' in para_lower or 'framework' in para_lower or 
+                'system' in para_lower or 'method' in para_lower or
+                'approach' in para_lower or 'technique' in para_lower):
+                is_thinking = False  # 这是技术定义，不是思考内容
+        
+        # 如果不是思考内容，保留该段落
+        return "thinking" if is_thinking else "keep"
+    
+    def _find_answer_marker(self, text: str) -> int:
+        """按优先级查找答案开始标记，返回其位置，未找到时返回-1"""
+        for marker in self.ANSWER_MARKERS:
+            pos = text.find(marker)
+            if pos != -1:
+                return pos
+        return -1
+    
+    def _find_answer_start(self, text: str) -> int:
+        """
+        确定流式文本中答案的开始位置
+        
+        与_clean_thinking_content使用相同规则：先查找答案标记，再逐个检查
+        已完整接收的段落，第一个被保留的段落即为答案开始
+        
+        Returns:
+            答案开始位置，尚无法确定时返回-1
+        """
+        answer_start = self._find_answer_marker(text)
+        if answer_start != -1:
+            return answer_start
+        
+        position = 0
+        paragraphs = text.split('\n\n')
+        # 最后一段可能尚未接收完整，暂不判断
+        for para in paragraphs[:-1]:
+            para_stripped = para.strip()
+            if para_stripped and self._classify_paragraph(para_stripped, False) in ("answer", "keep"):
+                return position
+            position += len(para) + 2
+        return -1
+    
+    def _build_claude_params(self, 
+                             query: str,
+                             conversation_history: Optional[str] = None,
+                             tools: Optional[List] = None,
+                             system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """构建Claude API调用参数"""
         
         # 构建系统内容
+        system_prompt = system_prompt or self.SYSTEM_PROMPT
         system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
+            f"{system_prompt}\n\nPrevious conversation:\n{conversation_history}"
             if conversation_history 
-            else self.SYSTEM_PROMPT
+            else system_prompt
         )
         
         # 准备API调用参数
@@ -491,20 +916,7 @@ All responses must be:
             api_params["tools"] = tools
             api_params["tool_choice"] = {"type": "auto"}
         
-        try:
-            # 获取Claude响应
-            response = self.client.messages.create(**api_params)
-            
-            # 处理工具执行
-            if response.stop_reason == "tool_use" and tool_manager:
-                return self._handle_claude_tool_execution(response, api_params, tool_manager)
-            
-            # 返回直接响应
-            return response.content[0].text
-            
-        except Exception as e:
-            print(f"[ERROR] Claude响应生成失败: {e}")
-            return f"抱歉，我遇到了一些技术问题。请稍后再试。"
+        return api_params
     
     def _convert_tools_to_openai(self, claude_tools: List[Dict]) -> List[Dict]:
         """将Claude工具格式转换为OpenAI格式"""
@@ -530,12 +942,11 @@ All responses must be:
         
         return openai_tools
     
-    def _handle_openai_tool_execution(self, 
-                                     initial_response,
-                                     messages: List[Dict],
-                                     tools: List[Dict],
-                                     tool_manager) -> str:
-        """处理OpenAI格式的工具执行"""
+    def _execute_openai_tool_calls(self, 
+                                   initial_response,
+                                   messages: List[Dict],
+                                   tool_manager):
+        """执行OpenAI格式的工具调用，并将调用及结果追加到消息列表"""
         
         # 添加AI的工具调用消息
         messages.append({
@@ -570,24 +981,12 @@ All responses must be:
                     "content": f"工具执行错误: {str(e)}",
                     "tool_call_id": tool_call.id
                 })
-        
-        # 获取最终响应（不带工具）
-        try:
-            final_response = llm_router.call_simple_chat(
-                messages=messages,
-                **self.base_params
-            )
-            # 清理思考内容
-            return self._clean_thinking_content(final_response)
-            
-        except Exception as e:
-            return f"生成最终响应时出错: {str(e)}"
     
-    def _handle_claude_tool_execution(self, 
-                                     initial_response, 
-                                     base_params: Dict[str, Any], 
-                                     tool_manager) -> str:
-        """处理Claude格式的工具执行（保持原有逻辑）"""
+    def _execute_claude_tool_calls(self, 
+                                   initial_response, 
+                                   base_params: Dict[str, Any], 
+                                   tool_manager) -> Dict[str, Any]:
+        """执行Claude格式的工具调用，返回最终API调用参数（不带工具）"""
         
         # 开始使用现有消息
         messages = base_params["messages"].copy()
@@ -622,9 +1021,7 @@ All responses must be:
             **self.base_params
         }
         
-        # 获取最终响应
-        final_response = self.client.messages.create(**final_params)
-        return final_response.content[0].text
+        return final_params
 
 
 # 工厂函数，根据配置创建合适的生成器
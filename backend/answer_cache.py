@@ -0,0 +1,310 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+
+@dataclass
+class CachedAnswer:
+    """A cached answer with the sources it was generated from"""
+    answer: str
+    sources: List[str]
+    sources_detail: List[Dict[str, Any]]
+    corpus_version: str
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class CacheLookup:
+    """Result of an answer cache lookup, reused to store the freshly generated answer on a miss"""
+    key: Optional[str] = None
+    corpus_version: Optional[str] = None
+    query_embedding: Optional[np.ndarray] = None
+    answer: Optional[CachedAnswer] = None
+
+
+class AnswerCache:
+    """
+    Exact-match answer cache keyed by normalized query, conversation history
+    and corpus version.
+
+    Entries live in an in-memory LRU with a TTL. When a database path is
+    given, entries are also written to SQLite so they survive restarts and
+    are shared between worker processes. Workers may briefly see different
+    corpus versions, so SQLite rows of other versions are never deleted on a
+    version change; the version in the key keeps them from being read, and
+    rows are expired by age and by a row limit instead.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400, db_path: Optional[str] = None,
+                 max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._corpus_version: Optional[str] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    corpus_version TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    sources_detail TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS answers_created_at ON answers (created_at)")
+            self._db.commit()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query so trivial differences in case and spacing hit the same entry"""
+        return ' '.join(query.casefold().split()).rstrip('?!. ')
+
+    def make_key(self, query: str, history: Optional[str], corpus_version: str) -> str:
+        """
+        Build the cache key for a query.
+
+        Seeing a new corpus version drops in-memory entries generated from
+        other versions.
+        """
+        self._observe_corpus_version(corpus_version)
+
+        digest = hashlib.sha256()
+        for part in (self.normalize_query(query), history or "", corpus_version):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedAnswer]:
+        """Look up an answer, checking memory first and then the SQLite tier"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry.created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry
+                del self._entries[key]
+
+            entry = self._load(key)
+            if entry is not None and now - entry.created_at <= self.ttl_seconds:
+                self._remember(key, entry)
+                self._stats["disk_hits"] += 1
+                return entry
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, answer: str, sources: List[str], sources_detail: List[Dict[str, Any]], corpus_version: str):
+        """Store an answer in memory and, if configured, in SQLite"""
+        entry = CachedAnswer(
+            answer=answer,
+            sources=list(sources),
+            sources_detail=list(sources_detail),
+            corpus_version=corpus_version
+        )
+        with self._lock:
+            self._remember(key, entry)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, entry.corpus_version, entry.answer, json.dumps(entry.sources),
+                     json.dumps(entry.sources_detail), entry.created_at)
+                )
+                self._expire_disk(entry.created_at)
+                self._db.commit()
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _remember(self, key: str, entry: CachedAnswer):
+        """Insert into the in-memory LRU, evicting the least recently used entries"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _expire_disk(self, now: float):
+        """Delete SQLite rows past the TTL, then the oldest rows beyond the row limit (caller holds the lock)"""
+        self._db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM answers WHERE key IN "
+            "(SELECT key FROM answers ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def _load(self, key: str) -> Optional[CachedAnswer]:
+        """Read an entry from the SQLite tier"""
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT answer, sources, sources_detail, corpus_version, created_at FROM answers WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CachedAnswer(
+            answer=row[0],
+            sources=json.loads(row[1]),
+            sources_detail=json.loads(row[2]),
+            corpus_version=row[3],
+            created_at=row[4]
+        )
+
+    def _observe_corpus_version(self, corpus_version: str):
+        """Drop in-memory entries generated from a different corpus version"""
+        with self._lock:
+            if corpus_version == self._corpus_version:
+                return
+            self._corpus_version = corpus_version
+            stale = [key for key, entry in self._entries.items() if entry.corpus_version != corpus_version]
+            for key in stale:
+                del self._entries[key]
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache matching paraphrased questions by query-embedding similarity.
+
+    Query embeddings are kept L2-normalized in a fixed-size NumPy matrix, so
+    a lookup is a single matrix-vector product. A cached answer is returned
+    when the cosine similarity of the nearest entry reaches the threshold and
+    both questions mention the same numbers (so "lesson 2" never answers
+    "lesson 3"). Only history-free turns should be looked up or stored.
+    """
+
+    NUMBER_PATTERN = re.compile(r'\d+')
+
+    def __init__(self,
+                 embed: Callable[[List[str]], np.ndarray],
+                 max_entries: int = 500,
+                 threshold: float = 0.92,
+                 near_miss_margin: float = 0.05,
+                 ttl_seconds: float = 86400):
+        self.embed = embed
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.near_miss_margin = near_miss_margin
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None          # (max_entries, dim) normalized embeddings
+        self._entries: List[Optional[CachedAnswer]] = [None] * max_entries
+        self._numbers: List[Optional[frozenset]] = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._size = 0
+        self._corpus_version: Optional[str] = None
+        self._stats = {"hits": 0, "misses": 0, "near_misses": 0, "stores": 0, "evictions": 0}
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed and L2-normalize a query"""
+        vector = np.asarray(self.embed([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query: str, query_embedding: np.ndarray, corpus_version: str) -> Optional[CachedAnswer]:
+        """Return the cached answer of the most similar earlier question, if similar enough"""
+        with self._lock:
+            self._observe_corpus_version(corpus_version)
+            if self._size == 0:
+                self._stats["misses"] += 1
+                return None
+
+            similarities = self._matrix[:self._size] @ query_embedding
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            entry = self._entries[best]
+            fresh = time.time() - entry.created_at <= self.ttl_seconds
+            if similarity >= self.threshold and fresh and self._numbers[best] == self._extract_numbers(query):
+                self._last_used[best] = time.monotonic()
+                self._stats["hits"] += 1
+                return entry
+
+            if similarity >= self.threshold - self.near_miss_margin:
+                self._stats["near_misses"] += 1
+            else:
+                self._stats["misses"] += 1
+            return None
+
+    def put(self, query: str, query_embedding: np.ndarray, entry: CachedAnswer):
+        """Store an answer, evicting the least recently used entry when full"""
+        with self._lock:
+            self._observe_corpus_version(entry.corpus_version)
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, query_embedding.shape[0]), dtype=np.float32)
+
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._stats["evictions"] += 1
+
+            self._matrix[slot] = query_embedding
+            self._entries[slot] = entry
+            self._numbers[slot] = self._extract_numbers(query)
+            self._last_used[slot] = time.monotonic()
+            self._stats["stores"] += 1
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self._lock:
+            self._clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/near-miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["near_misses"]
+            return {
+                **self._stats,
+                "entries": self._size,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0
+            }
+
+    def _extract_numbers(self, query: str) -> frozenset:
+        return frozenset(self.NUMBER_PATTERN.findall(query))
+
+    def _observe_corpus_version(self, corpus_version: str):
+        """Drop every entry once the corpus changes (caller holds the lock)"""
+        if corpus_version != self._corpus_version:
+            self._corpus_version = corpus_version
+            self._clear()
+
+    def _clear(self):
+        self._size = 0
+        self._entries = [None] * self.max_entries
+        self._numbers = [None] * self.max_entries
+        self._last_used[:] = 0
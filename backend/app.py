@@ -2,15 +2,19 @@ import warnings
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.*")
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import json
 import os
 
 from config import config
 from rag_system import RAGSystem
+from query_executor import query_executor
+from docs_watcher import DocsWatcher
 
 # Initialize FastAPI app
 app = FastAPI(title="Course Materials RAG System", root_path="")
@@ -34,6 +38,9 @@ app.add_middleware(
 # Initialize RAG system
 rag_system = RAGSystem(config)
 
+# Optional background watcher for the docs folder (started on startup)
+docs_watcher: Optional[DocsWatcher] = None
+
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
     """Request model for course queries"""
@@ -69,8 +76,9 @@ async def query_documents(request: QueryRequest):
         if not session_id:
             session_id = rag_system.session_manager.create_session()
         
-        # Process query using RAG system
-        answer, sources, sources_detail = rag_system.query(request.query, session_id)
+        # Process query using the async RAG pipeline; blocking search work
+        # runs on the query executor so the event loop is never stalled
+        answer, sources, sources_detail = await rag_system.aquery(request.query, session_id)
         
         # Convert sources_detail to SourceDetail objects
         sources_detail_obj = []
@@ -91,11 +99,33 @@ async def query_documents(request: QueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Process a query and stream sources, answer tokens and completion as Server-Sent Events"""
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag_system.session_manager.create_session()
+    
+    async def event_source():
+        try:
+            async for event, data in query_executor.stream(
+                rag_system.query_stream, request.query, session_id
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/courses", response_model=CourseStats)
 async def get_course_stats():
     """Get course analytics and statistics"""
     try:
-        analytics = rag_system.get_course_analytics()
+        analytics = await query_executor.run(rag_system.get_course_analytics)
         return CourseStats(
             total_courses=analytics["total_courses"],
             course_titles=analytics["course_titles"]
@@ -103,6 +133,24 @@ async def get_course_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/stats")
+async def get_runtime_stats() -> Dict[str, Any]:
+    """Get runtime metrics for the query pipeline"""
+    return {
+        "query_executor": query_executor.get_stats(),
+        "speculative_retrieval": rag_system.tool_manager.get_speculation_stats(),
+        "answer_cache": rag_system.answer_cache.get_stats() if rag_system.answer_cache else None,
+        "semantic_cache": rag_system.semantic_cache.get_stats() if rag_system.semantic_cache else None,
+        "course_resolver": rag_system.vector_store.course_resolver.get_stats(),
+        "query_embedding_cache": rag_system.vector_store.query_embedding_cache.get_stats(),
+        "embedding_store": rag_system.vector_store.embedding_store.get_stats() if rag_system.vector_store.embedding_store else None,
+        "lexical_index": rag_system.vector_store.lexical_index.get_stats() if rag_system.vector_store.lexical_index else None,
+        "parse_cache": rag_system.parse_cache.get_stats() if rag_system.parse_cache else None,
+        "index_snapshot": rag_system.vector_store.get_snapshot_info(),
+        "ingestion": rag_system.ingestor.get_last_stats(),
+        "docs_watcher": docs_watcher.get_stats() if docs_watcher else None
+    }
+
 @app.on_event("startup")
 async def startup_event():
     """Load initial documents on startup"""
@@ -114,6 +162,28 @@ async def startup_event():
             print(f"Loaded {courses} courses with {chunks} chunks")
         except Exception as e:
             print(f"Error loading documents: {e}")
+    
+    # Hot-reload edited documents while queries keep being served
+    global docs_watcher
+    if config.DOCS_WATCH_ENABLED and os.path.exists(docs_path):
+        if rag_system.manifest is None:
+            print("Docs watcher not started: set INGEST_MANIFEST_PATH so edited courses can be detected")
+        else:
+            docs_watcher = DocsWatcher(
+                rag_system,
+                docs_path,
+                poll_interval=config.DOCS_WATCH_INTERVAL,
+                debounce=config.DOCS_WATCH_DEBOUNCE,
+                max_duty=config.DOCS_WATCH_MAX_DUTY
+            )
+            docs_watcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the docs watcher and release the query executor threads"""
+    if docs_watcher:
+        docs_watcher.stop()
+    query_executor.shutdown(wait=False)
 
 # Custom static file handler with no-cache headers for development
 from fastapi.staticfiles import StaticFiles
@@ -35,19 +35,79 @@ class Config:
     
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))  # Cached query embeddings
     
     # Document processing settings
     CHUNK_SIZE: int = 800       # Size of text chunks for vector storage
     CHUNK_OVERLAP: int = 100     # Characters to overlap between chunks
+    # Chunking unit: "chars" (CHUNK_SIZE/CHUNK_OVERLAP) or "tokens" of the embedding model's
+    # tokenizer (CHUNK_TOKEN_SIZE/CHUNK_TOKEN_OVERLAP; the size leaves room for the lesson prefix)
+    CHUNK_UNIT: str = os.getenv("CHUNK_UNIT", "chars")
+    CHUNK_TOKEN_SIZE: int = int(os.getenv("CHUNK_TOKEN_SIZE", "224"))
+    CHUNK_TOKEN_OVERLAP: int = int(os.getenv("CHUNK_TOKEN_OVERLAP", "32"))
+    EMBEDDING_MAX_TOKENS: int = 256  # Tokens all-MiniLM-L6-v2 embeds; the rest is truncated
+    TOKEN_REPORT_ENABLED: bool = os.getenv("TOKEN_REPORT_ENABLED", "false").lower() == "true"  # Token report in chars mode
     MAX_RESULTS: int = 5         # Maximum search results to return
+    # Content search: "vector" (embeddings), "lexical" (BM25, no model inference) or "hybrid" (rank fusion of both)
+    SEARCH_MODE: str = os.getenv("SEARCH_MODE", "vector")
     MAX_HISTORY: int = 2         # Number of conversation messages to remember
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))  # Processes parsing documents
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "64"))  # Chunks embedded and written per batch
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "4"))   # Items buffered between ingestion stages
+    INGEST_STREAM_THRESHOLD: int = int(os.getenv("INGEST_STREAM_THRESHOLD", str(16 * 1024 * 1024)))  # Files this large are parsed while read
+    
+    # Docs folder watch mode (hot reload of edited course documents)
+    DOCS_WATCH_ENABLED: bool = os.getenv("DOCS_WATCH_ENABLED", "false").lower() == "true"
+    DOCS_WATCH_INTERVAL: float = float(os.getenv("DOCS_WATCH_INTERVAL", "2.0"))  # Seconds between folder polls
+    DOCS_WATCH_DEBOUNCE: float = float(os.getenv("DOCS_WATCH_DEBOUNCE", "3.0"))  # Quiet seconds before reloading
+    DOCS_WATCH_MAX_DUTY: float = float(os.getenv("DOCS_WATCH_MAX_DUTY", "0.25"))  # Max fraction of wall time spent reloading
+    
+    # Vector backend: "chroma" (HNSW index), "numpy" (exact brute-force search, small/medium corpora)
+    # or "snapshot" (read-only, serves the index snapshot under INDEX_SNAPSHOT_PATH from memory-mapped files)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
     
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
+    NUMPY_STORE_PATH: str = os.getenv("NUMPY_STORE_PATH", "./numpy_store")  # NumPy backend vectors (.npy) and metadata (.json)
+    INDEX_SNAPSHOT_PATH: str = os.getenv("INDEX_SNAPSHOT_PATH", "")  # Snapshot published after ingestion / served by "snapshot"; empty = disabled
+    # Vectors the "snapshot" backend scans: "float32" or "int8" (candidates re-scored in float32)
+    VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "float32")
+    QUANTIZATION_RESCORE_FACTOR: int = int(os.getenv("QUANTIZATION_RESCORE_FACTOR", "4"))  # Candidates re-scored per result
+    INGEST_MANIFEST_PATH: str = os.getenv("INGEST_MANIFEST_PATH", "./ingest_manifest.json")  # Ingested file manifest; empty = title-only skipping
+    EMBEDDING_STORE_PATH: str = os.getenv("EMBEDDING_STORE_PATH", "./embedding_store")  # Persisted chunk embeddings; empty = disabled
+    PARSE_CACHE_PATH: str = os.getenv("PARSE_CACHE_PATH", "./parse_cache")  # Parsed courses by content hash; empty = disabled
+    LEXICAL_INDEX_PATH: str = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.json")  # BM25 index; empty = rebuilt in memory
     
     # DeepSeek-R1 response cleaning settings
     CLEAN_R1_THINKING: bool = os.getenv("CLEAN_R1_THINKING", "true").lower() == "true"
     R1_THINKING_MIN_LENGTH: int = int(os.getenv("R1_THINKING_MIN_LENGTH", "50"))
+    
+    # Query pipeline mode:
+    #   "tool"   - tool-selection call picks search arguments, then a synthesis call
+    #   "direct" - search runs locally with derived filters, then a single generation call
+    PIPELINE_MODE: str = os.getenv("PIPELINE_MODE", "tool")
+    # Search the raw question in parallel with the tool-selection call ("tool" mode only). Off by
+    # default: results are only reused when the model searches the question verbatim - check the
+    # hit rate under /api/stats before enabling
+    SPECULATIVE_RETRIEVAL: bool = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+    SPECULATIVE_WORKERS: int = int(os.getenv("SPECULATIVE_WORKERS", "4"))  # Threads for speculative searches, on top of QUERY_WORKERS
+    
+    # Answer cache settings
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))      # Max in-memory entries
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "86400"))   # Seconds an answer stays valid
+    ANSWER_CACHE_PATH: str = os.getenv("ANSWER_CACHE_PATH", "")               # SQLite file; empty = memory only
+    ANSWER_CACHE_DISK_SIZE: int = int(os.getenv("ANSWER_CACHE_DISK_SIZE", "10000"))  # Max SQLite rows
+    # Serve answers cached for similar (not identical) questions. Off by default: a paraphrase above
+    # the threshold can still ask something different - tune SEMANTIC_CACHE_THRESHOLD on real
+    # questions before enabling
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_SIZE: int = int(os.getenv("SEMANTIC_CACHE_SIZE", "500"))              # Max cached query embeddings
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # Min cosine similarity for a hit
+    SEMANTIC_CACHE_NEAR_MISS: float = float(os.getenv("SEMANTIC_CACHE_NEAR_MISS", "0.05"))  # Margin below threshold counted as near miss
+    
+    # Query execution settings
+    QUERY_WORKERS: int = int(os.getenv("QUERY_WORKERS", "32"))  # Threads serving the query pipeline
 
 config = Config()
 
@@ -0,0 +1,197 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set
+import numpy as np
+
+
+def normalize_title(text: str) -> str:
+    """Lower-case a course name and reduce it to space-separated words"""
+    return ' '.join(re.findall(r'\w+', text.casefold()))
+
+
+def course_aliases(title: str) -> Set[str]:
+    """Normalized phrases that identify a course: full title, the part before a colon and the acronym"""
+    words = re.findall(r'\w+', title.casefold())
+    aliases = {' '.join(words)}
+    if ':' in title:
+        aliases.add(normalize_title(title.split(':', 1)[0]))
+    if len(words) >= 3:
+        aliases.add(''.join(word[0] for word in words))
+    return {alias for alias in aliases if len(alias) >= 2}
+
+
+class CourseNameResolver:
+    """
+    Resolve user-supplied course names to catalog titles locally.
+
+    Names are resolved in stages, stopping at the first that decides:
+    exact title, case-folded title, alias (acronym / text before a colon),
+    unique title prefix, unique token match, and finally the nearest title
+    in a precomputed matrix of title embeddings. The fallback (a Chroma
+    catalog query) is only used when no title embeddings are available.
+    Decisions are cached until the set of titles changes.
+    """
+
+    STAGES = ("exact", "casefold", "alias", "prefix", "token", "embedding", "fallback", "unresolved")
+
+    def __init__(self,
+                 embed: Callable[[List[str]], np.ndarray],
+                 fallback: Optional[Callable[[str], Optional[str]]] = None,
+                 cache_size: int = 1024):
+        self.embed = embed
+        self.fallback = fallback
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._decisions: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._stats = {stage: 0 for stage in self.STAGES}
+        self._stats["cache_hits"] = 0
+        self._generation = 0    # Bumped whenever the titles change
+        self._clear_indexes()
+
+    def add_titles(self, titles: List[str]):
+        """Index new course titles; their embeddings are computed on first use"""
+        with self._lock:
+            for title in titles:
+                if title in self._titles:
+                    continue
+                self._titles.add(title)
+                self._pending.append(title)
+
+                normalized = normalize_title(title)
+                self._by_casefold[normalized] = title
+                for alias in course_aliases(title):
+                    self._by_alias.setdefault(alias, set()).add(title)
+                for token in normalized.split():
+                    self._by_token.setdefault(token, set()).add(title)
+            self._generation += 1
+            self._decisions.clear()
+
+    def remove_titles(self, titles: List[str]):
+        """Drop course titles, rebuilding the indexes from the remaining ones"""
+        with self._lock:
+            removed = set(titles)
+            remaining = [title for title in self._matrix_titles + self._pending if title not in removed]
+            self._clear_indexes()
+            self.add_titles(remaining)
+
+    def clear(self):
+        """Forget all titles and cached decisions"""
+        with self._lock:
+            self._clear_indexes()
+            self._generation += 1
+            self._decisions.clear()
+
+    def resolve(self, course_name: str) -> Optional[str]:
+        """
+        Resolve a course name to a catalog title.
+
+        Args:
+            course_name: Course name as given by the user or the model
+
+        Returns:
+            The matching course title, or None if no course matches
+        """
+        with self._lock:
+            if course_name in self._decisions:
+                self._decisions.move_to_end(course_name)
+                self._stats["cache_hits"] += 1
+                return self._decisions[course_name]
+            generation = self._generation
+            stage, title = self._resolve_lexical(course_name)
+
+        if stage is None:
+            # Embedding and the catalog fallback run without the lock, so
+            # get_stats() and cached lookups never wait on them
+            stage, title = self._resolve_semantic(course_name, generation)
+
+        with self._lock:
+            self._stats[stage] += 1
+            # A decision made against titles that have since changed is not cached
+            if generation == self._generation:
+                self._decisions[course_name] = title
+                while len(self._decisions) > self.cache_size:
+                    self._decisions.popitem(last=False)
+            return title
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get how many names each stage resolved"""
+        with self._lock:
+            return {**self._stats, "titles": len(self._titles)}
+
+    def _resolve_lexical(self, course_name: str):
+        """Resolve by title, alias, prefix or token (caller holds the lock); stage is None if undecided"""
+        if course_name in self._titles:
+            return "exact", course_name
+
+        normalized = normalize_title(course_name)
+        if normalized in self._by_casefold:
+            return "casefold", self._by_casefold[normalized]
+
+        matches = self._by_alias.get(normalized, set())
+        if len(matches) == 1:
+            return "alias", next(iter(matches))
+
+        if normalized:
+            prefixed = [title for key, title in self._by_casefold.items() if key.startswith(normalized + ' ')]
+            if len(prefixed) == 1:
+                return "prefix", prefixed[0]
+
+            token_sets = [self._by_token.get(token) for token in normalized.split()]
+            if all(token_sets):
+                candidates = set.intersection(*token_sets)
+                if len(candidates) == 1:
+                    return "token", next(iter(candidates))
+        return None, None
+
+    def _resolve_semantic(self, course_name: str, generation: int):
+        """Resolve by title embedding, then the fallback (called without the lock)"""
+        title = self._nearest_title(course_name, generation)
+        if title:
+            return "embedding", title
+
+        if self.fallback:
+            title = self.fallback(course_name)
+            if title:
+                return "fallback", title
+        return "unresolved", None
+
+    def _nearest_title(self, course_name: str, generation: int) -> Optional[str]:
+        """Pick the title whose embedding is closest to the name (same choice as a catalog query)"""
+        with self._lock:
+            pending = list(self._pending)
+            if not pending and self._matrix is None:
+                return None
+        try:
+            vectors = self._normalize(self.embed(pending)) if pending else None
+            query = self._normalize(self.embed([course_name]))[0]
+        except Exception as e:
+            print(f"Error embedding course names: {e}")
+            return None
+
+        with self._lock:
+            # Another resolve may have indexed the same titles meanwhile
+            if vectors is not None and generation == self._generation and self._pending[:len(pending)] == pending:
+                self._matrix = vectors if self._matrix is None else np.vstack([self._matrix, vectors])
+                self._matrix_titles = self._matrix_titles + pending
+                self._pending = self._pending[len(pending):]
+            matrix, titles = self._matrix, self._matrix_titles
+        if matrix is None:
+            return None
+        return titles[int(np.argmax(matrix @ query))]
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _clear_indexes(self):
+        self._titles: Set[str] = set()
+        self._by_casefold: Dict[str, str] = {}
+        self._by_alias: Dict[str, Set[str]] = {}
+        self._by_token: Dict[str, Set[str]] = {}
+        self._pending: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_titles: List[str] = []
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class DocsWatcher:
+    """
+    Background watcher that hot-reloads a docs folder into the live index.
+
+    The folder is polled for changes in file names, sizes and mtimes. Once
+    changes stop for the debounce period, the folder goes through
+    incremental ingestion (RAGSystem.add_course_folder). Ingestion runs at
+    lowered OS priority, and the watcher waits after each run so ingestion
+    takes at most max_duty of wall time, leaving the CPU to query handling.
+
+    The RAG system needs an ingest manifest: without one, ingestion skips
+    courses whose titles are already stored, so edits would never load.
+    """
+
+    def __init__(self,
+                 rag_system,
+                 folder_path: str,
+                 poll_interval: float = 2.0,
+                 debounce: float = 3.0,
+                 max_duty: float = 0.25):
+        if getattr(rag_system, "manifest", None) is None:
+            raise ValueError("DocsWatcher needs an ingest manifest (INGEST_MANIFEST_PATH) to reload edited courses")
+        self.rag_system = rag_system
+        self.folder_path = folder_path
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_duty = min(max(max_duty, 0.01), 1.0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot = self._scan()
+        self._stats = {"reloads": 0, "courses": 0, "chunks": 0, "errors": 0, "last_reload_seconds": 0.0}
+
+    def start(self):
+        """Start polling in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="docs-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop polling and wait for an in-progress reload to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get reload counters"""
+        return {**self._stats, "folder": self.folder_path, "running": self._thread is not None}
+
+    def _run(self):
+        self._lower_priority()
+        changed_at: Optional[float] = None
+        next_allowed = 0.0
+
+        while not self._stop.wait(self.poll_interval):
+            snapshot = self._scan()
+            if snapshot != self._snapshot:
+                # Restart the debounce window on every change in a burst
+                self._snapshot = snapshot
+                changed_at = time.monotonic()
+                continue
+
+            now = time.monotonic()
+            if changed_at is None or now - changed_at < self.debounce or now < next_allowed:
+                continue
+
+            changed_at = None
+            duration = self._reload()
+            # Idle long enough that reloads use at most max_duty of wall time
+            next_allowed = time.monotonic() + duration * (1 - self.max_duty) / self.max_duty
+
+    def _reload(self) -> float:
+        started_at = time.perf_counter()
+        try:
+            courses, chunks = self.rag_system.add_course_folder(self.folder_path)
+            self._stats["courses"] += courses
+            self._stats["chunks"] += chunks
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Error reloading {self.folder_path}: {e}")
+        duration = time.perf_counter() - started_at
+        self._stats["reloads"] += 1
+        self._stats["last_reload_seconds"] = round(duration, 3)
+        print(f"Reloaded {self.folder_path} in {duration:.2f}s")
+        return duration
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Map each file in the folder to its (size, mtime)"""
+        snapshot = {}
+        try:
+            with os.scandir(self.folder_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+        return snapshot
+
+    @staticmethod
+    def _lower_priority():
+        """Lower this thread's scheduling priority; threads and processes it starts inherit it (Linux)"""
+        if hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+            except OSError:
+                pass
@@ -1,14 +1,42 @@
 import os
 import re
-from typing import List, Tuple
-from models import Course, Lesson, CourseChunk
+from typing import Iterable, Iterator, List, Optional, Tuple
+from bisect import bisect_left, bisect_right
+from models import Course, Lesson, ChunkBatch
+from token_counter import TokenCounter
+
+# Sentence boundaries: whitespace after . ! or ? followed by a capital letter,
+# except after common abbreviations (e.g. "e.g." or "Dr."). The cheap
+# punctuation check comes first so most positions are rejected quickly.
+SENTENCE_ENDINGS = re.compile(r'(?<=[.!?])(?<!\w\.\w.)(?<![A-Z][a-z]\.)\s+(?=[A-Z])')
+
+# Bump when parsing or chunking output changes, so cached parses are invalidated
+PARSER_VERSION = 1
+
+# Course document header lines
+COURSE_TITLE_PATTERN = re.compile(r'^Course Title:\s*(.+)$', re.IGNORECASE)
+COURSE_LINK_PATTERN = re.compile(r'^Course Link:\s*(.+)$', re.IGNORECASE)
+COURSE_INSTRUCTOR_PATTERN = re.compile(r'^Course Instructor:\s*(.+)$', re.IGNORECASE)
+LESSON_PATTERN = re.compile(r'^Lesson\s+(\d+):\s*(.+)$', re.IGNORECASE)
+LESSON_LINK_PATTERN = re.compile(r'^Lesson Link:\s*(.+)$', re.IGNORECASE)
 
 class DocumentProcessor:
-    """Processes course documents and extracts structured information"""
+    """
+    Processes course documents and extracts structured information.
+    
+    Chunk size and overlap count characters, or the embedding model's tokens
+    when a token counter is given.
+    """
     
-    def __init__(self, chunk_size: int, chunk_overlap: int):
+    def __init__(self, chunk_size: int, chunk_overlap: int, token_counter: Optional[TokenCounter] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.token_counter = token_counter
+    
+    def settings_fingerprint(self) -> str:
+        """Describe everything that determines the parse output of a given text"""
+        unit = f"tokens:{self.token_counter.model_name}" if self.token_counter else "chars"
+        return f"v{PARSER_VERSION}:{unit}:{self.chunk_size}:{self.chunk_overlap}"
     
     def read_file(self, file_path: str) -> str:
         """Read content from file with UTF-8 encoding"""
@@ -25,76 +53,70 @@ class DocumentProcessor:
     def chunk_text(self, text: str) -> List[str]:
         """Split text into sentence-based chunks with overlap using config settings"""
         
-        # Clean up the text
-        text = re.sub(r'\s+', ' ', text.strip())  # Normalize whitespace
+        # Normalize whitespace (same result as re.sub(r'\s+', ' ', text.strip()))
+        text = ' '.join(text.split())
+        
+        # Sentences never carry surrounding whitespace after normalization
+        sentences = [s for s in SENTENCE_ENDINGS.split(text) if s]
         
-        # Better sentence splitting that handles abbreviations
-        # This regex looks for periods followed by whitespace and capital letters
-        # but ignores common abbreviations
-        sentence_endings = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])')
-        sentences = sentence_endings.split(text)
+        if self.token_counter is None:
+            lengths = [len(sentence) for sentence in sentences]
+            separator = 1  # The joining space
+        else:
+            # Word pieces never span a space, so token counts add up when joining
+            sentences, lengths = self._split_long_sentences(sentences)
+            separator = 0
         
-        # Clean sentences
-        sentences = [s.strip() for s in sentences if s.strip()]
+        # offsets[k] = size of sentences[:k] joined, plus one trailing separator,
+        # so sentences[i:j] joined is offsets[j] - offsets[i] - separator long
+        offsets = [0]
+        for length in lengths:
+            offsets.append(offsets[-1] + length + separator)
         
         chunks = []
+        overlap = getattr(self, 'chunk_overlap', 0)
         i = 0
         
         while i < len(sentences):
-            current_chunk = []
-            current_size = 0
-            
-            # Build chunk starting from sentence i
-            for j in range(i, len(sentences)):
-                sentence = sentences[j]
-                
-                # Calculate size with space
-                space_size = 1 if current_chunk else 0
-                total_addition = len(sentence) + space_size
-                
-                # Check if adding this sentence would exceed chunk size
-                if current_size + total_addition > self.chunk_size and current_chunk:
-                    break
-                
-                current_chunk.append(sentence)
-                current_size += total_addition
+            # Take every following sentence that fits; the first one is always taken
+            end = bisect_right(offsets, offsets[i] + separator + self.chunk_size) - 1
+            end = max(end, i + 1)
+            chunks.append(' '.join(sentences[i:end]))
             
-            # Add chunk if we have content
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                
-                # Calculate overlap for next chunk
-                if hasattr(self, 'chunk_overlap') and self.chunk_overlap > 0:
-                    # Find how many sentences to overlap
-                    overlap_size = 0
-                    overlap_sentences = 0
-                    
-                    # Count backwards from end of current chunk
-                    for k in range(len(current_chunk) - 1, -1, -1):
-                        sentence_len = len(current_chunk[k]) + (1 if k < len(current_chunk) - 1 else 0)
-                        if overlap_size + sentence_len <= self.chunk_overlap:
-                            overlap_size += sentence_len
-                            overlap_sentences += 1
-                        else:
-                            break
-                    
-                    # Move start position considering overlap
-                    next_start = i + len(current_chunk) - overlap_sentences
-                    i = max(next_start, i + 1)  # Ensure we make progress
-                else:
-                    # No overlap - move to next sentence after current chunk
-                    i += len(current_chunk)
+            if overlap > 0:
+                # Earliest start whose trailing sentences fit in the overlap
+                next_start = bisect_left(offsets, offsets[end] - separator - overlap, i, end)
+                i = max(next_start, i + 1)  # Ensure we make progress
             else:
-                # No sentences fit, move to next
-                i += 1
+                i = end
         
         return chunks
-
-
-
-
     
-    def process_course_document(self, file_path: str) -> Tuple[Course, List[CourseChunk]]:
+    def _split_long_sentences(self, sentences: List[str]) -> Tuple[List[str], List[int]]:
+        """Count sentence tokens, breaking sentences over the token budget into word runs that fit"""
+        pieces = []
+        lengths = []
+        for sentence, length in zip(sentences, self.token_counter.count(sentences)):
+            if length <= self.chunk_size:
+                pieces.append(sentence)
+                lengths.append(length)
+                continue
+            
+            words = sentence.split(' ')
+            start = 0
+            size = 0
+            for index, word_length in enumerate(self.token_counter.count(words)):
+                if size + word_length > self.chunk_size and index > start:
+                    pieces.append(' '.join(words[start:index]))
+                    lengths.append(size)
+                    start = index
+                    size = 0
+                size += word_length
+            pieces.append(' '.join(words[start:]))
+            lengths.append(size)
+        return pieces, lengths
+    
+    def process_course_document(self, file_path: str) -> Tuple[Course, ChunkBatch]:
         """
         Process a course document with expected format:
         Line 1: Course Title: [title]
@@ -102,158 +124,173 @@ class DocumentProcessor:
         Line 3: Course Instructor: [instructor]
         Following lines: Lesson markers and content
         """
-        content = self.read_file(file_path)
-        filename = os.path.basename(file_path)
-        
-        lines = content.strip().split('\n')
-        
-        # Extract course metadata from first three lines
-        course_title = filename  # Default fallback
-        course_link = None
-        instructor_name = "Unknown"
+        return self._collect(self.iter_course_document(file_path))
+    
+    def process_course_text(self, content: str, file_path: str) -> Tuple[Course, ChunkBatch]:
+        """Process the already-read content of a course document (see process_course_document)"""
+        return self._collect(self._parse_course_lines(content.split('\n'), file_path))
+    
+    def iter_course_document(self, file_path: str) -> Iterator[Tuple[Course, ChunkBatch]]:
+        """
+        Parse a course document while reading it, yielding each lesson's chunks as the lesson completes.
         
-        # Parse course title from first line
-        if len(lines) >= 1 and lines[0].strip():
-            title_match = re.match(r'^Course Title:\s*(.+)$', lines[0].strip(), re.IGNORECASE)
-            if title_match:
-                course_title = title_match.group(1).strip()
-            else:
-                course_title = lines[0].strip()
+        Only the lesson being read is held in memory. Every item carries the
+        same Course object; its metadata is known from the first yield on and
+        its lessons list grows as lessons complete. A document without chunks
+        yields its course once with an empty list. Together the items equal
+        process_course_document's result.
         
-        # Parse remaining lines for course metadata
-        for i in range(1, min(len(lines), 4)):  # Check first 4 lines for metadata
-            line = lines[i].strip()
-            if not line:
-                continue
-                
-            # Try to match course link
-            link_match = re.match(r'^Course Link:\s*(.+)$', line, re.IGNORECASE)
-            if link_match:
-                course_link = link_match.group(1).strip()
-                continue
-                
-            # Try to match instructor
-            instructor_match = re.match(r'^Course Instructor:\s*(.+)$', line, re.IGNORECASE)
-            if instructor_match:
-                instructor_name = instructor_match.group(1).strip()
-                continue
+        Args:
+            file_path: Path to the course document
+            
+        Yields:
+            Tuple of (course, chunks of one lesson)
+        """
+        # Undecodable bytes are dropped, as read_file does when strict decoding fails
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+            yield from self._parse_course_lines((line.rstrip('\n') for line in file), file_path)
+    
+    @staticmethod
+    def _collect(items: Iterator[Tuple[Course, ChunkBatch]]) -> Tuple[Course, ChunkBatch]:
+        course_chunks = ChunkBatch()
+        for course, chunks in items:
+            course_chunks.extend(chunks)
+        return course, course_chunks
+    
+    def _parse_course_lines(self, lines: Iterable[str], file_path: str) -> Iterator[Tuple[Course, ChunkBatch]]:
+        """
+        Single-pass parser behind process_course_text and iter_course_document.
         
-        # Create course object with title as ID
-        course = Course(
-            title=course_title,
-            course_link=course_link,
-            instructor=instructor_name if instructor_name != "Unknown" else None
-        )
+        Line numbers count from the first non-blank line, as if the whole
+        document had been stripped. Header lines are recognized as they
+        arrive; a "Lesson Link:" line is only taken right after its lesson
+        header. Lines after the metadata are kept for the no-lessons fallback
+        only until a lesson produces chunks.
+        """
+        filename = os.path.basename(file_path)
+        course = None
+        line_number = 0
+        start_index = 3
         
-        # Process lessons and create chunks
-        course_chunks = []
         current_lesson = None
         lesson_title = None
         lesson_link = None
         lesson_content = []
+        expect_lesson_link = False
         chunk_counter = 0
+        unchunked_lines = []
         
-        # Start processing from line 4 (after metadata)
-        start_index = 3
-        if len(lines) > 3 and not lines[3].strip():
-            start_index = 4  # Skip empty line after instructor
-        
-        i = start_index
-        while i < len(lines):
-            line = lines[i]
+        for line in lines:
+            stripped = line.strip()
             
-            # Check for lesson markers (e.g., "Lesson 0: Introduction")
-            lesson_match = re.match(r'^Lesson\s+(\d+):\s*(.+)$', line.strip(), re.IGNORECASE)
+            if course is None:
+                if not stripped:
+                    continue  # Leading blank lines are not part of the document
+                # Parse course title from first line
+                title_match = COURSE_TITLE_PATTERN.match(stripped)
+                course = Course(title=title_match.group(1).strip() if title_match else stripped)
+                line_number = 1
+                continue
+            
+            if line_number < 4 and stripped:
+                # Check lines 2-4 for course metadata
+                link_match = COURSE_LINK_PATTERN.match(stripped)
+                if link_match:
+                    course.course_link = link_match.group(1).strip()
+                else:
+                    instructor_match = COURSE_INSTRUCTOR_PATTERN.match(stripped)
+                    if instructor_match:
+                        instructor_name = instructor_match.group(1).strip()
+                        course.instructor = instructor_name if instructor_name != "Unknown" else None
             
+            if line_number == 3 and not stripped:
+                start_index = 4  # Skip empty line after instructor
+            line_number += 1
+            if line_number <= start_index:
+                continue
+            
+            if unchunked_lines is not None:
+                unchunked_lines.append(line)
+            
+            if expect_lesson_link:
+                expect_lesson_link = False
+                link_match = LESSON_LINK_PATTERN.match(stripped)
+                if link_match:
+                    lesson_link = link_match.group(1).strip()
+                    continue  # The link line is not lesson content
+            
+            # Check for lesson markers (e.g., "Lesson 0: Introduction")
+            lesson_match = LESSON_PATTERN.match(stripped)
             if lesson_match:
                 # Process previous lesson if it exists
-                if current_lesson is not None and lesson_content:
-                    lesson_text = '\n'.join(lesson_content).strip()
-                    if lesson_text:
-                        # Add lesson to course
-                        lesson = Lesson(
-                            lesson_number=current_lesson,
-                            title=lesson_title,
-                            lesson_link=lesson_link
-                        )
-                        course.lessons.append(lesson)
-                        
-                        # Create chunks for this lesson
-                        chunks = self.chunk_text(lesson_text)
-                        for idx, chunk in enumerate(chunks):
-                            # For the first chunk of each lesson, add lesson context
-                            if idx == 0:
-                                chunk_with_context = f"Lesson {current_lesson} content: {chunk}"
-                            else:
-                                chunk_with_context = chunk
-                            
-                            course_chunk = CourseChunk(
-                                content=chunk_with_context,
-                                course_title=course.title,
-                                lesson_number=current_lesson,
-                                chunk_index=chunk_counter
-                            )
-                            course_chunks.append(course_chunk)
-                            chunk_counter += 1
+                chunks = self._finish_lesson(course, current_lesson, lesson_title, lesson_link,
+                                             lesson_content, chunk_counter, is_last=False)
+                if chunks:
+                    chunk_counter += len(chunks)
+                    unchunked_lines = None
+                    yield course, chunks
                 
                 # Start new lesson
                 current_lesson = int(lesson_match.group(1))
                 lesson_title = lesson_match.group(2).strip()
                 lesson_link = None
-                
-                # Check if next line is a lesson link
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    link_match = re.match(r'^Lesson Link:\s*(.+)$', next_line, re.IGNORECASE)
-                    if link_match:
-                        lesson_link = link_match.group(1).strip()
-                        i += 1  # Skip the link line so it's not added to content
-                
                 lesson_content = []
+                expect_lesson_link = True
             else:
                 # Add line to current lesson content
                 lesson_content.append(line)
-                
-            i += 1
+        
+        if course is None:
+            # Empty document: the file name serves as the title
+            yield Course(title=filename), ChunkBatch()
+            return
         
         # Process the last lesson
-        if current_lesson is not None and lesson_content:
-            lesson_text = '\n'.join(lesson_content).strip()
-            if lesson_text:
-                lesson = Lesson(
-                    lesson_number=current_lesson,
-                    title=lesson_title,
-                    lesson_link=lesson_link
-                )
-                course.lessons.append(lesson)
-                
-                chunks = self.chunk_text(lesson_text)
-                for idx, chunk in enumerate(chunks):
-                    # For any chunk of each lesson, add lesson context & course title
-                  
-                    chunk_with_context = f"Course {course_title} Lesson {current_lesson} content: {chunk}"
-                    
-                    course_chunk = CourseChunk(
-                        content=chunk_with_context,
-                        course_title=course.title,
-                        lesson_number=current_lesson,
-                        chunk_index=chunk_counter
-                    )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
+        chunks = self._finish_lesson(course, current_lesson, lesson_title, lesson_link,
+                                     lesson_content, chunk_counter, is_last=True)
+        if chunks:
+            yield course, chunks
+            return
         
-        # If no lessons found, treat entire content as one document
-        if not course_chunks and len(lines) > 2:
-            remaining_content = '\n'.join(lines[start_index:]).strip()
-            if remaining_content:
-                chunks = self.chunk_text(remaining_content)
-                for chunk in chunks:
-                    course_chunk = CourseChunk(
-                        content=chunk,
-                        course_title=course.title,
-                        chunk_index=chunk_counter
-                    )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
+        # If no lessons produced chunks, treat entire content as one document
+        remaining_content = '\n'.join(unchunked_lines or []).strip()
+        chunks = ChunkBatch()
+        if remaining_content:
+            for chunk in self.chunk_text(remaining_content):
+                chunks.append(chunk, course.title, None, chunk_counter + len(chunks))
+        yield course, chunks
+    
+    def _finish_lesson(self,
+                       course: Course,
+                       lesson_number: Optional[int],
+                       lesson_title: Optional[str],
+                       lesson_link: Optional[str],
+                       lesson_content: List[str],
+                       chunk_counter: int,
+                       is_last: bool) -> ChunkBatch:
+        """Add a completed lesson to the course and chunk its text"""
+        if lesson_number is None or not lesson_content:
+            return ChunkBatch()
+        lesson_text = '\n'.join(lesson_content).strip()
+        if not lesson_text:
+            return ChunkBatch()
         
-        return course, course_chunks
+        course.lessons.append(Lesson(
+            lesson_number=lesson_number,
+            title=lesson_title,
+            lesson_link=lesson_link
+        ))
+        
+        course_chunks = ChunkBatch()
+        for idx, chunk in enumerate(self.chunk_text(lesson_text)):
+            if is_last:
+                # For any chunk of the last lesson, add lesson context & course title
+                chunk_with_context = f"Course {course.title} Lesson {lesson_number} content: {chunk}"
+            elif idx == 0:
+                # For the first chunk of each lesson, add lesson context
+                chunk_with_context = f"Lesson {lesson_number} content: {chunk}"
+            else:
+                chunk_with_context = chunk
+            
+            course_chunks.append(chunk_with_context, course.title, lesson_number, chunk_counter + idx)
+        return course_chunks
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache of text embeddings.
+
+    Entries are keyed by a hash of the model name and the text, so caches for
+    different models never mix. Only texts missing from the cache are sent to
+    the model, in a single batch.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], Any], model_name: str, max_entries: int = 1024):
+        self.embed = embed
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._encode_seconds = 0.0
+
+    def make_key(self, text: str) -> str:
+        """Hash the model name and text into a cache key"""
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embed texts, encoding only those not already cached.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One float32 vector per text, in input order
+        """
+        keys = [self.make_key(text) for text in texts]
+        vectors: List[np.ndarray] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    vectors[i] = vector
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            positions = list(missing.values())
+            start = time.perf_counter()
+            encoded = self.embed([texts[indexes[0]] for indexes in positions])
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._misses += len(positions)
+                self._hits += sum(len(indexes) - 1 for indexes in positions)  # duplicates within the batch
+                self._encode_seconds += elapsed
+                for key, indexes, vector in zip(missing, positions, encoded):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    vector.setflags(write=False)
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                    for i in indexes:
+                        vectors[i] = vector
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return vectors
+
+    def clear(self):
+        """Remove all cached embeddings"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and the estimated encode time saved by cache hits"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            avg_encode = self._encode_seconds / self._misses if self._misses else 0.0
+            return {
+                "model": self.model_name,
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "encode_ms": round(self._encode_seconds * 1000, 2),
+                "encode_ms_saved": round(avg_encode * self._hits * 1000, 2)
+            }
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one writer per store
+    fcntl = None
+
+
+class EmbeddingStore:
+    """
+    Persistent content-addressed store of chunk embeddings.
+
+    Vectors are keyed by sha1(model name + text) and kept in three files:
+
+    - keys.bin: 20-byte sha1 digests, one per row
+    - vectors.f32: float32 rows of the embedding dimension
+    - meta.json: model name, dimension and number of committed rows
+
+    Both data files are append-only. A row only counts once meta.json has
+    been updated, so a crash mid-write never exposes a partial vector.
+    Appends hold an flock on a lock file and first pick up rows committed
+    by other processes, so several workers can share one store.
+    """
+
+    KEY_SIZE = 20
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        self._keys_path = os.path.join(path, "keys.bin")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock_path = os.path.join(path, "lock")
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._dimensions: Optional[int] = None
+        self._count = 0
+        self._vectors: Optional[np.memmap] = None
+        self._stats = {"reused": 0, "computed": 0}
+
+        os.makedirs(path, exist_ok=True)
+        with self._file_lock():
+            self._load()
+
+    def make_key(self, text: str) -> bytes:
+        """Hash the model name and text into a row key"""
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).digest()
+
+    def contains(self, text: str) -> bool:
+        """Check whether a text's embedding is stored"""
+        with self._lock:
+            return self.make_key(text) in self._index
+
+    def get_embeddings(self, texts: List[str], embed: Callable[[List[str]], Any]) -> np.ndarray:
+        """
+        Get embeddings for texts, computing and persisting only unseen ones.
+
+        Args:
+            texts: Texts to embed
+            embed: Embedding function called once with all unseen texts
+
+        Returns:
+            (len(texts), dimensions) float32 array in input order
+        """
+        if not texts:
+            return np.zeros((0, self._dimensions or 0), dtype=np.float32)
+        keys = [self.make_key(text) for text in texts]
+
+        with self._lock:
+            missing: Dict[bytes, int] = {}
+            for i, key in enumerate(keys):
+                if key not in self._index and key not in missing:
+                    missing[key] = i
+
+        if missing:
+            computed = np.asarray(embed([texts[i] for i in missing.values()]), dtype=np.float32)
+            with self._lock:
+                self._append(list(missing), computed)
+
+        with self._lock:
+            self._stats["computed"] += len(missing)
+            self._stats["reused"] += len(texts) - len(missing)
+            vectors = self._open_vectors()
+            return np.array([vectors[self._index[key]] for key in keys], dtype=np.float32).reshape(len(keys), -1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of stored vectors and how many were reused vs computed"""
+        with self._lock:
+            return {**self._stats, "vectors": self._count, "model": self.model_name}
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold the cross-process write lock of the store directory"""
+        with open(self._lock_path, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self._meta_path):
+            return None
+        with open(self._meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load(self):
+        """Read committed rows; files written for a different model are discarded (caller holds the file lock)"""
+        meta = self._read_meta()
+        if meta is None:
+            self._reset()
+            return
+        if meta.get("model") != self.model_name:
+            print(f"Embedding store at {self.path} was built with {meta.get('model')} - starting fresh")
+            self._reset()
+            return
+
+        self._index = {}
+        self._count = 0
+        self._read_new_rows(meta)
+
+        # Drop bytes from a write that never got committed
+        self._truncate()
+
+    def _read_new_rows(self, meta: Dict[str, Any]):
+        """Index rows committed since this store last read meta.json, e.g. by another process"""
+        start, count = self._count, meta["count"]
+        with open(self._keys_path, 'rb') as f:
+            f.seek(start * self.KEY_SIZE)
+            raw = f.read((count - start) * self.KEY_SIZE)
+        for i in range(count - start):
+            self._index[raw[i * self.KEY_SIZE:(i + 1) * self.KEY_SIZE]] = start + i
+        self._dimensions = meta["dimensions"]
+        self._count = count
+        self._vectors = None
+
+    def _reset(self):
+        self._index = {}
+        self._dimensions = None
+        self._count = 0
+        self._vectors = None
+        for file_path in (self._keys_path, self._vectors_path):
+            open(file_path, 'wb').close()
+        self._write_meta()
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray):
+        """Append rows and commit them by rewriting meta.json (caller holds the lock)"""
+        with self._file_lock():
+            meta = self._read_meta()
+            if meta is None or meta.get("model") != self.model_name or meta["count"] < self._count:
+                self._load()
+            elif meta["count"] > self._count:
+                self._read_new_rows(meta)
+            # Rows are located by position, so bytes a crashed writer left behind must go first
+            self._truncate()
+            self._append_rows(keys, vectors)
+
+    def _append_rows(self, keys: List[bytes], vectors: np.ndarray):
+        """Append rows not stored yet and commit them (caller holds both locks)"""
+        keys_to_write = []
+        rows = []
+        for key, vector in zip(keys, vectors):
+            if key not in self._index:
+                self._index[key] = self._count + len(keys_to_write)
+                keys_to_write.append(key)
+                rows.append(vector)
+        if not keys_to_write:
+            return
+
+        if self._dimensions is None:
+            self._dimensions = vectors.shape[1]
+        with open(self._keys_path, 'ab') as f:
+            f.write(b''.join(keys_to_write))
+        with open(self._vectors_path, 'ab') as f:
+            f.write(np.ascontiguousarray(rows, dtype=np.float32).tobytes())
+
+        self._count += len(keys_to_write)
+        self._vectors = None
+        self._write_meta()
+
+    def _write_meta(self):
+        temp_path = self._meta_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model_name, "dimensions": self._dimensions, "count": self._count}, f)
+        os.replace(temp_path, self._meta_path)
+
+    def _truncate(self):
+        with open(self._keys_path, 'r+b') as f:
+            f.truncate(self._count * self.KEY_SIZE)
+        with open(self._vectors_path, 'r+b') as f:
+            f.truncate(self._count * (self._dimensions or 0) * 4)
+
+    def _open_vectors(self) -> np.ndarray:
+        """Memory-map the committed rows (caller holds the lock)"""
+        if self._vectors is None and self._count:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode='r', shape=(self._count, self._dimensions)
+            )
+        return self._vectors
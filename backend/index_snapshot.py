@@ -0,0 +1,330 @@
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from numpy_store import filter_mask, nearest_rows, select_fields
+from quantization import QUANTIZATIONS, measure_recall, nearest_rows_quantized, quantize_blocks, recall_queries
+
+
+class SnapshotCollection:
+    """
+    Read-only collection served from a memory-mapped index snapshot.
+
+    A snapshot stores one directory per collection:
+
+        header.json       format, row count, code tables of indexed fields, recall of quantized search
+        vectors.npy       float32 embedding matrix, one row per record
+        vectors.int8.npy + scales.int8.npy
+                          quantized copy of the matrix with a scale per row
+        norms.npy         float32 squared norm of each row
+        offsets.npy       int64 byte offsets of each record in records.bin (count + 1)
+        records.bin       UTF-8 JSON [id, document, metadata] per record
+        <field>.codes.npy int32 code of an indexed metadata field per row
+
+    Every file is mapped read-only, so opening costs the same for any index
+    size and processes serving the same snapshot share one copy of it in the
+    page cache. Records are decoded only for the rows a call returns.
+    Implements the reading part of the Chroma collection API (query, get,
+    count); writes raise.
+
+    With quantization "int8", queries scan the quantized copy
+    and re-score the n_results * rescore_factor best candidates against the
+    float32 matrix, of which only those rows are read.
+    """
+
+    FORMAT = 2
+
+    def __init__(self, directory: Optional[str], quantization: str = "float32", rescore_factor: int = 4):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.directory = directory
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.recall_report: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._rows: Optional[Dict[str, int]] = None
+        self._count = 0
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._records: Optional[mmap.mmap] = None
+        # Quantized copy scanned for candidates (None: scan the float32 matrix)
+        self._data: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._codes: Dict[str, np.ndarray] = {}
+        self._code_of: Dict[str, Dict[Any, int]] = {}
+
+        if directory is not None and os.path.exists(os.path.join(directory, "header.json")):
+            self._open()
+
+    def count(self) -> int:
+        """Number of stored records"""
+        return self._count
+
+    def query(self,
+              query_embeddings: List[Any],
+              n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = ("metadatas", "documents", "distances")) -> Dict[str, Any]:
+        """Nearest neighbours of each query embedding (re-scored if quantized), optionally filtered by metadata"""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        candidates = None if where is None else np.flatnonzero(self._match(where))
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": None}
+        for query in queries:
+            if self._data is not None:
+                rows, distances = nearest_rows_quantized(
+                    self._data, self._scales, self._matrix, self._norms, query, n_results, candidates, self.rescore_factor
+                )
+            else:
+                rows, distances = nearest_rows(self._matrix, self._norms, query, n_results, candidates)
+            records = [self._record(row) for row in rows]
+            results["ids"].append([record[0] for record in records])
+            results["documents"].append([record[1] for record in records])
+            results["metadatas"].append([record[2] for record in records])
+            results["distances"].append(distances.tolist())
+        return select_fields(results, include, ("ids", "documents", "metadatas", "distances", "embeddings"))
+
+    def get(self,
+            ids: Optional[List[str]] = None,
+            where: Optional[Dict[str, Any]] = None,
+            include: Sequence[str] = ("metadatas", "documents")) -> Dict[str, Any]:
+        """Fetch records by ID and/or metadata filter"""
+        if ids is not None:
+            row_of = self._id_rows()
+            rows = [row_of[chunk_id] for chunk_id in ids if chunk_id in row_of]
+        else:
+            rows = list(range(self._count))
+        if where is not None:
+            mask = self._match(where)
+            rows = [row for row in rows if mask[row]]
+
+        records = [self._record(row) for row in rows]
+        results = {
+            "ids": [record[0] for record in records],
+            "documents": [record[1] for record in records],
+            "metadatas": [record[2] for record in records],
+            "embeddings": np.array(self._matrix[rows]) if rows else np.zeros((0, self._matrix.shape[1]), dtype=np.float32)
+        }
+        return select_fields(results, include, ("ids", "documents", "metadatas", "embeddings"))
+
+    def add(self, *args, **kwargs):
+        raise RuntimeError("Index snapshot is read-only")
+
+    upsert = add
+    delete = add
+
+    def _open(self):
+        with open(os.path.join(self.directory, "header.json"), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header["format"] != self.FORMAT:
+            raise ValueError(f"Unsupported index snapshot format {header['format']}")
+
+        self._count = header["count"]
+        self.recall_report = header.get("quantization", {})
+        if self._count == 0:
+            return
+        self._matrix = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode='r')
+        self._norms = np.load(os.path.join(self.directory, "norms.npy"), mmap_mode='r')
+        self._offsets = np.load(os.path.join(self.directory, "offsets.npy"), mmap_mode='r')
+        with open(os.path.join(self.directory, "records.bin"), 'rb') as f:
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for field, values in header["fields"].items():
+            self._codes[field] = np.load(os.path.join(self.directory, f"{field}.codes.npy"), mmap_mode='r')
+            self._code_of[field] = {value: code for code, value in enumerate(values)}
+        if self.quantization != "float32":
+            self._data = np.load(os.path.join(self.directory, f"vectors.{self.quantization}.npy"), mmap_mode='r')
+            if self.quantization == "int8":
+                self._scales = np.load(os.path.join(self.directory, "scales.int8.npy"), mmap_mode='r')
+
+    def _record(self, row: int):
+        return json.loads(self._records[int(self._offsets[row]):int(self._offsets[row + 1])])
+
+    def _id_rows(self) -> Dict[str, int]:
+        # Built on first lookup by ID, never at open
+        with self._lock:
+            if self._rows is None:
+                self._rows = {self._record(row)[0]: row for row in range(self._count)}
+            return self._rows
+
+    def _match(self, where: Dict[str, Any]) -> np.ndarray:
+        return filter_mask(
+            where, self._count, self._codes, self._code_of,
+            lambda field: ((self._record(row)[2] or {}).get(field) for row in range(self._count))
+        )
+
+
+def write_collection(directory: str, data: Dict[str, Any], indexed_fields: Sequence[str] = ()):
+    """
+    Write one collection of a snapshot (recall is measured separately, see measure_collection_recall).
+
+    Args:
+        directory: Collection directory to create
+        data: Result of collection.get(include=["documents", "metadatas", "embeddings"])
+        indexed_fields: Metadata fields stored as code arrays for fast filtering
+    """
+    os.makedirs(directory, exist_ok=True)
+    ids, documents, metadatas = data["ids"], data["documents"], data["metadatas"]
+    count = len(ids)
+    fields: Dict[str, List[Any]] = {}
+
+    if count:
+        vectors = np.ascontiguousarray(np.asarray(data["embeddings"], dtype=np.float32).reshape(count, -1))
+        norms = np.einsum('ij,ij->i', vectors, vectors)
+        np.save(os.path.join(directory, "vectors.npy"), vectors)
+        np.save(os.path.join(directory, "norms.npy"), norms)
+        for mode in QUANTIZATIONS[1:]:
+            quantized = np.lib.format.open_memmap(
+                os.path.join(directory, f"vectors.{mode}.npy"), mode='w+', dtype=mode, shape=vectors.shape
+            )
+            quantized, scales = quantize_blocks(vectors, mode, out=quantized)
+            quantized.flush()
+            if scales is not None:
+                np.save(os.path.join(directory, f"scales.{mode}.npy"), scales)
+            del quantized
+
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        with open(os.path.join(directory, "records.bin"), 'wb') as f:
+            for row, record in enumerate(zip(ids, documents, metadatas)):
+                encoded = json.dumps(record).encode('utf-8')
+                f.write(encoded)
+                offsets[row + 1] = offsets[row] + len(encoded)
+        np.save(os.path.join(directory, "offsets.npy"), offsets)
+
+        for field in indexed_fields:
+            code_of: Dict[Any, int] = {}
+            codes = np.array([code_of.setdefault((metadata or {}).get(field), len(code_of)) for metadata in metadatas],
+                             dtype=np.int32)
+            np.save(os.path.join(directory, f"{field}.codes.npy"), codes)
+            fields[field] = list(code_of)
+
+    header = {"format": SnapshotCollection.FORMAT, "count": count, "fields": fields, "quantization": {}}
+    with open(os.path.join(directory, "header.json"), 'w', encoding='utf-8') as f:
+        json.dump(header, f)
+
+
+def measure_collection_recall(directory: str, rescore_factor: int = 4) -> Dict[str, Any]:
+    """
+    Measure recall of quantized search on a written collection and record it in its header.
+
+    Returns:
+        Recall report of each quantized mode (see quantization.measure_recall)
+    """
+    header_path = os.path.join(directory, "header.json")
+    with open(header_path, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+
+    recall_report: Dict[str, Any] = {}
+    if header["count"]:
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode='r')
+        norms = np.load(os.path.join(directory, "norms.npy"), mmap_mode='r')
+        queries, exact = recall_queries(vectors, norms)
+        for mode in QUANTIZATIONS[1:]:
+            quantized = np.load(os.path.join(directory, f"vectors.{mode}.npy"), mmap_mode='r')
+            scales_path = os.path.join(directory, f"scales.{mode}.npy")
+            scales = np.load(scales_path, mmap_mode='r') if os.path.exists(scales_path) else None
+            recall_report[mode] = measure_recall(vectors, norms, quantized, scales, queries, exact, rescore_factor)
+
+    header["quantization"] = recall_report
+    with open(header_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f)
+    return recall_report
+
+
+def current_snapshot(path: str) -> Optional[str]:
+    """Directory of the published snapshot under path, or None"""
+    try:
+        with open(os.path.join(path, "CURRENT"), 'r', encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(path, name) if name else None
+
+
+def read_snapshot_info(path: str) -> Optional[Dict[str, Any]]:
+    """Info written with the published snapshot (generation, corpus version, counts)"""
+    directory = current_snapshot(path)
+    if directory is None:
+        return None
+    try:
+        with open(os.path.join(directory, "snapshot.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publish_snapshot(path: str, collections: Dict[str, Any], indexed_fields: Dict[str, Sequence[str]],
+                     corpus_version: str, rescore_factor: int = 4,
+                     recall_collections: Sequence[str] = (),
+                     extra_files: Optional[Dict[str, Callable[[str], None]]] = None) -> str:
+    """
+    Write a new snapshot generation and make it current.
+
+    Recall of quantized search is measured once for the generation, only
+    on the collections named in recall_collections, before it is published.
+    extra_files maps file names to writers called with the file's path
+    inside the generation, so derived indexes are published with it.
+    The generation is written to a fresh directory and published by
+    atomically replacing the CURRENT pointer file. Older published
+    generations are removed; processes that still map them keep reading
+    the unlinked files. Newer generations and in-progress ".tmp"
+    directories belong to concurrent publishers and are left alone.
+
+    Returns:
+        Name of the published generation
+    """
+    os.makedirs(path, exist_ok=True)
+    started_at = time.perf_counter()
+    generation = f"snapshot-{time.time_ns()}"
+    temp_directory = os.path.join(path, generation + ".tmp")
+
+    counts, recall = {}, {}
+    for name, collection in collections.items():
+        data = collection.get(include=["documents", "metadatas", "embeddings"])
+        write_collection(os.path.join(temp_directory, name), data, indexed_fields.get(name, ()))
+        counts[name] = len(data["ids"])
+    for name, write in (extra_files or {}).items():
+        write(os.path.join(temp_directory, name))
+    write_seconds = time.perf_counter() - started_at
+
+    for name in recall_collections:
+        if name in collections:
+            recall[name] = measure_collection_recall(os.path.join(temp_directory, name), rescore_factor)
+    info = {
+        "format": SnapshotCollection.FORMAT,
+        "generation": generation,
+        "corpus_version": corpus_version,
+        "counts": counts,
+        "quantization": recall,
+        "created_at": time.time(),
+        "write_seconds": round(write_seconds, 3),
+        "recall_seconds": round(time.perf_counter() - started_at - write_seconds, 3)
+    }
+    with open(os.path.join(temp_directory, "snapshot.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    os.replace(temp_directory, os.path.join(path, generation))
+
+    pointer_path = os.path.join(path, f"CURRENT.{generation}.tmp")
+    with open(pointer_path, 'w', encoding='utf-8') as f:
+        f.write(generation)
+    os.replace(pointer_path, os.path.join(path, "CURRENT"))
+
+    published_ns = _generation_ns(generation)
+    for name in os.listdir(path):
+        ns = _generation_ns(name)
+        if ns is not None and ns < published_ns:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return generation
+
+
+def _generation_ns(name: str) -> Optional[int]:
+    """Timestamp of a published generation directory name, or None for anything else (including .tmp)"""
+    if not name.startswith("snapshot-"):
+        return None
+    try:
+        return int(name[len("snapshot-"):])
+    except ValueError:
+        return None
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ManifestEntry:
+    """What was ingested from one course document"""
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    course_title: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+class IngestManifest:
+    """
+    Persisted record of ingested course documents.
+
+    A file whose size and mtime match its entry is skipped without being
+    read. A file whose content hash still matches only has its stat
+    refreshed. Paths are stored absolute.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, ManifestEntry] = {}
+        self._load()
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Hash document text"""
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Hash a document's text while reading it (same result as hash_content of its text)"""
+        digest = hashlib.sha1()
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                digest.update(line.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, file_path: str) -> Optional[ManifestEntry]:
+        """Get the entry for a file, if it was ingested before"""
+        with self._lock:
+            return self._entries.get(os.path.abspath(file_path))
+
+    def is_current(self, file_path: str) -> bool:
+        """Check whether a file's size and mtime still match its entry"""
+        entry = self.get(file_path)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns
+
+    def entries_under(self, folder_path: str) -> List[ManifestEntry]:
+        """Get entries for files directly inside a folder"""
+        folder = os.path.abspath(folder_path)
+        with self._lock:
+            return [entry for path, entry in self._entries.items() if os.path.dirname(path) == folder]
+
+    def record(self, file_path: str, content_hash: str, course_title: str, chunk_ids: List[str]):
+        """Record a file as ingested with its current stat"""
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        with self._lock:
+            self._entries[path] = ManifestEntry(
+                path=path,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                content_hash=content_hash,
+                course_title=course_title,
+                chunk_ids=list(chunk_ids)
+            )
+
+    def touch(self, file_path: str):
+        """Refresh the stat of a file whose content did not change"""
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(file_path))
+            if entry is not None:
+                entry.size = stat.st_size
+                entry.mtime_ns = stat.st_mtime_ns
+
+    def remove(self, file_path: str):
+        """Forget a file"""
+        with self._lock:
+            self._entries.pop(os.path.abspath(file_path), None)
+
+    def clear(self):
+        """Forget all files"""
+        with self._lock:
+            self._entries.clear()
+
+    def save(self):
+        """Write the manifest atomically"""
+        with self._lock:
+            data = {"version": 1, "files": [asdict(entry) for entry in self._entries.values()]}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data.get("files", []):
+                entry = ManifestEntry(**item)
+                self._entries[entry.path] = entry
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading ingestion manifest {self.path}: {e} - starting fresh")
+            self._entries = {}
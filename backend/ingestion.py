@@ -0,0 +1,512 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from document_processor import DocumentProcessor
+from ingest_manifest import IngestManifest
+from models import ChunkBatch, Course
+from parse_cache import ParseCache
+from token_counter import TokenCounter, TokenReport, load_token_counter
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+def parse_course_text(content: str,
+                      file_path: str,
+                      chunk_size: int,
+                      chunk_overlap: int,
+                      token_model: Optional[Tuple[str, int]] = None) -> Tuple[str, Course, ChunkBatch, float]:
+    """Parse and chunk one course document's text (runs in a worker process)"""
+    started_at = time.perf_counter()
+    # Token-based chunking loads the tokenizer once per worker process
+    token_counter = load_token_counter(*token_model) if token_model else None
+    processor = DocumentProcessor(chunk_size, chunk_overlap, token_counter)
+    course, chunks = processor.process_course_text(content, file_path)
+    return file_path, course, chunks, time.perf_counter() - started_at
+
+
+@dataclass
+class _Document:
+    """A course document (or one part of a streamed document) moving through the pipeline"""
+    file_path: str
+    content_hash: str
+    content: Optional[str] = None
+    course: Optional[Course] = None
+    chunks: ChunkBatch = field(default_factory=ChunkBatch)
+    first_part: bool = True
+    last_part: bool = True
+
+
+class StageStats:
+    """Throughput and utilization counters for one ingestion stage"""
+
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self.files = 0
+        self.chunks = 0
+        self.busy = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def record(self, files: int, chunks: int, busy: float):
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now - busy
+        self.finished_at = now
+        self.files += files
+        self.chunks += chunks
+        self.busy += busy
+
+    def to_dict(self, since: float, wall: float) -> Dict[str, Any]:
+        seconds = (self.finished_at or since) - (self.started_at or since)
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "seconds": round(seconds, 3),
+            "files_per_s": round(self.files / seconds, 2) if seconds > 0 else 0.0,
+            "chunks_per_s": round(self.chunks / seconds, 2) if seconds > 0 else 0.0,
+            "busy_seconds": round(self.busy, 3),
+            # Share of the run this stage spent working rather than waiting on its queues
+            "utilization": round(self.busy / (wall * self.workers), 3) if wall > 0 else 0.0
+        }
+
+
+class CourseIngestor:
+    """
+    Staged course ingestion pipeline: read → parse/chunk → embed → write.
+
+    Each stage runs in its own thread and hands work to the next through a
+    bounded queue, so a slow stage applies backpressure instead of letting
+    parsed courses pile up in memory. Parsing and chunking run in a process
+    pool. Embedding works in batches, so embedding batch N+1 overlaps with
+    the Chroma write of batch N. The writer thread is the only code that
+    touches Chroma.
+
+    Files of at least stream_threshold bytes are never read whole: they are
+    parsed while being read and handed on in batch-sized parts as lessons
+    complete, so their embedding starts before the file is fully read.
+
+    With a parse cache, documents whose content was parsed before with the
+    same chunker settings skip parsing.
+
+    With a token counter, the embed stage also reports the token lengths of
+    the chunks it passes on and how many the embedding model truncates.
+    """
+
+    def __init__(self,
+                 vector_store,
+                 document_processor: DocumentProcessor,
+                 workers: int,
+                 batch_size: int = 64,
+                 queue_size: int = 4,
+                 stream_threshold: int = 16 * 1024 * 1024,
+                 token_counter: Optional[TokenCounter] = None,
+                 parse_cache: Optional[ParseCache] = None):
+        self.vector_store = vector_store
+        self.document_processor = document_processor
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.stream_threshold = stream_threshold
+        self.token_counter = token_counter
+        self.parse_cache = parse_cache
+        self._last_stats: Optional[Dict[str, Any]] = None
+
+    def ingest(self,
+               file_paths: Iterable[str],
+               skip_titles: Set[str],
+               manifest: Optional[IngestManifest] = None) -> Tuple[int, int]:
+        """
+        Parse and store course documents.
+
+        Without a manifest, courses whose title already exists are skipped.
+        With one, files whose content hash matches their entry are skipped
+        as long as their course is still stored (a course lost from the store,
+        e.g. after the store was wiped, is ingested again).
+        A course that is already stored under the same title is synced chunk
+        by chunk (only changed chunks are re-embedded, in the writer), and a
+        course the file produced under an older title is deleted. The
+        manifest is updated as courses are written.
+
+        Args:
+            file_paths: Course documents to ingest
+            skip_titles: Titles that must not be ingested again
+            manifest: Optional ingestion manifest
+
+        Returns:
+            Tuple of (courses added, chunks added)
+        """
+        file_paths = list(file_paths)
+        started_at = time.perf_counter()
+        stats = {
+            "read": StageStats(),
+            "parse": StageStats(self.workers),
+            "embed": StageStats(),
+            "write": StageStats()
+        }
+        read_queue = StageQueue(self.queue_size)
+        parse_queue = StageQueue(self.queue_size)
+        embed_queue = StageQueue(self.queue_size)
+        totals = {"courses": 0, "chunks": 0, "unchanged": 0, "replaced": 0, "reused_embeddings": 0, "computed_embeddings": 0}
+        token_report = TokenReport(self.token_counter.max_seq_length) if self.token_counter else None
+        stored_titles = set(self.vector_store.get_existing_course_titles()) if manifest is not None else set()
+
+        stages = [
+            self._start_stage("read", self._read_files, None, read_queue, stats["read"], file_paths, manifest, stored_titles, totals),
+            self._start_stage("parse", self._parse_files, read_queue, parse_queue, stats["parse"], len(file_paths)),
+            self._start_stage("embed", self._embed_courses, parse_queue, embed_queue, stats["embed"], set(skip_titles), manifest is not None, token_report),
+            self._start_stage("writer", self._write_batches, embed_queue, None, stats["write"], totals, manifest)
+        ]
+        for stage in stages:
+            stage.join()
+
+        wall = time.perf_counter() - started_at
+        self._last_stats = {
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "seconds": round(wall, 3),
+            "unchanged_files": totals["unchanged"],
+            "replaced_courses": totals["replaced"],
+            "reused_embeddings": totals["reused_embeddings"],
+            "computed_embeddings": totals["computed_embeddings"],
+            "stages": {name: stage_stats.to_dict(started_at, wall) for name, stage_stats in stats.items()},
+            "tokens": token_report.to_dict() if token_report else None
+        }
+        return totals["courses"], totals["chunks"]
+
+    def get_last_stats(self) -> Optional[Dict[str, Any]]:
+        """Get per-stage throughput and utilization of the most recent ingestion"""
+        return self._last_stats
+
+    @staticmethod
+    def _start_stage(name: str, target: Callable, source: Optional["StageQueue"], output: Optional["StageQueue"], *args) -> threading.Thread:
+        """Run a stage in its own thread, always closing its output queue"""
+        def run():
+            try:
+                target(source, output, *args)
+            except Exception as e:
+                print(f"Error in ingestion {name} stage: {e}")
+                # Keep consuming so the stages before this one never block on a full queue
+                if source is not None:
+                    source.drain()
+            finally:
+                if output is not None:
+                    output.close()
+
+        thread = threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _read_files(self,
+                    source: None,
+                    output: "StageQueue",
+                    stats: StageStats,
+                    file_paths: List[str],
+                    manifest: Optional[IngestManifest],
+                    stored_titles: Set[str],
+                    totals: Dict[str, int]):
+        """Read stage: load document text, dropping files whose content is unchanged and still stored"""
+        for file_path in file_paths:
+            started_at = time.perf_counter()
+            try:
+                if os.path.getsize(file_path) >= self.stream_threshold:
+                    # Large file: only hash it here, the parse stage streams it
+                    content = None
+                    content_hash = IngestManifest.hash_file(file_path)
+                else:
+                    content = self.document_processor.read_file(file_path)
+                    content_hash = IngestManifest.hash_content(content)
+            except Exception as e:
+                print(f"Error processing {os.path.basename(file_path)}: {e}")
+                continue
+            stats.record(1, 0, time.perf_counter() - started_at)
+
+            entry = manifest.get(file_path) if manifest else None
+            if entry is not None and entry.content_hash == content_hash and entry.course_title in stored_titles:
+                # Only the mtime changed
+                manifest.touch(file_path)
+                totals["unchanged"] += 1
+                continue
+            output.put(_Document(file_path, content_hash, content=content))
+
+    def _parse_files(self, source: "StageQueue", output: "StageQueue", stats: StageStats, file_count: int):
+        """Parse/chunk stage: turn document text into a course and its chunks"""
+        processor = self.document_processor
+        if self.workers == 1 or file_count <= 1:
+            for document in source:
+                if document.content is None:
+                    self._stream_document(document, output, stats)
+                    continue
+                if self._load_cached_parse(document, output, stats):
+                    continue
+                started_at = time.perf_counter()
+                try:
+                    document.course, document.chunks = processor.process_course_text(document.content, document.file_path)
+                except Exception as e:
+                    print(f"Error processing {os.path.basename(document.file_path)}: {e}")
+                    continue
+                document.content = None
+                stats.record(1, len(document.chunks), time.perf_counter() - started_at)
+                self._cache_parse(document)
+                output.put(document)
+            return
+
+        token_counter = processor.token_counter
+        token_model = (token_counter.model_name, token_counter.max_seq_length) if token_counter else None
+        # Spawned (not forked) workers - the server process is multi-threaded
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, file_count),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            documents = iter(source)
+            pending = {}
+            while True:
+                # Keep at most one document per worker in flight
+                while len(pending) < self.workers:
+                    document = next(documents, None)
+                    if document is None:
+                        break
+                    if document.content is None:
+                        # Parsed here while submitted documents keep the pool busy
+                        self._stream_document(document, output, stats)
+                        continue
+                    if self._load_cached_parse(document, output, stats):
+                        continue
+                    future = pool.submit(
+                        parse_course_text, document.content, document.file_path,
+                        processor.chunk_size, processor.chunk_overlap, token_model
+                    )
+                    document.content = None
+                    pending[future] = document
+                if not pending:
+                    return
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    document = pending.pop(future)
+                    try:
+                        _, document.course, document.chunks, busy = future.result()
+                    except Exception as e:
+                        print(f"Error processing {os.path.basename(document.file_path)}: {e}")
+                        continue
+                    stats.record(1, len(document.chunks), busy)
+                    self._cache_parse(document)
+                    output.put(document)
+
+    def _load_cached_parse(self, document: _Document, output: "StageQueue", stats: StageStats) -> bool:
+        """Pass a document on with its cached parse, if there is one"""
+        if self.parse_cache is None:
+            return False
+        started_at = time.perf_counter()
+        cached = self.parse_cache.get(document.content_hash)
+        if cached is None:
+            return False
+        document.course, document.chunks = cached
+        document.content = None
+        stats.record(1, len(document.chunks), time.perf_counter() - started_at)
+        output.put(document)
+        return True
+
+    def _cache_parse(self, document: _Document):
+        if self.parse_cache is None:
+            return
+        try:
+            self.parse_cache.put(document.content_hash, document.course, document.chunks)
+        except OSError as e:
+            print(f"Error caching parse of {os.path.basename(document.file_path)}: {e}")
+
+    def _stream_document(self, document: _Document, output: "StageQueue", stats: StageStats):
+        """Parse a large document while reading it, passing its chunks on in batch-sized parts"""
+        started_at = time.perf_counter()
+        part = ChunkBatch()
+        first_part = True
+        try:
+            for course, chunks in self.document_processor.iter_course_document(document.file_path):
+                part.extend(chunks)
+                if len(part) >= self.batch_size:
+                    stats.record(1 if first_part else 0, len(part), time.perf_counter() - started_at)
+                    output.put(_Document(document.file_path, document.content_hash, course=course,
+                                         chunks=part, first_part=first_part, last_part=False))
+                    part = ChunkBatch()
+                    first_part = False
+                    started_at = time.perf_counter()
+        except Exception as e:
+            # Parts already sent stay stored; without a manifest entry the file is synced on the next run
+            print(f"Error processing {os.path.basename(document.file_path)}: {e}")
+            return
+        stats.record(1 if first_part else 0, len(part), time.perf_counter() - started_at)
+        output.put(_Document(document.file_path, document.content_hash, course=course,
+                             chunks=part, first_part=first_part, last_part=True))
+
+    def _embed_courses(self,
+                       source: "StageQueue",
+                       output: "StageQueue",
+                       stats: StageStats,
+                       existing_titles: Set[str],
+                       sync_existing: bool,
+                       token_report: Optional[TokenReport]):
+        """Embed stage: embed new courses' chunks in batches"""
+        skipped: Set[str] = set()
+        collecting: Dict[str, _Document] = {}
+        for document in source:
+            course, chunks = document.course, document.chunks
+            if document.file_path in skipped:
+                continue
+            if document.first_part:
+                if not course:
+                    continue
+                if course.title in existing_titles:
+                    print(f"Course already exists: {course.title} - skipping")
+                    skipped.add(document.file_path)
+                    continue
+                existing_titles.add(course.title)
+
+            if token_report is not None and chunks:
+                token_report.record(self.token_counter.sequence_lengths(chunks.contents))
+
+            if document.file_path in collecting:
+                # Later part of a streamed course that is being synced
+                collected = collecting[document.file_path]
+                collected.chunks.extend(chunks)
+                if document.last_part:
+                    del collecting[document.file_path]
+                    collected.last_part = True
+                    output.put((collected, None, None, True, True))
+                continue
+
+            if document.first_part and sync_existing and course.title in self.vector_store.get_existing_course_titles():
+                # Stored course: the writer diffs chunks and embeds only what changed,
+                # which needs all of a streamed course's chunks
+                if document.last_part:
+                    output.put((document, None, None, True, True))
+                else:
+                    collecting[document.file_path] = document
+                continue
+
+            # Courses without chunks still need their catalog entry
+            for start in range(0, max(len(chunks), 1), self.batch_size):
+                batch = chunks[start:start + self.batch_size]
+                is_first = document.first_part and start == 0
+                started_at = time.perf_counter()
+                try:
+                    embeddings = self.vector_store.embed_documents(batch.contents) if batch else None
+                except Exception as e:
+                    print(f"Error embedding course {course.title}: {e}")
+                    skipped.add(document.file_path)
+                    break
+                stats.record(1 if is_first else 0, len(batch), time.perf_counter() - started_at)
+                is_last = document.last_part and start + self.batch_size >= len(chunks)
+                output.put((document, batch, embeddings, is_first, is_last))
+
+    def _write_batches(self,
+                       source: "StageQueue",
+                       output: None,
+                       stats: StageStats,
+                       totals: Dict[str, int],
+                       manifest: Optional[IngestManifest]):
+        """Write stage: the only place that adds, replaces and records courses in the vector store"""
+        failed: Set[str] = set()
+        # Chunks written so far per file, across a streamed course's parts
+        written_ids: Dict[str, List[str]] = {}
+        written_counts: Dict[str, int] = {}
+        for document, batch, embeddings, is_first, is_last in source:
+            course = document.course
+            if document.file_path in failed:
+                continue
+
+            started_at = time.perf_counter()
+            try:
+                if is_first and manifest is not None:
+                    self._remove_previous(document, manifest, totals)
+                if batch is None:
+                    written = self._sync_course(document, totals)
+                else:
+                    # A streamed course's lessons are only complete with its last part
+                    whole = document.first_part and document.last_part
+                    if (is_first and whole) or (is_last and not whole):
+                        self.vector_store.add_course_metadata(course)
+                    if batch:
+                        self.vector_store.add_course_content(batch, embeddings)
+                    if manifest is not None:
+                        written_ids.setdefault(document.file_path, []).extend(self.vector_store.chunk_ids(batch))
+                    written = len(batch)
+                    written_counts[document.file_path] = written_counts.get(document.file_path, 0) + written
+            except Exception as e:
+                print(f"Error adding course {course.title}: {e}")
+                failed.add(document.file_path)
+                continue
+            stats.record(1 if is_first else 0, written, time.perf_counter() - started_at)
+
+            totals["chunks"] += written
+            if is_last:
+                totals["courses"] += 1
+                if batch is not None:
+                    print(f"Added new course: {course.title} ({written_counts.pop(document.file_path, 0)} chunks)")
+                if manifest is not None:
+                    self._discard_previous_parse(document, manifest)
+                    if batch is None:
+                        chunk_ids = self.vector_store.chunk_ids(document.chunks)
+                    else:
+                        chunk_ids = written_ids.pop(document.file_path, [])
+                    manifest.record(document.file_path, document.content_hash, course.title, chunk_ids)
+
+    def _sync_course(self, document: _Document, totals: Dict[str, int]) -> int:
+        """Update a stored course in place, touching only chunks that changed"""
+        course = document.course
+        result = self.vector_store.sync_course_content(course.title, document.chunks)
+        self.vector_store.add_course_metadata(course)
+        totals["replaced"] += 1
+        totals["reused_embeddings"] += result["reused_embeddings"]
+        totals["computed_embeddings"] += result["computed_embeddings"]
+        print(
+            f"Updated course: {course.title} ({result['upserted']} changed, {result['deleted']} removed, "
+            f"{result['unchanged']} unchanged chunks; {result['reused_embeddings']} embeddings reused, "
+            f"{result['computed_embeddings']} computed)"
+        )
+        return result["upserted"]
+
+    def _discard_previous_parse(self, document: _Document, manifest: IngestManifest):
+        """Drop the cached parse of the file's previous content"""
+        entry = manifest.get(document.file_path)
+        if self.parse_cache is not None and entry is not None and entry.content_hash != document.content_hash:
+            self.parse_cache.discard(entry.content_hash)
+
+    def _remove_previous(self, document: _Document, manifest: IngestManifest, totals: Dict[str, int]):
+        """Delete the course this file produced under a different title before"""
+        entry = manifest.get(document.file_path)
+        if entry is None or entry.course_title == document.course.title:
+            return
+        if entry.course_title in self.vector_store.get_existing_course_titles():
+            self.vector_store.delete_course(entry.course_title)
+            totals["replaced"] += 1
+            print(f"Removed course: {entry.course_title} (renamed to {document.course.title})")
+
+
+class StageQueue(queue.Queue):
+    """Bounded queue between two ingestion stages; iterating yields items until the upstream stage closes it"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize=maxsize)
+        self.exhausted = False
+
+    def __iter__(self):
+        while not self.exhausted:
+            item = self.get()
+            if item is _DONE:
+                self.exhausted = True
+                return
+            yield item
+
+    def close(self):
+        """Signal that no more items will be put"""
+        self.put(_DONE)
+
+    def drain(self):
+        """Discard the remaining items"""
+        for _ in self:
+            pass
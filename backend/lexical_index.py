@@ -0,0 +1,263 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from heapq import nlargest
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Frequent words that carry no topic; their posting lists would cover most chunks
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its of on or so that the their them
+then there these they this to was we what when where which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms without stop words ("MCP" -> "mcp", "computer_use" -> "computer", "use")"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class LexicalIndex:
+    """
+    In-process inverted index over chunk text with BM25 scoring.
+
+    Each chunk gets a document number; postings map a term to the term
+    frequency in each document containing it. Chunks are also grouped by
+    course title so a course filter only scores that course's documents.
+    Queries need no model inference. The index is persisted as one JSON
+    file of documents and postings (written atomically by persist()).
+    """
+
+    FORMAT = 2
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._persist_lock = threading.Lock()    # Keeps snapshots reaching disk in order
+        self._dirty = False
+        self._stats = {"queries": 0, "query_ms": 0.0}
+        self._reset()
+        if path:
+            self._load()
+
+    def count(self) -> int:
+        """Number of indexed chunks"""
+        with self._lock:
+            return len(self._numbers)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Index chunks, replacing chunks with the same IDs"""
+        with self._lock:
+            self._remove(ids)
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                terms = Counter(tokenize(document))
+                number = len(self._documents)
+                length = sum(terms.values())
+                self._documents.append((chunk_id, document, metadata, length))
+                self._numbers[chunk_id] = number
+                self._total_length += length
+                for term, frequency in terms.items():
+                    self._postings.setdefault(term, {})[number] = frequency
+                self._by_course.setdefault((metadata or {}).get("course_title"), set()).add(number)
+            self._dirty = True
+
+    def remove(self, ids: List[str]):
+        """Remove chunks by ID"""
+        with self._lock:
+            self._remove(ids)
+
+    def remove_course(self, course_title: str):
+        """Remove all chunks of a course"""
+        with self._lock:
+            numbers = self._by_course.get(course_title, set())
+            self._remove([self._documents[number][0] for number in numbers])
+
+    def clear(self):
+        """Remove all chunks"""
+        with self._lock:
+            self._reset()
+            self._dirty = True
+
+    def search(self,
+               query: str,
+               limit: int,
+               course_title: Optional[str] = None,
+               lesson_number: Optional[int] = None) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """
+        Rank chunks by BM25 score for a query.
+
+        Returns:
+            Up to limit (id, document, metadata, score) tuples, best first;
+            chunks sharing no term with the query are not returned
+        """
+        started_at = time.perf_counter()
+        with self._lock:
+            count = len(self._numbers)
+            allowed: Optional[Set[int]] = None
+            if course_title is not None:
+                allowed = self._by_course.get(course_title, set())
+            scores: Dict[int, float] = {}
+            if count:
+                # BM25 length normalization: K1 * (1 - B + B * length / average length)
+                base = self.K1 * (1 - self.B)
+                per_term = self.K1 * self.B * count / max(self._total_length, 1)
+                documents = self._documents
+                for term in set(tokenize(query)):
+                    postings = self._postings.get(term)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    weight = idf * (self.K1 + 1)
+                    for number, frequency in postings.items():
+                        if allowed is not None and number not in allowed:
+                            continue
+                        norm = base + per_term * documents[number][3]
+                        scores[number] = scores.get(number, 0.0) + weight * frequency / (frequency + norm)
+
+            if lesson_number is not None:
+                scores = {
+                    number: score for number, score in scores.items()
+                    if (self._documents[number][2] or {}).get("lesson_number") == lesson_number
+                }
+            hits = [
+                (*self._documents[number][:3], score)
+                for number, score in nlargest(limit, scores.items(), key=lambda item: item[1])
+            ]
+            self._stats["queries"] += 1
+            self._stats["query_ms"] += (time.perf_counter() - started_at) * 1000
+        return hits
+
+    def persist(self):
+        """Write the index to disk if it changed since the last save"""
+        with self._persist_lock:
+            # Snapshot under the lock; searches and writes only wait for the copy, not the file write
+            with self._lock:
+                if not self.path or not self._dirty:
+                    return
+                data = self._serialize()
+                self._dirty = False
+
+            try:
+                self._write(self.path, data)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def write_copy(self, path: str):
+        """Write the current index to another file (e.g. into an index snapshot), leaving path untouched"""
+        with self._lock:
+            data = self._serialize()
+        self._write(path, data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size and query timing"""
+        with self._lock:
+            queries = self._stats["queries"]
+            return {
+                "chunks": len(self._numbers),
+                "terms": len(self._postings),
+                "queries": queries,
+                "avg_query_ms": round(self._stats["query_ms"] / queries, 3) if queries else 0.0
+            }
+
+    def _serialize(self) -> Dict[str, Any]:
+        """Plain-data copy of the index in the persisted format (call with the lock held)"""
+        if len(self._documents) != len(self._numbers):
+            self._compact()
+        return {
+            "format": self.FORMAT,
+            "documents": list(self._documents),
+            "postings": {
+                term: [list(postings), list(postings.values())]
+                for term, postings in self._postings.items()
+            },
+            "total_length": self._total_length
+        }
+
+    @staticmethod
+    def _write(path: str, data: Dict[str, Any]):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def _remove(self, ids: List[str]):
+        for chunk_id in ids:
+            number = self._numbers.pop(chunk_id, None)
+            if number is None:
+                continue
+            _, document, metadata, length = self._documents[number]
+            self._documents[number] = None
+            self._total_length -= length
+            for term in set(tokenize(document)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(number, None)
+                    if not postings:
+                        del self._postings[term]
+            course_numbers = self._by_course.get((metadata or {}).get("course_title"))
+            if course_numbers is not None:
+                course_numbers.discard(number)
+            self._dirty = True
+
+    def _compact(self):
+        """Renumber documents so removed ones leave no holes"""
+        renumbered: Dict[int, int] = {}
+        documents = []
+        for number, entry in enumerate(self._documents):
+            if entry is not None:
+                renumbered[number] = len(documents)
+                documents.append(entry)
+        self._documents = documents
+        self._postings = {
+            term: {renumbered[number]: frequency for number, frequency in postings.items()}
+            for term, postings in self._postings.items()
+        }
+        self._index_documents()
+
+    def _index_documents(self):
+        """Rebuild the ID and course lookups from the document list"""
+        self._numbers = {}
+        self._by_course = {}
+        for number, entry in enumerate(self._documents):
+            if entry is not None:
+                chunk_id, _, metadata, _ = entry
+                self._numbers[chunk_id] = number
+                self._by_course.setdefault((metadata or {}).get("course_title"), set()).add(number)
+
+    def _reset(self):
+        # Entries are (id, document, metadata, length in terms); None once removed
+        self._documents: List[Optional[Tuple[str, str, Dict[str, Any], int]]] = []
+        self._numbers: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._by_course: Dict[Optional[str], Set[int]] = {}
+        self._total_length = 0
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("format") != self.FORMAT:
+                raise ValueError(f"unsupported lexical index format {data.get('format')}")
+            documents = [tuple(entry) for entry in data["documents"]]
+            postings = {
+                term: dict(zip(numbers, frequencies))
+                for term, (numbers, frequencies) in data["postings"].items()
+            }
+            total_length = data["total_length"]
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading lexical index {self.path}: {e} - rebuilding")
+            return
+
+        self._documents, self._postings, self._total_length = documents, postings, total_length
+        self._index_documents()
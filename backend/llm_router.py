@@ -3,8 +3,8 @@ LLM智能路由器 - 实现双模型策略
 根据是否需要工具调用，智能选择DeepSeek-R1或DeepSeek-V3
 """
 
-from typing import List, Dict, Any, Optional, Union
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, Union, Iterator
+from openai import OpenAI, AsyncOpenAI
 from config import config
 
 
@@ -12,15 +12,21 @@ class LLMRouter:
     """LLM智能路由器 - 双模型策略实现"""
     
     def __init__(self):
-        """初始化OpenAI客户端"""
+        """初始化OpenAI客户端（同步与异步）"""
         if config.LLM_PROVIDER == "deepseek":
             self.client = OpenAI(
                 base_url=config.LLM_BASE_URL,
                 api_key=config.LLM_API_KEY
             )
+            # 异步客户端：单个worker可同时挂起大量请求，无需每个请求占用一个线程
+            self.async_client = AsyncOpenAI(
+                base_url=config.LLM_BASE_URL,
+                api_key=config.LLM_API_KEY
+            )
         else:
             # 保留Claude支持
             self.client = None
+            self.async_client = None
     
     def call_chat(
         self,
@@ -43,6 +49,66 @@ class LLMRouter:
         Returns:
             OpenAI响应对象
         """
+        request_params = self._build_request_params(
+            messages, tools, temperature, max_tokens, **kwargs
+        )
+        
+        # 执行请求
+        try:
+            response = self.client.chat.completions.create(**request_params)
+            print(f"[ROUTER] 请求成功，使用模型: {response.model}")
+            return response
+        except Exception as e:
+            print(f"[ROUTER] 请求失败: {e}")
+            raise
+    
+    async def acall_chat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        temperature: float = 0,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> Any:
+        """
+        智能路由聊天请求（异步版本）
+        
+        Args:
+            messages: 对话消息列表
+            tools: 工具定义列表，如果提供则使用工具调用模型
+            temperature: 温度参数
+            max_tokens: 最大token数
+            **kwargs: 其他参数
+            
+        Returns:
+            OpenAI响应对象
+        """
+        request_params = self._build_request_params(
+            messages, tools, temperature, max_tokens, **kwargs
+        )
+        
+        try:
+            response = await self.async_client.chat.completions.create(**request_params)
+            print(f"[ROUTER] 异步请求成功，使用模型: {response.model}")
+            return response
+        except Exception as e:
+            print(f"[ROUTER] 异步请求失败: {e}")
+            raise
+    
+    def _build_request_params(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]],
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        根据是否需要工具调用选择模型并构建请求参数
+        
+        Returns:
+            chat.completions.create的请求参数
+        """
         if config.LLM_PROVIDER != "deepseek":
             raise NotImplementedError("Currently only supports DeepSeek provider")
             
@@ -71,14 +137,7 @@ class LLMRouter:
             **kwargs
         }
         
-        # 执行请求
-        try:
-            response = self.client.chat.completions.create(**request_params)
-            print(f"[ROUTER] 请求成功，使用模型: {response.model}")
-            return response
-        except Exception as e:
-            print(f"[ROUTER] 请求失败: {e}")
-            raise
+        return request_params
     
     def call_simple_chat(
         self,
@@ -98,6 +157,60 @@ class LLMRouter:
         response = self.call_chat(messages=messages, tools=None, **kwargs)
         return response.choices[0].message.content
     
+    async def acall_simple_chat(
+        self,
+        messages: List[Dict[str, str]], 
+        **kwargs
+    ) -> str:
+        """
+        简单聊天接口（异步版本），直接返回文本内容
+        
+        Args:
+            messages: 对话消息列表
+            **kwargs: 其他参数
+            
+        Returns:
+            AI回复文本
+        """
+        response = await self.acall_chat(messages=messages, tools=None, **kwargs)
+        return response.choices[0].message.content
+    
+    def call_chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0,
+        max_tokens: int = 1000,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        流式聊天接口，逐段返回推理模型生成的文本
+        
+        Args:
+            messages: 对话消息列表
+            temperature: 温度参数
+            max_tokens: 最大token数
+            **kwargs: 其他参数
+            
+        Yields:
+            AI回复的文本片段
+        """
+        request_params = self._build_request_params(
+            messages, None, temperature, max_tokens, stream=True, **kwargs
+        )
+        
+        try:
+            stream = self.client.chat.completions.create(**request_params)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+            print(f"[ROUTER] 流式请求完成，使用模型: {request_params['model']}")
+        except Exception as e:
+            print(f"[ROUTER] 流式请求失败: {e}")
+            raise
+    
     def call_with_tools(
         self,
         messages: List[Dict[str, str]],
@@ -116,6 +229,25 @@ class LLMRouter:
             OpenAI响应对象（包含可能的工具调用）
         """
         return self.call_chat(messages=messages, tools=tools, **kwargs)
+    
+    async def acall_with_tools(
+        self,
+        messages: List[Dict[str, str]],
+        tools: List[Dict[str, Any]],
+        **kwargs
+    ) -> Any:
+        """
+        带工具调用的接口（异步版本）
+        
+        Args:
+            messages: 对话消息列表
+            tools: 工具定义列表
+            **kwargs: 其他参数
+            
+        Returns:
+            OpenAI响应对象（包含可能的工具调用）
+        """
+        return await self.acall_chat(messages=messages, tools=tools, **kwargs)
 
 
 # 全局路由器实例
@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 from pydantic import BaseModel
 
 class Lesson(BaseModel):
@@ -19,4 +19,79 @@ class CourseChunk(BaseModel):
     content: str                        # The actual text content
     course_title: str                   # Which course this chunk belongs to
     lesson_number: Optional[int] = None # Which lesson this chunk is from
-    chunk_index: int                    # Position of this chunk in the document
\ No newline at end of file
+    chunk_index: int                    # Position of this chunk in the document
+
+class ChunkBatch:
+    """
+    Columnar course chunks: one list per CourseChunk field instead of one model per chunk.
+
+    Chunks flow from the document processor to the vector store in this form
+    without per-chunk model construction or validation. Indexing or iterating
+    returns CourseChunk views built on access, so code written for
+    List[CourseChunk] keeps working; slicing returns a ChunkBatch.
+    """
+    __slots__ = ("contents", "course_titles", "lesson_numbers", "chunk_indexes")
+
+    def __init__(self,
+                 contents: Optional[List[str]] = None,
+                 course_titles: Optional[List[str]] = None,
+                 lesson_numbers: Optional[List[Optional[int]]] = None,
+                 chunk_indexes: Optional[List[int]] = None):
+        self.contents = contents if contents is not None else []
+        self.course_titles = course_titles if course_titles is not None else []
+        self.lesson_numbers = lesson_numbers if lesson_numbers is not None else []
+        self.chunk_indexes = chunk_indexes if chunk_indexes is not None else []
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[CourseChunk]) -> 'ChunkBatch':
+        """Build a batch from CourseChunk models (a batch is returned as is)"""
+        if isinstance(chunks, ChunkBatch):
+            return chunks
+        batch = cls()
+        for chunk in chunks:
+            batch.append(chunk.content, chunk.course_title, chunk.lesson_number, chunk.chunk_index)
+        return batch
+
+    def append(self, content: str, course_title: str, lesson_number: Optional[int], chunk_index: int):
+        """Add one chunk"""
+        self.contents.append(content)
+        self.course_titles.append(course_title)
+        self.lesson_numbers.append(lesson_number)
+        self.chunk_indexes.append(chunk_index)
+
+    def extend(self, other: 'ChunkBatch'):
+        """Add all chunks of another batch"""
+        other = ChunkBatch.from_chunks(other)
+        self.contents.extend(other.contents)
+        self.course_titles.extend(other.course_titles)
+        self.lesson_numbers.extend(other.lesson_numbers)
+        self.chunk_indexes.extend(other.chunk_indexes)
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ChunkBatch(self.contents[index], self.course_titles[index],
+                              self.lesson_numbers[index], self.chunk_indexes[index])
+        return CourseChunk(content=self.contents[index], course_title=self.course_titles[index],
+                           lesson_number=self.lesson_numbers[index], chunk_index=self.chunk_indexes[index])
+
+    def __iter__(self) -> Iterator[CourseChunk]:
+        for content, course_title, lesson_number, chunk_index in zip(
+                self.contents, self.course_titles, self.lesson_numbers, self.chunk_indexes):
+            yield CourseChunk(content=content, course_title=course_title,
+                              lesson_number=lesson_number, chunk_index=chunk_index)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChunkBatch):
+            return (self.contents == other.contents and self.course_titles == other.course_titles
+                    and self.lesson_numbers == other.lesson_numbers and self.chunk_indexes == other.chunk_indexes)
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ChunkBatch({len(self)} chunks)"
@@ -0,0 +1,326 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+
+def nearest_rows(matrix: np.ndarray,
+                 norms: np.ndarray,
+                 query: np.ndarray,
+                 n_results: int,
+                 candidates: Optional[np.ndarray] = None):
+    """
+    Exact nearest neighbours by squared L2 distance.
+
+    Args:
+        matrix: Stored vectors, one per row (may be memory-mapped)
+        norms: Squared norm of each row
+        query: Query vector
+        n_results: Number of neighbours to return
+        candidates: Rows to search, or None for all rows
+
+    Returns:
+        (rows, distances) of the closest rows, closest first
+    """
+    if candidates is not None:
+        matrix, norms = matrix[candidates], norms[candidates]
+    if len(norms) == 0 or n_results <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    # ||m - q||^2 = ||m||^2 - 2 m.q + ||q||^2, one matrix-vector product
+    distances = norms - 2.0 * (matrix @ query) + float(query @ query)
+    k = min(n_results, len(distances))
+    top = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+    top = top[np.argsort(distances[top], kind="stable")]
+    rows = top if candidates is None else candidates[top]
+    return rows, np.maximum(distances[top], 0.0)
+
+
+def filter_mask(where: Dict[str, Any],
+                count: int,
+                codes: Dict[str, np.ndarray],
+                code_of: Dict[str, Dict[Any, int]],
+                field_values: Callable[[str], Iterable[Any]]) -> np.ndarray:
+    """
+    Boolean mask of rows matching a Chroma-style where filter.
+
+    Equality on fields with code arrays compares integer codes; other fields
+    are compared value by value through field_values(field).
+    """
+    if "$and" in where:
+        mask = np.ones(count, dtype=bool)
+        for clause in where["$and"]:
+            mask &= filter_mask(clause, count, codes, code_of, field_values)
+        return mask
+    if "$or" in where:
+        mask = np.zeros(count, dtype=bool)
+        for clause in where["$or"]:
+            mask |= filter_mask(clause, count, codes, code_of, field_values)
+        return mask
+
+    mask = np.ones(count, dtype=bool)
+    for field, value in where.items():
+        if isinstance(value, dict):
+            if set(value) != {"$eq"}:
+                raise ValueError(f"Unsupported filter operator: {value}")
+            value = value["$eq"]
+        if field in codes:
+            code = code_of[field].get(value)
+            mask &= (codes[field][:count] == code) if code is not None else False
+        else:
+            mask &= np.fromiter((item == value for item in field_values(field)), dtype=bool, count=count)
+    return mask
+
+
+def select_fields(results: Dict[str, Any], include: Sequence[str], fields: Sequence[str]) -> Dict[str, Any]:
+    """Shape a result like Chroma's: IDs always, other fields only when included"""
+    return {field: (results[field] if field == "ids" or field in include else None) for field in fields}
+
+
+class NumpyCollection:
+    """
+    Brute-force vector collection kept in NumPy, usable in place of a Chroma collection.
+
+    Implements the part of the Chroma collection API that VectorStore uses
+    (query, get, add, upsert, delete, count) with the same result shapes
+    and squared-L2 distances. Vectors live in one contiguous float32 matrix
+    together with their squared norms, so a query is a single matrix-vector
+    product followed by argpartition. Metadata fields named in
+    indexed_fields are also kept as integer code arrays, so equality
+    filters on them become boolean masks.
+
+    Data is persisted by persist() as <name>.npy (vectors) plus
+    <name>.json (ids, documents, metadatas).
+    """
+
+    def __init__(self,
+                 path: str,
+                 name: str,
+                 embedding_function: Callable[[List[str]], Any],
+                 indexed_fields: Sequence[str] = ()):
+        self.path = path
+        self.name = name
+        self.embedding_function = embedding_function
+        self.indexed_fields = tuple(indexed_fields)
+        self._vectors_path = os.path.join(path, f"{name}.npy")
+        self._meta_path = os.path.join(path, f"{name}.json")
+        self._lock = threading.RLock()
+        self._dirty = False
+
+        os.makedirs(path, exist_ok=True)
+        self._reset()
+        self._load()
+
+    def count(self) -> int:
+        """Number of stored records"""
+        with self._lock:
+            return len(self._ids)
+
+    def query(self,
+              query_embeddings: List[Any],
+              n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = ("metadatas", "documents", "distances")) -> Dict[str, Any]:
+        """Exact nearest neighbours of each query embedding, optionally filtered by metadata"""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": None}
+
+        with self._lock:
+            n = len(self._ids)
+            candidates = None if where is None else np.flatnonzero(self._match(where))
+            for query in queries:
+                rows, distances = nearest_rows(self._matrix[:n], self._norms[:n], query, n_results, candidates)
+                results["ids"].append([self._ids[row] for row in rows])
+                results["documents"].append([self._documents[row] for row in rows])
+                results["metadatas"].append([self._metadatas[row] for row in rows])
+                results["distances"].append(distances.tolist())
+
+        return select_fields(results, include, ("ids", "documents", "metadatas", "distances", "embeddings"))
+
+    def get(self,
+            ids: Optional[List[str]] = None,
+            where: Optional[Dict[str, Any]] = None,
+            include: Sequence[str] = ("metadatas", "documents")) -> Dict[str, Any]:
+        """Fetch records by ID and/or metadata filter"""
+        with self._lock:
+            if ids is not None:
+                rows = [self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]
+            else:
+                rows = list(range(len(self._ids)))
+            if where is not None:
+                mask = self._match(where)
+                rows = [row for row in rows if mask[row]]
+
+            results = {
+                "ids": [self._ids[row] for row in rows],
+                "documents": [self._documents[row] for row in rows],
+                "metadatas": [self._metadatas[row] for row in rows],
+                "embeddings": self._matrix[rows].copy() if rows else np.zeros((0, self._dimensions or 0), dtype=np.float32)
+            }
+        return select_fields(results, include, ("ids", "documents", "metadatas", "embeddings"))
+
+    def add(self,
+            ids: List[str],
+            documents: Optional[List[str]] = None,
+            embeddings: Optional[Any] = None,
+            metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Insert records; IDs that already exist are skipped (as Chroma does)"""
+        self._write(ids, documents, embeddings, metadatas, replace=False)
+
+    def upsert(self,
+               ids: List[str],
+               documents: Optional[List[str]] = None,
+               embeddings: Optional[Any] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Insert records, replacing those whose IDs exist"""
+        self._write(ids, documents, embeddings, metadatas, replace=True)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Remove records by ID and/or metadata filter"""
+        with self._lock:
+            rows = set(self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows) if ids is not None else None
+            if where is not None:
+                matched = set(np.flatnonzero(self._match(where)).tolist())
+                rows = matched if rows is None else rows & matched
+            if not rows:
+                return
+            # Fill each hole with the last row, highest rows first so moved rows are never deleted ones
+            for row in sorted(rows, reverse=True):
+                self._remove_row(row)
+            self._dirty = True
+
+    def clear(self):
+        """Remove all records"""
+        with self._lock:
+            self._reset()
+            self._dirty = True
+
+    def persist(self):
+        """Write the collection to disk if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            n = len(self._ids)
+            vectors = self._matrix[:n] if self._dimensions else np.zeros((0, 0), dtype=np.float32)
+            meta = {"ids": self._ids, "documents": self._documents, "metadatas": self._metadatas}
+            self._atomic_write(self._vectors_path, lambda f: np.save(f, vectors))
+            self._atomic_write(self._meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+            self._dirty = False
+
+    def _match(self, where: Dict[str, Any]) -> np.ndarray:
+        return filter_mask(
+            where, len(self._ids), self._codes, self._code_of,
+            lambda field: ((metadata or {}).get(field) for metadata in self._metadatas)
+        )
+
+    def _write(self, ids, documents, embeddings, metadatas, replace: bool):
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        if embeddings is None:
+            embeddings = self.embedding_function(documents)
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+
+        with self._lock:
+            for chunk_id, document, vector, metadata in zip(ids, documents, vectors, metadatas):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    row = self._append_row(chunk_id, len(vector))
+                elif not replace:
+                    continue
+                self._documents[row] = document
+                self._metadatas[row] = metadata
+                self._matrix[row] = vector
+                self._norms[row] = float(vector @ vector)
+                self._set_codes(row, metadata)
+            self._dirty = True
+
+    def _append_row(self, chunk_id: str, dimensions: int) -> int:
+        if self._dimensions is None:
+            self._dimensions = dimensions
+            self._matrix = np.zeros((0, dimensions), dtype=np.float32)
+        row = len(self._ids)
+        if row == len(self._matrix):
+            # Grow capacity geometrically so appends stay amortized O(1)
+            capacity = max(64, 2 * len(self._matrix))
+            self._matrix = self._grow(self._matrix, capacity)
+            self._norms = self._grow(self._norms, capacity)
+            for field in self._codes:
+                self._codes[field] = self._grow(self._codes[field], capacity)
+        self._ids.append(chunk_id)
+        self._documents.append(None)
+        self._metadatas.append(None)
+        self._rows[chunk_id] = row
+        return row
+
+    def _remove_row(self, row: int):
+        last = len(self._ids) - 1
+        del self._rows[self._ids[row]]
+        if row != last:
+            self._ids[row] = self._ids[last]
+            self._documents[row] = self._documents[last]
+            self._metadatas[row] = self._metadatas[last]
+            self._matrix[row] = self._matrix[last]
+            self._norms[row] = self._norms[last]
+            for codes in self._codes.values():
+                codes[row] = codes[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._documents.pop()
+        self._metadatas.pop()
+
+    def _set_codes(self, row: int, metadata: Optional[Dict[str, Any]]):
+        for field, codes in self._codes.items():
+            value = (metadata or {}).get(field)
+            code_of = self._code_of[field]
+            codes[row] = code_of.setdefault(value, len(code_of))
+
+    def _reset(self):
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._dimensions: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._codes: Dict[str, np.ndarray] = {field: np.zeros(0, dtype=np.int64) for field in self.indexed_fields}
+        self._code_of: Dict[str, Dict[Any, int]] = {field: {} for field in self.indexed_fields}
+
+    def _load(self):
+        if not (os.path.exists(self._vectors_path) and os.path.exists(self._meta_path)):
+            return
+        try:
+            vectors = np.load(self._vectors_path)
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if len(meta["ids"]) != len(vectors):
+                raise ValueError("vector and metadata counts differ")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading {self.name} from {self.path}: {e} - starting empty")
+            return
+
+        if len(vectors):
+            self._dimensions = vectors.shape[1]
+            self._matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+            self._norms = np.einsum('ij,ij->i', self._matrix, self._matrix)
+            for field in self.indexed_fields:
+                self._codes[field] = np.zeros(len(vectors), dtype=np.int64)
+        self._ids = list(meta["ids"])
+        self._documents = list(meta["documents"])
+        self._metadatas = list(meta["metadatas"])
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        for row, metadata in enumerate(self._metadatas):
+            self._set_codes(row, metadata)
+
+    @staticmethod
+    def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    @staticmethod
+    def _atomic_write(path: str, write: Callable):
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from models import ChunkBatch, Course, Lesson
+
+
+class ParseCache:
+    """
+    Persistent cache of parsed course documents.
+
+    Entries are keyed by the document's content hash (IngestManifest.hash_content)
+    and stored under a directory named after the chunker settings fingerprint,
+    one JSON file of plain columns per document:
+
+        {"format", "title", "course_link", "instructor",
+         "lessons": [[lesson number, lesson title, lesson link], ...],
+         "contents", "lesson_numbers", "chunk_indexes"}
+
+    The chunk columns load straight into a ChunkBatch. Entries are not
+    compressed: decompressing costs about as much as the parse the cache
+    saves. Directories of other fingerprints are removed on start, so
+    changing CHUNK_SIZE/CHUNK_OVERLAP (or the chunking unit) invalidates
+    every entry.
+    """
+
+    FORMAT = 2
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        # The format is part of the directory name, so entries of an older format are removed as stale
+        directory_key = f"{fingerprint}/format={self.FORMAT}"
+        self.directory = os.path.join(path, hashlib.sha1(directory_key.encode('utf-8')).hexdigest()[:16])
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "load_ms": 0.0}
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_stale_directories()
+
+    def get(self, content_hash: str) -> Optional[Tuple[Course, ChunkBatch]]:
+        """Load a cached parse, or None if this content was not parsed with these settings"""
+        started_at = time.perf_counter()
+        try:
+            with open(self._entry_path(content_hash), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            result = self._unpack(data)
+        except FileNotFoundError:
+            result = None
+        except Exception as e:
+            print(f"Error loading cached parse {content_hash}: {e}")
+            result = None
+
+        with self._lock:
+            if result is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+                self._stats["load_ms"] += (time.perf_counter() - started_at) * 1000
+        return result
+
+    def put(self, content_hash: str, course: Course, chunks: ChunkBatch):
+        """Store a parse result, replacing the file atomically"""
+        data = json.dumps(self._pack(course, ChunkBatch.from_chunks(chunks)))
+        entry_path = self._entry_path(content_hash)
+        temp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, entry_path)
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def discard(self, content_hash: str):
+        """Remove the entry of content that no longer exists"""
+        try:
+            os.remove(self._entry_path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Remove all entries"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the average load time"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["load_ms"] = round(stats["load_ms"], 2)
+        stats["avg_load_ms"] = round(stats["load_ms"] / stats["hits"], 3) if stats["hits"] else 0.0
+        stats["fingerprint"] = self.fingerprint
+        return stats
+
+    @classmethod
+    def _pack(cls, course: Course, chunks: ChunkBatch) -> Dict[str, Any]:
+        return {
+            "format": cls.FORMAT,
+            "title": course.title,
+            "course_link": course.course_link,
+            "instructor": course.instructor,
+            "lessons": [[lesson.lesson_number, lesson.title, lesson.lesson_link] for lesson in course.lessons],
+            "contents": chunks.contents,
+            "lesson_numbers": chunks.lesson_numbers,
+            "chunk_indexes": chunks.chunk_indexes
+        }
+
+    @classmethod
+    def _unpack(cls, data: Dict[str, Any]) -> Tuple[Course, ChunkBatch]:
+        if data.get("format") != cls.FORMAT:
+            raise ValueError(f"unsupported cache format {data.get('format')}")
+        title = data["title"]
+        course = Course(
+            title=title,
+            course_link=data["course_link"],
+            instructor=data["instructor"],
+            lessons=[
+                Lesson(lesson_number=number, title=lesson_title, lesson_link=link)
+                for number, lesson_title, link in data["lessons"]
+            ]
+        )
+        contents = data["contents"]
+        return course, ChunkBatch(contents, [title] * len(contents), data["lesson_numbers"], data["chunk_indexes"])
+
+    def _entry_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}.json")
+
+    def _remove_stale_directories(self):
+        for name in os.listdir(self.path):
+            stale = os.path.join(self.path, name)
+            if stale != self.directory and os.path.isdir(stale):
+                shutil.rmtree(stale, ignore_errors=True)
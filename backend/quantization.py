@@ -0,0 +1,163 @@
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from numpy_store import nearest_rows
+
+# Storage modes of the vectors scanned for candidates
+# (float16 is not offered: NumPy converts it to float32 about 6x slower than it scans float32)
+QUANTIZATIONS = ("float32", "int8")
+
+# Rows converted to float32 at a time while scanning quantized vectors
+BLOCK_ROWS = 4096
+
+
+def quantize(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantize a block of float32 vectors.
+
+    int8 stores each vector as codes in [-127, 127] times a per-vector
+    scale (its largest absolute component / 127), a quarter of the size.
+
+    Returns:
+        (quantized vectors, per-vector scales or None)
+    """
+    if mode == "float32":
+        return np.asarray(vectors, dtype=np.float32), None
+    if mode == "int8":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization: {mode}")
+
+
+def scan_top(data: np.ndarray,
+             scales: Optional[np.ndarray],
+             norms: np.ndarray,
+             queries: np.ndarray,
+             m: int) -> np.ndarray:
+    """
+    Rows with the m smallest approximate squared L2 distances to each query.
+
+    Quantized rows are converted to float32 one block at a time, so the scan
+    needs no float32 copy of the whole matrix; norms are the exact squared
+    norms of the full-precision vectors.
+
+    Returns:
+        (queries x m) row indices, unordered within a query
+    """
+    count = len(norms)
+    m = min(m, count)
+    query_norms = np.einsum('ij,ij->i', queries, queries)
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    best_distances = np.zeros((len(queries), 0), dtype=np.float32)
+
+    for start in range(0, count, BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, count)
+        dots = np.asarray(data[start:end], dtype=np.float32) @ queries.T
+        if scales is not None:
+            dots *= scales[start:end, None]
+        distances = (norms[start:end, None] - 2.0 * dots + query_norms[None, :]).T
+
+        # Merge this block's candidates with the best rows so far
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, end), distances.shape)], axis=1)
+        distances = np.concatenate([best_distances, distances], axis=1)
+        if distances.shape[1] > m:
+            keep = np.argpartition(distances, m - 1, axis=1)[:, :m]
+            rows = np.take_along_axis(rows, keep, axis=1)
+            distances = np.take_along_axis(distances, keep, axis=1)
+        best_rows, best_distances = rows, distances
+    return best_rows
+
+
+def nearest_rows_quantized(data: np.ndarray,
+                           scales: Optional[np.ndarray],
+                           matrix: np.ndarray,
+                           norms: np.ndarray,
+                           query: np.ndarray,
+                           n_results: int,
+                           candidates: Optional[np.ndarray] = None,
+                           rescore_factor: int = 4):
+    """
+    Nearest neighbours found on quantized vectors and re-scored in full precision.
+
+    The n_results * rescore_factor closest rows by quantized distance are
+    re-ranked by exact distance against matrix (typically memory-mapped, so
+    only those rows are read).
+
+    Returns:
+        (rows, distances) like nearest_rows
+    """
+    if candidates is not None:
+        data, norms_searched = data[candidates], norms[candidates]
+        scales = scales[candidates] if scales is not None else None
+    else:
+        norms_searched = norms
+    if len(norms_searched) == 0 or n_results <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    top = scan_top(data, scales, norms_searched, query[None, :], n_results * max(rescore_factor, 1))[0]
+    rows = np.sort(top if candidates is None else candidates[top])
+    return nearest_rows(matrix, norms, query, n_results, rows)
+
+
+def recall_queries(matrix: np.ndarray, norms: np.ndarray, k: int = 10, sample: int = 100, seed: int = 0):
+    """
+    Sample queries for measure_recall and their exact top-k rows.
+
+    Queries are normalized sums of two random stored vectors, so they lie
+    near the data without being stored rows.
+
+    Returns:
+        (queries, exact top-k rows per query)
+    """
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(norms), size=(sample, 2))
+    queries = np.asarray(matrix[pairs[:, 0]], dtype=np.float32) + np.asarray(matrix[pairs[:, 1]], dtype=np.float32)
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    return queries, scan_top(matrix, None, norms, queries, k)
+
+
+def measure_recall(matrix: np.ndarray,
+                   norms: np.ndarray,
+                   data: np.ndarray,
+                   scales: Optional[np.ndarray],
+                   queries: np.ndarray,
+                   exact: np.ndarray,
+                   rescore_factor: int = 4) -> Dict[str, Any]:
+    """
+    Recall@k of quantized search against exact search (queries and exact from recall_queries).
+
+    Returns:
+        Recall with and without full-precision re-scoring and the bytes scanned per query
+    """
+    k = exact.shape[1]
+    raw = scan_top(data, scales, norms, queries, k)
+    wide = scan_top(data, scales, norms, queries, k * rescore_factor)
+
+    hits = raw_hits = 0
+    for position, query in enumerate(queries):
+        expected = set(exact[position].tolist())
+        raw_hits += len(expected & set(raw[position].tolist()))
+        rescored, _ = nearest_rows(matrix, norms, query, k, np.sort(wide[position]))
+        hits += len(expected & set(rescored.tolist()))
+    total = max(exact.size, 1)
+    return {
+        "recall": round(hits / total, 4),
+        "recall_without_rescore": round(raw_hits / total, 4),
+        "scan_bytes": int(data.nbytes + (scales.nbytes if scales is not None else 0))
+    }
+
+
+def quantize_blocks(matrix: np.ndarray, mode: str, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Quantize a (possibly memory-mapped) matrix block by block, optionally into preallocated arrays"""
+    dtype = {"float32": np.float32, "int8": np.int8}[mode]
+    data = out if out is not None else np.empty(matrix.shape, dtype=dtype)
+    scales = np.empty(len(matrix), dtype=np.float32) if mode == "int8" else None
+    for start in range(0, len(matrix), BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, len(matrix))
+        block, block_scales = quantize(matrix[start:end], mode)
+        data[start:end] = block
+        if scales is not None:
+            scales[start:end] = block_scales
+    return data, scales
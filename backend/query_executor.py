@@ -0,0 +1,144 @@
+"""
+查询执行器 - 将同步的RAG查询管线移出事件循环
+使用有界线程池执行，并提供排队深度等运行指标
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+from config import config
+
+
+class QueryExecutor:
+    """有界查询线程池 - 避免慢请求阻塞uvicorn事件循环"""
+
+    def __init__(self, max_workers: int):
+        """
+        初始化查询执行器
+
+        Args:
+            max_workers: 工作线程数量（同时执行的查询上限）
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="rag-query"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0       # 已提交但尚未开始执行的任务数
+        self._active = 0       # 正在执行的任务数
+        self._completed = 0    # 已完成的任务数
+        self._failed = 0       # 执行失败的任务数
+        self._max_queued = 0   # 观测到的最大排队深度
+        self._total_wait = 0.0 # 累计排队等待时间（秒）
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        在线程池中执行同步函数并等待结果
+
+        Args:
+            func: 要执行的同步函数
+            *args, **kwargs: 传递给函数的参数
+
+        Returns:
+            函数的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._track(partial(func, *args, **kwargs))
+        )
+
+    async def stream(self, func: Callable[..., Iterator], *args, **kwargs) -> AsyncIterator:
+        """
+        在线程池中运行同步生成器，并以异步迭代器形式逐项返回结果
+
+        Args:
+            func: 返回同步迭代器的函数
+            *args, **kwargs: 传递给函数的参数
+
+        Yields:
+            生成器产出的每一项
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        finished = object()
+
+        def produce():
+            iterator = None
+            try:
+                iterator = func(*args, **kwargs)
+                for item in iterator:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (None, e))
+            finally:
+                if iterator is not None and hasattr(iterator, "close"):
+                    iterator.close()
+                loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+
+        loop.run_in_executor(self._executor, self._track(produce))
+        try:
+            while True:
+                item, error = await queue.get()
+                if error is not None:
+                    raise error
+                if item is finished:
+                    break
+                yield item
+        finally:
+            # 客户端断开时通知生产者尽快停止
+            cancelled.set()
+
+    def _track(self, call: Callable) -> Callable:
+        """包装任务以记录排队深度和执行状态"""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        def tracked():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._total_wait += time.perf_counter() - submitted_at
+            try:
+                result = call()
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+            return result
+
+        return tracked
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取执行器运行指标（排队深度、活跃任务数等）"""
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queued,
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._total_wait * 1000 / started, 2) if started else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait)
+
+
+# 全局查询执行器实例
+query_executor = QueryExecutor(config.QUERY_WORKERS)
@@ -1,11 +1,18 @@
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterator
 import os
+import threading
 from document_processor import DocumentProcessor
 from vector_store import VectorStore
 from ai_generator import AIGenerator
 from session_manager import SessionManager
 from search_tools import ToolManager, CourseSearchTool
-from models import Course, Lesson, CourseChunk
+from answer_cache import AnswerCache, CachedAnswer, CacheLookup, SemanticAnswerCache
+from query_executor import query_executor
+from ingestion import CourseIngestor
+from ingest_manifest import IngestManifest
+from token_counter import TokenCounter, load_token_counter
+from parse_cache import ParseCache
+from models import Course, Lesson, CourseChunk, ChunkBatch
 
 class RAGSystem:
     """Main orchestrator for the Retrieval-Augmented Generation system"""
@@ -14,16 +21,109 @@ class RAGSystem:
         self.config = config
         
         # Initialize core components
-        self.document_processor = DocumentProcessor(config.CHUNK_SIZE, config.CHUNK_OVERLAP)
-        self.vector_store = VectorStore(config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS)
+        self.token_counter = self._load_token_counter(config)
+        if config.CHUNK_UNIT == "tokens" and self.token_counter:
+            self.document_processor = DocumentProcessor(
+                config.CHUNK_TOKEN_SIZE, config.CHUNK_TOKEN_OVERLAP, self.token_counter
+            )
+        else:
+            self.document_processor = DocumentProcessor(config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+        self.vector_store = VectorStore(
+            config.CHROMA_PATH, 
+            config.EMBEDDING_MODEL, 
+            config.MAX_RESULTS, 
+            config.EMBEDDING_CACHE_SIZE,
+            config.EMBEDDING_STORE_PATH or None,
+            config.VECTOR_BACKEND,
+            config.NUMPY_STORE_PATH,
+            config.INDEX_SNAPSHOT_PATH or None,
+            config.VECTOR_QUANTIZATION,
+            config.QUANTIZATION_RESCORE_FACTOR,
+            config.LEXICAL_INDEX_PATH or None,
+            config.SEARCH_MODE
+        )
+        # Parsed courses keyed by content hash and chunker settings
+        self.parse_cache = None
+        if config.PARSE_CACHE_PATH:
+            self.parse_cache = ParseCache(config.PARSE_CACHE_PATH, self.document_processor.settings_fingerprint())
         self.ai_generator = AIGenerator(config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL)
         self.session_manager = SessionManager(config.MAX_HISTORY)
         
+        # Staged folder ingestion: parallel parsing, batched embedding, single writer
+        self.ingestor = CourseIngestor(
+            self.vector_store,
+            self.document_processor,
+            workers=config.INGEST_WORKERS,
+            batch_size=config.INGEST_BATCH_SIZE,
+            queue_size=config.INGEST_QUEUE_SIZE,
+            stream_threshold=config.INGEST_STREAM_THRESHOLD,
+            token_counter=self.token_counter,
+            parse_cache=self.parse_cache
+        )
+        # Record of ingested files so startup only processes what changed
+        self.manifest = IngestManifest(config.INGEST_MANIFEST_PATH) if config.INGEST_MANIFEST_PATH else None
+        # Startup loading and the docs watcher may ingest the same folder
+        self._ingest_lock = threading.Lock()
+        
+        # Exact-match answer cache in front of the query pipeline
+        self.answer_cache = None
+        if config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                max_entries=config.ANSWER_CACHE_SIZE,
+                ttl_seconds=config.ANSWER_CACHE_TTL,
+                db_path=config.ANSWER_CACHE_PATH or None,
+                max_disk_entries=config.ANSWER_CACHE_DISK_SIZE
+            )
+        
+        # Semantic cache so paraphrased history-free questions reuse answers
+        self.semantic_cache = None
+        if config.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticAnswerCache(
+                embed=self.vector_store.embed_texts,
+                max_entries=config.SEMANTIC_CACHE_SIZE,
+                threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                near_miss_margin=config.SEMANTIC_CACHE_NEAR_MISS,
+                ttl_seconds=config.ANSWER_CACHE_TTL
+            )
+        
         # Initialize search tools
         self.tool_manager = ToolManager()
         self.search_tool = CourseSearchTool(self.vector_store)
         self.tool_manager.register_tool(self.search_tool)
     
+    @staticmethod
+    def _load_token_counter(config) -> Optional[TokenCounter]:
+        """Load the embedding model's tokenizer for token-based chunking or the token report"""
+        if config.CHUNK_UNIT != "tokens" and not config.TOKEN_REPORT_ENABLED:
+            return None
+        try:
+            return load_token_counter(config.EMBEDDING_MODEL, config.EMBEDDING_MAX_TOKENS)
+        except Exception as e:
+            print(f"Error loading tokenizer for {config.EMBEDDING_MODEL}: {e} - chunking by characters")
+            return None
+    
+    def parse_course_document(self, file_path: str) -> Tuple[Course, ChunkBatch]:
+        """
+        Parse a course document, reusing the cached result for unchanged content.
+        
+        Args:
+            file_path: Path to the course document
+            
+        Returns:
+            Tuple of (Course object, its chunks)
+        """
+        if self.parse_cache is None:
+            return self.document_processor.process_course_document(file_path)
+        
+        content = self.document_processor.read_file(file_path)
+        content_hash = IngestManifest.hash_content(content)
+        cached = self.parse_cache.get(content_hash)
+        if cached is not None:
+            return cached
+        course, course_chunks = self.document_processor.process_course_text(content, file_path)
+        self.parse_cache.put(content_hash, course, course_chunks)
+        return course, course_chunks
+    
     def add_course_document(self, file_path: str) -> Tuple[Course, int]:
         """
         Add a single course document to the knowledge base.
@@ -36,13 +136,15 @@ class RAGSystem:
         """
         try:
             # Process the document
-            course, course_chunks = self.document_processor.process_course_document(file_path)
+            course, course_chunks = self.parse_course_document(file_path)
             
             # Add course metadata to vector store for semantic search
             self.vector_store.add_course_metadata(course)
             
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
+            self.vector_store.flush()
+            self.vector_store.publish_index_snapshot()
             
             return course, len(course_chunks)
         except Exception as e:
@@ -60,13 +162,29 @@ class RAGSystem:
         Returns:
             Tuple of (total courses added, total chunks created)
         """
-        total_courses = 0
-        total_chunks = 0
-        
+        if self.vector_store.read_only:
+            # Serving workers only map the snapshot; another process ingests and publishes it
+            print(f"Vector store serves a read-only index snapshot - not loading {folder_path}")
+            return 0, 0
+        with self._ingest_lock:
+            try:
+                return self._add_course_folder(folder_path, clear_existing)
+            finally:
+                self.vector_store.flush()
+                self.vector_store.publish_index_snapshot()
+    
+    def clear_all_data(self):
+        """Clear the vector store and the ingestion manifest, so every file is ingested again"""
+        self.vector_store.clear_all_data()
+        if self.manifest is not None:
+            self.manifest.clear()
+            self.manifest.save()
+    
+    def _add_course_folder(self, folder_path: str, clear_existing: bool) -> Tuple[int, int]:
         # Clear existing data if requested
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
-            self.vector_store.clear_all_data()
+            self.clear_all_data()
         
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
@@ -75,33 +193,48 @@ class RAGSystem:
         # Get existing course titles to avoid re-processing
         existing_course_titles = set(self.vector_store.get_existing_course_titles())
         
-        # Process each file in the folder
+        file_paths = []
         for file_name in os.listdir(folder_path):
             file_path = os.path.join(folder_path, file_name)
             if os.path.isfile(file_path) and file_name.lower().endswith(('.pdf', '.docx', '.txt')):
-                try:
-                    # Check if this course might already exist
-                    # We'll process the document to get the course ID, but only add if new
-                    course, course_chunks = self.document_processor.process_course_document(file_path)
-                    
-                    if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
-                        existing_course_titles.add(course.title)
-                    elif course:
-                        print(f"Course already exists: {course.title} - skipping")
-                except Exception as e:
-                    print(f"Error processing {file_name}: {e}")
-        
-        return total_courses, total_chunks
+                file_paths.append(file_path)
+        
+        if self.manifest is None:
+            # Read, parse, embed and write in overlapping pipeline stages
+            return self.ingestor.ingest(file_paths, existing_course_titles)
+        
+        # Drop courses whose source file was deleted
+        current_paths = {os.path.abspath(file_path) for file_path in file_paths}
+        for entry in self.manifest.entries_under(folder_path):
+            if entry.path not in current_paths:
+                if entry.course_title in existing_course_titles:
+                    self.vector_store.delete_course(entry.course_title)
+                    print(f"Removed course: {entry.course_title}")
+                self.manifest.remove(entry.path)
+                if self.parse_cache is not None:
+                    self.parse_cache.discard(entry.content_hash)
+        
+        # Files with unchanged size and mtime are skipped without being read
+        unchanged_titles = set()
+        changed_paths = []
+        for file_path in file_paths:
+            entry = self.manifest.get(file_path)
+            if self.manifest.is_current(file_path) and entry.course_title in existing_course_titles:
+                unchanged_titles.add(entry.course_title)
+            else:
+                changed_paths.append(file_path)
+        
+        try:
+            return self.ingestor.ingest(changed_paths, unchanged_titles, self.manifest)
+        finally:
+            self.manifest.save()
     
     def query(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str], List[Dict]]:
         """
-        Process a user query using the RAG system with tool-based search.
+        Process a user query using the RAG system.
+        
+        In "tool" pipeline mode the model chooses the search arguments; in
+        "direct" mode the search runs locally and the model is called once.
         
         Args:
             query: User's question
@@ -110,21 +243,33 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list, sources_detail list with links)
         """
-        # Create prompt for the AI with clear instructions
-        prompt = f"""Answer this question about course materials: {query}"""
+        # Clear sources left over from a previous query on this worker thread
+        self.tool_manager.reset_sources()
         
-        # Get conversation history if session exists
-        history = None
-        if session_id:
-            history = self.session_manager.get_conversation_history(session_id)
+        # Create prompt and get conversation history if session exists
+        prompt, history = self._prepare_query(query, session_id)
         
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager
-        )
+        # Serve repeated questions from the answer cache
+        lookup = self._lookup_answer(query, history)
+        cached = lookup.answer
+        if cached:
+            if session_id:
+                self.session_manager.add_exchange(session_id, query, cached.answer)
+            return cached.answer, list(cached.sources), list(cached.sources_detail)
+        
+        if self.config.PIPELINE_MODE == "direct":
+            # Retrieve locally and answer with a single generation call
+            context = self._retrieve_direct(query)
+            response = self.ai_generator.generate_with_context(prompt, context, history)
+        else:
+            # Generate response using AI with tools
+            response = self.ai_generator.generate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                speculative_query=self._speculative_query(query)
+            )
         
         # Get sources from the search tool
         sources = self.tool_manager.get_last_sources()
@@ -133,6 +278,9 @@ class RAGSystem:
         # Reset sources after retrieving them
         self.tool_manager.reset_sources()
         
+        if not self.ai_generator.last_generation_failed():
+            self._store_answer(query, lookup, response, sources, sources_detail)
+        
         # Update conversation history
         if session_id:
             self.session_manager.add_exchange(session_id, query, response)
@@ -140,6 +288,208 @@ class RAGSystem:
         # Return response with sources from tool searches
         return response, sources, sources_detail
     
+    async def aquery(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str], List[Dict]]:
+        """
+        Async variant of query().
+        
+        LLM calls go through the async SDK clients; only the blocking vector
+        search runs on the query executor, so a single worker can keep many
+        LLM calls in flight without holding a thread for each.
+        
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+            
+        Returns:
+            Tuple of (response, sources list, sources_detail list with links)
+        """
+        self.tool_manager.reset_sources()
+        
+        prompt, history = self._prepare_query(query, session_id)
+        
+        lookup = await query_executor.run(self._lookup_answer, query, history)
+        cached = lookup.answer
+        if cached:
+            if session_id:
+                self.session_manager.add_exchange(session_id, query, cached.answer)
+            return cached.answer, list(cached.sources), list(cached.sources_detail)
+        
+        if self.config.PIPELINE_MODE == "direct":
+            context = await self.tool_manager.run_with_sources(self._retrieve_direct, query)
+            response = await self.ai_generator.agenerate_with_context(prompt, context, history)
+        else:
+            response = await self.ai_generator.agenerate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                speculative_query=self._speculative_query(query)
+            )
+        
+        sources = self.tool_manager.get_last_sources()
+        sources_detail = self.tool_manager.get_last_sources_detail()
+        self.tool_manager.reset_sources()
+        
+        if not self.ai_generator.last_generation_failed():
+            await query_executor.run(
+                self._store_answer, query, lookup, response, sources, sources_detail
+            )
+        
+        if session_id:
+            self.session_manager.add_exchange(session_id, query, response)
+        
+        return response, sources, sources_detail
+    
+    def query_stream(self, query: str, session_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process a user query and stream the result as events.
+        
+        Sources are emitted as soon as the search tool has run, followed by
+        answer tokens as the model produces them.
+        
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+            
+        Yields:
+            (event, data) tuples: ("sources", {...}), ("token", {...}), ("done", {...})
+        """
+        self.tool_manager.reset_sources()
+        
+        prompt, history = self._prepare_query(query, session_id)
+        
+        lookup = self._lookup_answer(query, history)
+        cached = lookup.answer
+        if cached:
+            yield "sources", {"sources": list(cached.sources), "sources_detail": list(cached.sources_detail)}
+            yield "token", {"text": cached.answer}
+            if session_id:
+                self.session_manager.add_exchange(session_id, query, cached.answer)
+            yield "done", {"answer": cached.answer, "session_id": session_id}
+            return
+        
+        if self.config.PIPELINE_MODE == "direct":
+            context = self._retrieve_direct(query)
+            yield "sources", self._collect_sources()
+            events = self.ai_generator.generate_with_context_stream(prompt, context, history)
+            sources_sent = True
+        else:
+            events = self.ai_generator.generate_response_stream(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                speculative_query=self._speculative_query(query)
+            )
+            sources_sent = False
+        
+        for event in events:
+            if event["type"] == "tool_result" and not sources_sent:
+                yield "sources", self._collect_sources()
+                sources_sent = True
+            elif event["type"] == "token":
+                yield "token", {"text": event["text"]}
+            elif event["type"] == "done":
+                if not sources_sent:
+                    yield "sources", self._collect_sources()
+                    sources_sent = True
+                
+                response = event["answer"]
+                sources = self.tool_manager.get_last_sources()
+                sources_detail = self.tool_manager.get_last_sources_detail()
+                if not event.get("failed"):
+                    self._store_answer(query, lookup, response, sources, sources_detail)
+                if session_id:
+                    self.session_manager.add_exchange(session_id, query, response)
+                
+                yield "done", {"answer": response, "session_id": session_id}
+        
+        self.tool_manager.reset_sources()
+    
+    def _lookup_answer(self, query: str, history: Optional[str]) -> CacheLookup:
+        """
+        Look up a cached answer for the query.
+        
+        The exact-match cache is checked first; history-free turns then fall
+        back to the semantic cache.
+        
+        Returns:
+            CacheLookup with the cached answer (if any) and the key, corpus
+            version and query embedding needed to store a fresh answer
+        """
+        lookup = CacheLookup()
+        if self.answer_cache is None and self.semantic_cache is None:
+            return lookup
+        
+        lookup.corpus_version = self.vector_store.get_corpus_version()
+        if self.answer_cache is not None:
+            lookup.key = self.answer_cache.make_key(query, history, lookup.corpus_version)
+            lookup.answer = self.answer_cache.get(lookup.key)
+        
+        if lookup.answer is None and self.semantic_cache is not None and not history:
+            lookup.query_embedding = self.semantic_cache.embed_query(query)
+            lookup.answer = self.semantic_cache.lookup(query, lookup.query_embedding, lookup.corpus_version)
+        return lookup
+    
+    def _store_answer(self, 
+                      query: str,
+                      lookup: CacheLookup,
+                      response: str, 
+                      sources: List[str], 
+                      sources_detail: List[Dict]):
+        """Cache a successfully generated answer; only answers grounded in search results are stored"""
+        if not sources:
+            return
+        if lookup.key:
+            self.answer_cache.put(lookup.key, response, sources, sources_detail, lookup.corpus_version)
+        if lookup.query_embedding is not None:
+            self.semantic_cache.put(query, lookup.query_embedding, CachedAnswer(
+                answer=response,
+                sources=list(sources),
+                sources_detail=list(sources_detail),
+                corpus_version=lookup.corpus_version
+            ))
+    
+    def _retrieve_direct(self, query: str) -> str:
+        """Run the course search locally with filters derived from the question"""
+        course_name, lesson_number = self.search_tool.derive_filters(query)
+        # An empty search leaves earlier sources in place, so start from none
+        self.search_tool.last_sources = []
+        self.search_tool.last_sources_detail = []
+        context = self.search_tool.execute(
+            query=query,
+            course_name=course_name,
+            lesson_number=lesson_number
+        )
+        
+        # Derived filters can be too narrow - fall back to an unfiltered search
+        if not self.search_tool.last_sources and (course_name or lesson_number is not None):
+            context = self.search_tool.execute(query=query)
+        
+        return context
+    
+    def _speculative_query(self, query: str) -> Optional[str]:
+        """Raw question to search speculatively during the tool-selection call, if enabled"""
+        return query if self.config.SPECULATIVE_RETRIEVAL else None
+    
+    def _prepare_query(self, query: str, session_id: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Build the AI prompt and fetch conversation history for a query"""
+        # Create prompt for the AI with clear instructions
+        prompt = f"""Answer this question about course materials: {query}"""
+        
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+        
+        return prompt, history
+    
+    def _collect_sources(self) -> Dict[str, List]:
+        """Get sources and detailed sources from the last tool search"""
+        return {
+            "sources": self.tool_manager.get_last_sources(),
+            "sources_detail": self.tool_manager.get_last_sources_detail()
+        }
+    
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
@@ -1,7 +1,14 @@
-from typing import Dict, Any, Optional, Protocol
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional, Protocol, Tuple
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from vector_store import VectorStore, SearchResults
+from course_resolver import course_aliases
 from config import config
+from query_executor import query_executor
 
 
 class Tool(ABC):
@@ -35,13 +42,189 @@ class Tool(ABC):
         pass
 
 
+def normalize_search_text(text: Optional[str]) -> str:
+    """Normalize search text for comparison: casefold, drop punctuation, collapse whitespace"""
+    if not text:
+        return ""
+    return ' '.join(re.findall(r'\w+', text.casefold()))
+
+
+class SpeculationStats:
+    """Thread-safe counters describing whether speculative retrieval pays off"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.launched = 0        # Speculative searches started
+        self.skipped = 0         # Not started because every speculation worker was busy
+        self.hits = 0            # Reused because the model asked for the same search
+        self.misses = 0          # Discarded because the model asked for a different search
+        self.unused = 0          # Discarded because the model made no search call
+        self.time_saved = 0.0    # Seconds of search latency hidden behind the tool-selection call
+        self.time_wasted = 0.0   # Seconds spent on searches that were discarded
+    
+    def record(self, outcome: str, seconds: float = 0.0):
+        """Record the outcome of one speculative search"""
+        with self._lock:
+            if outcome == "launched":
+                self.launched += 1
+            elif outcome == "skipped":
+                self.skipped += 1
+            elif outcome == "hit":
+                self.hits += 1
+                self.time_saved += seconds
+            elif outcome == "miss":
+                self.misses += 1
+                self.time_wasted += seconds
+            elif outcome == "unused":
+                self.unused += 1
+                self.time_wasted += seconds
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of the counters for reporting"""
+        with self._lock:
+            resolved = self.hits + self.misses + self.unused
+            return {
+                "launched": self.launched,
+                "skipped": self.skipped,
+                "hits": self.hits,
+                "misses": self.misses,
+                "unused": self.unused,
+                "hit_rate": round(self.hits / resolved, 3) if resolved else 0.0,
+                "time_saved_ms": round(self.time_saved * 1000, 1),
+                "time_wasted_ms": round(self.time_wasted * 1000, 1)
+            }
+
+
+class SpeculativeSearch:
+    """A course search started on the raw user query before the model has chosen its arguments"""
+    
+    def __init__(self, tool: 'CourseSearchTool', query: str):
+        self.tool = tool
+        self.query = query
+        self.course_title: Optional[str] = None
+        self.lesson_number: Optional[int] = None
+        self.search_seconds = 0.0
+        self.resolved = False
+        self._filters_ready = threading.Event()
+        self._future = None
+        self._on_finish: Optional[Callable[[], None]] = None
+    
+    def start(self, executor: ThreadPoolExecutor, on_finish: Callable[[], None]):
+        """Submit the search to the speculation pool; on_finish runs once it has completed"""
+        self._on_finish = on_finish
+        self._future = executor.submit(self._run)
+        self.tool.speculation_stats.record("launched")
+    
+    def _run(self):
+        try:
+            try:
+                self.course_title, self.lesson_number = self.tool.derive_filters(self.query)
+            finally:
+                self._filters_ready.set()
+            
+            start = time.perf_counter()
+            try:
+                return self.tool.store.search(
+                    query=self.query,
+                    course_name=self.course_title,
+                    lesson_number=self.lesson_number
+                )
+            finally:
+                self.search_seconds = time.perf_counter() - start
+        finally:
+            self._on_finish()
+    
+    def matches(self, query: str, course_name: Optional[str], lesson_number: Optional[int]) -> bool:
+        """Check whether the model's search arguments equal the speculative ones after normalization"""
+        self._filters_ready.wait()
+        
+        if normalize_search_text(query) != normalize_search_text(self.query):
+            return False
+        
+        try:
+            lesson_number = int(lesson_number) if lesson_number is not None else None
+        except (TypeError, ValueError):
+            return False
+        if lesson_number != self.lesson_number:
+            return False
+        
+        if not course_name or not self.course_title:
+            return not course_name and not self.course_title
+        aliases = CourseSearchTool._course_aliases(self.course_title)
+        return normalize_search_text(course_name) in aliases
+    
+    def take(self) -> SearchResults:
+        """Use the speculative results, waiting for the search to finish if needed"""
+        wait_start = time.perf_counter()
+        results = self._future.result()
+        waited = time.perf_counter() - wait_start
+        self.resolved = True
+        self.tool.speculation_stats.record("hit", max(0.0, self.search_seconds - waited))
+        return results
+    
+    def discard(self, outcome: str = "miss"):
+        """Drop the speculative results ("miss" or "unused")"""
+        if self.resolved:
+            return
+        self.resolved = True
+        if not self._future.cancel():
+            # Already running or finished - count its cost once it completes
+            self._future.add_done_callback(
+                lambda _: self.tool.speculation_stats.record(outcome, self.search_seconds)
+            )
+        else:
+            # Cancelled before it ran, so _run will not release its worker slot
+            self._on_finish()
+            self.tool.speculation_stats.record(outcome)
+
+
+# Sources recorded by each tool, tracked per execution context so concurrent
+# queries running on the query executor never see each other's sources. The
+# values are dicts keyed by tool, replaced (never mutated) on every write.
+_last_sources: ContextVar[Optional[Dict['Tool', list]]] = ContextVar("last_sources", default=None)
+_last_sources_detail: ContextVar[Optional[Dict['Tool', list]]] = ContextVar("last_sources_detail", default=None)
+
+
+def _get_tool_value(var: ContextVar, tool: 'Tool') -> list:
+    return (var.get() or {}).get(tool) or []
+
+
+def _set_tool_value(var: ContextVar, tool: 'Tool', value: list):
+    values = dict(var.get() or {})
+    values[tool] = value
+    var.set(values)
+
+
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
     
+    LESSON_PATTERN = re.compile(r'\blesson\s+(\d+)\b', re.IGNORECASE)
+    
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
-        self.last_sources = []  # Track sources from last search
-        self.last_sources_detail = []  # Track detailed sources with links
+        self.speculation_stats = SpeculationStats()
+        self._speculation_pool = None
+        self._speculation_lock = threading.Lock()
+        # Free speculation workers; searches are skipped rather than queued when none is free
+        self._speculation_slots = threading.BoundedSemaphore(config.SPECULATIVE_WORKERS)
+    
+    @property
+    def last_sources(self) -> list:
+        """Sources from the last search in the current context"""
+        return _get_tool_value(_last_sources, self)
+    
+    @last_sources.setter
+    def last_sources(self, sources: list):
+        _set_tool_value(_last_sources, self, sources)
+    
+    @property
+    def last_sources_detail(self) -> list:
+        """Detailed sources with links from the last search in the current context"""
+        return _get_tool_value(_last_sources_detail, self)
+    
+    @last_sources_detail.setter
+    def last_sources_detail(self, sources_detail: list):
+        _set_tool_value(_last_sources_detail, self, sources_detail)
     
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Claude tool definition for this tool"""
@@ -68,7 +251,38 @@ class CourseSearchTool(Tool):
             }
         }
     
-    def execute(self, query: str, course_name: Optional[str] = None, lesson_number: Optional[int] = None) -> str:
+    def speculate(self, query: str) -> Optional[SpeculativeSearch]:
+        """
+        Start a search on the raw user query in the background.
+        
+        The result is reused by execute() if the model later asks for the
+        same search, hiding the search latency behind the tool-selection call.
+        Speculative searches run on their own pool of SPECULATIVE_WORKERS
+        threads; when all of them are busy no search is started.
+        
+        Returns:
+            The running speculative search, or None if it was skipped
+        """
+        if not self._speculation_slots.acquire(blocking=False):
+            self.speculation_stats.record("skipped")
+            return None
+        
+        with self._speculation_lock:
+            if self._speculation_pool is None:
+                self._speculation_pool = ThreadPoolExecutor(
+                    max_workers=config.SPECULATIVE_WORKERS,
+                    thread_name_prefix="rag-speculate"
+                )
+        
+        speculation = SpeculativeSearch(self, query)
+        speculation.start(self._speculation_pool, self._speculation_slots.release)
+        return speculation
+    
+    def execute(self, 
+                query: str, 
+                course_name: Optional[str] = None, 
+                lesson_number: Optional[int] = None,
+                speculation: Optional[SpeculativeSearch] = None) -> str:
         """
         Execute the search tool with given parameters.
         
@@ -76,17 +290,24 @@ class CourseSearchTool(Tool):
             query: What to search for
             course_name: Optional course filter
             lesson_number: Optional lesson filter
+            speculation: Optional speculative search to reuse if its arguments match
             
         Returns:
             Formatted search results or error message
         """
         
-        # Use the vector store's unified search interface
-        results = self.store.search(
-            query=query,
-            course_name=course_name,
-            lesson_number=lesson_number
-        )
+        if speculation and not speculation.resolved and speculation.matches(query, course_name, lesson_number):
+            results = speculation.take()
+        else:
+            if speculation:
+                speculation.discard("miss")
+            
+            # Use the vector store's unified search interface
+            results = self.store.search(
+                query=query,
+                course_name=course_name,
+                lesson_number=lesson_number
+            )
         
         # Handle errors
         if results.error:
@@ -104,6 +325,39 @@ class CourseSearchTool(Tool):
         # Format and return results
         return self._format_results(results)
     
+    def derive_filters(self, query: str) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Derive course and lesson filters from a question without an LLM call.
+        
+        A course matches when its full title, the part before a colon
+        (e.g. "MCP") or its acronym appears in the question as whole words.
+        
+        Args:
+            query: The user's question
+            
+        Returns:
+            Tuple of (course title or None, lesson number or None)
+        """
+        lesson_match = self.LESSON_PATTERN.search(query)
+        lesson_number = int(lesson_match.group(1)) if lesson_match else None
+        
+        padded_query = f" {' '.join(re.findall(r'\w+', query.casefold()))} "
+        course_title = None
+        best_length = 0
+        for title in self.store.get_existing_course_titles():
+            for alias in self._course_aliases(title):
+                # Prefer the longest matching alias
+                if f" {alias} " in padded_query and len(alias) > best_length:
+                    course_title = title
+                    best_length = len(alias)
+        
+        return course_title, lesson_number
+    
+    @staticmethod
+    def _course_aliases(title: str) -> set:
+        """Normalized phrases that identify a course in a question"""
+        return course_aliases(title)
+    
     def _format_results(self, results: SearchResults) -> str:
         """Format search results with course and lesson context"""
         formatted = []
@@ -179,12 +433,67 @@ class ToolManager:
         else:
             return self.get_tool_definitions()
     
-    def execute_tool(self, tool_name: str, **kwargs) -> str:
+    def execute_tool(self, tool_name: str, speculation: Optional[SpeculativeSearch] = None, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
         if tool_name not in self.tools:
             return f"Tool '{tool_name}' not found"
         
-        return self.tools[tool_name].execute(**kwargs)
+        tool = self.tools[tool_name]
+        if speculation is not None and speculation.tool is tool:
+            return tool.execute(speculation=speculation, **kwargs)
+        return tool.execute(**kwargs)
+    
+    def start_speculation(self, query: str) -> Optional['SpeculativeToolSession']:
+        """Start a speculative search on the first tool that supports it"""
+        for tool in self.tools.values():
+            if hasattr(tool, 'speculate'):
+                speculation = tool.speculate(query)
+                return SpeculativeToolSession(self, speculation) if speculation else None
+        return None
+    
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Get speculative retrieval counters from all tools that speculate"""
+        return {
+            name: tool.speculation_stats.to_dict()
+            for name, tool in self.tools.items()
+            if hasattr(tool, 'speculation_stats')
+        }
+    
+    async def aexecute_tool(self, tool_name: str, **kwargs) -> str:
+        """Execute a tool by name on the query executor without blocking the event loop"""
+        return await self.run_with_sources(self.execute_tool, tool_name, **kwargs)
+    
+    async def run_with_sources(self, func, *args, **kwargs):
+        """
+        Run synchronous tool work on the query executor.
+        
+        Sources recorded by tools in the worker thread are carried back into
+        the caller's context, so async callers can read them afterwards.
+        """
+        def call():
+            self.reset_sources()
+            result = func(*args, **kwargs)
+            return result, self._snapshot_sources()
+        
+        result, snapshot = await query_executor.run(call)
+        self._restore_sources(snapshot)
+        return result
+    
+    def _snapshot_sources(self) -> Dict[str, tuple]:
+        """Capture the sources currently tracked by each tool"""
+        return {
+            name: (getattr(tool, 'last_sources', []), getattr(tool, 'last_sources_detail', []))
+            for name, tool in self.tools.items()
+        }
+    
+    def _restore_sources(self, snapshot: Dict[str, tuple]):
+        """Restore tool sources captured by _snapshot_sources"""
+        for name, (sources, sources_detail) in snapshot.items():
+            tool = self.tools[name]
+            if hasattr(tool, 'last_sources'):
+                tool.last_sources = sources
+            if hasattr(tool, 'last_sources_detail'):
+                tool.last_sources_detail = sources_detail
     
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
@@ -208,4 +517,23 @@ class ToolManager:
             if hasattr(tool, 'last_sources'):
                 tool.last_sources = []
             if hasattr(tool, 'last_sources_detail'):
-                tool.last_sources_detail = []
\ No newline at end of file
+                tool.last_sources_detail = []
+
+
+class SpeculativeToolSession:
+    """ToolManager view that offers a speculative search to the tool calls of one query"""
+    
+    def __init__(self, tool_manager: ToolManager, speculation: SpeculativeSearch):
+        self._tool_manager = tool_manager
+        self.speculation = speculation
+    
+    def execute_tool(self, tool_name: str, **kwargs) -> str:
+        """Execute a tool, letting it reuse the speculative search if the arguments match"""
+        return self._tool_manager.execute_tool(tool_name, speculation=self.speculation, **kwargs)
+    
+    def finish(self):
+        """Discard the speculative search if no tool call used it"""
+        self.speculation.discard("unused")
+    
+    def __getattr__(self, name):
+        return getattr(self._tool_manager, name)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import threading
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
@@ -14,25 +15,28 @@ class SessionManager:
         self.max_history = max_history
         self.sessions: Dict[str, List[Message]] = {}
         self.session_counter = 0
+        self._lock = threading.Lock()  # Sessions are updated from concurrent query threads
     
     def create_session(self) -> str:
         """Create a new conversation session"""
-        self.session_counter += 1
-        session_id = f"session_{self.session_counter}"
-        self.sessions[session_id] = []
+        with self._lock:
+            self.session_counter += 1
+            session_id = f"session_{self.session_counter}"
+            self.sessions[session_id] = []
         return session_id
     
     def add_message(self, session_id: str, role: str, content: str):
         """Add a message to the conversation history"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-        
-        message = Message(role=role, content=content)
-        self.sessions[session_id].append(message)
-        
-        # Keep conversation history within limits
-        if len(self.sessions[session_id]) > self.max_history * 2:
-            self.sessions[session_id] = self.sessions[session_id][-self.max_history * 2:]
+        with self._lock:
+            if session_id not in self.sessions:
+                self.sessions[session_id] = []
+            
+            message = Message(role=role, content=content)
+            self.sessions[session_id].append(message)
+            
+            # Keep conversation history within limits
+            if len(self.sessions[session_id]) > self.max_history * 2:
+                self.sessions[session_id] = self.sessions[session_id][-self.max_history * 2:]
     
     def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
         """Add a complete question-answer exchange"""
@@ -44,7 +48,7 @@ class SessionManager:
         if not session_id or session_id not in self.sessions:
             return None
         
-        messages = self.sessions[session_id]
+        messages = list(self.sessions[session_id])
         if not messages:
             return None
         
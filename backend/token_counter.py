@@ -0,0 +1,127 @@
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+
+class TokenCounter:
+    """
+    Count word-piece tokens with the embedding model's own tokenizer.
+
+    Counts exclude the special tokens the model adds around every input
+    (see special_tokens). Texts are tokenized in one batch per call, and
+    counts of short texts such as sentences are kept in an LRU cache.
+    """
+
+    def __init__(self, tokenizer, max_seq_length: int, model_name: Optional[str] = None, cache_size: int = 100_000):
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.special_tokens = tokenizer.num_special_tokens_to_add()
+        # Fast tokenizers must not be used from several threads at once
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def count(self, texts: List[str], cache: bool = True) -> List[int]:
+        """
+        Count tokens of each text.
+
+        Args:
+            texts: Texts to count
+            cache: Whether to look up and remember counts (off for long one-off texts)
+
+        Returns:
+            Token count per text, without special tokens
+        """
+        with self._lock:
+            counts: List[Optional[int]] = [None] * len(texts)
+            missing: Dict[str, List[int]] = {}
+            for position, text in enumerate(texts):
+                if cache and text in self._cache:
+                    self._cache.move_to_end(text)
+                    counts[position] = self._cache[text]
+                    self._stats["hits"] += 1
+                elif text in missing:
+                    # Repeated within the batch: tokenized once
+                    missing[text].append(position)
+                    self._stats["hits"] += 1
+                else:
+                    missing[text] = [position]
+
+            if missing:
+                unique_texts = list(missing)
+                self._stats["misses"] += len(unique_texts)
+                encoded = self.tokenizer(unique_texts, add_special_tokens=False)["input_ids"]
+                for text, ids in zip(unique_texts, encoded):
+                    for position in missing[text]:
+                        counts[position] = len(ids)
+                    if cache:
+                        self._cache[text] = len(ids)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return counts
+
+    def sequence_lengths(self, texts: List[str]) -> List[int]:
+        """Length of each text as the model sees it, special tokens included"""
+        return [count + self.special_tokens for count in self.count(texts, cache=False)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            return {**self._stats, "entries": len(self._cache), "model": self.model_name}
+
+
+@lru_cache(maxsize=None)
+def load_token_counter(model_name: str, max_seq_length: int) -> TokenCounter:
+    """Load the tokenizer of a sentence-transformers model (once per process)"""
+    from transformers import AutoTokenizer
+
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return TokenCounter(AutoTokenizer.from_pretrained(repo_id), max_seq_length, model_name)
+
+
+class TokenReport:
+    """Histogram of embedded chunk lengths in tokens and how many the model truncates"""
+
+    BUCKETS = (32, 64, 128, 192, 256, 384, 512)
+
+    def __init__(self, max_seq_length: int):
+        self.max_seq_length = max_seq_length
+        self.histogram = [0] * (len(self.BUCKETS) + 1)
+        self.chunks = 0
+        self.tokens = 0
+        self.longest = 0
+        self.truncated = 0
+        self.truncated_tokens = 0
+
+    def record(self, lengths: List[int]):
+        """Add chunk lengths (special tokens included)"""
+        for length in lengths:
+            self.histogram[bisect_left(self.BUCKETS, length)] += 1
+            self.chunks += 1
+            self.tokens += length
+            self.longest = max(self.longest, length)
+            if length > self.max_seq_length:
+                self.truncated += 1
+                self.truncated_tokens += length - self.max_seq_length
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = []
+        lower = 0
+        for upper in self.BUCKETS:
+            labels.append(f"{lower + 1}-{upper}")
+            lower = upper
+        labels.append(f">{lower}")
+        return {
+            "max_seq_length": self.max_seq_length,
+            "chunks": self.chunks,
+            "mean_tokens": round(self.tokens / self.chunks, 1) if self.chunks else 0.0,
+            "longest": self.longest,
+            "histogram": dict(zip(labels, self.histogram)),
+            # Chunks longer than the model's limit and the tokens it never sees
+            "truncated_chunks": self.truncated,
+            "truncated_tokens": self.truncated_tokens
+        }
@@ -1,8 +1,19 @@
+import hashlib
+import json
+import os
+import threading
 import chromadb
+import numpy as np
 from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
-from models import Course, CourseChunk
+from models import ChunkBatch, Course, CourseChunk
+from course_resolver import CourseNameResolver
+from embedding_cache import EmbeddingCache
+from embedding_store import EmbeddingStore
+from numpy_store import NumpyCollection
+from index_snapshot import SnapshotCollection, current_snapshot, publish_snapshot, read_snapshot_info
+from lexical_index import LexicalIndex
 from sentence_transformers import SentenceTransformer
 
 @dataclass
@@ -32,27 +43,117 @@ class SearchResults:
         return len(self.documents) == 0
 
 class VectorStore:
-    """Vector storage using ChromaDB for course content and metadata"""
+    """
+    Vector storage for course content and metadata.
     
-    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
+    Collections are ChromaDB collections by default; with backend="numpy"
+    they are NumpyCollections (exact brute-force search, persisted under
+    numpy_path) behind the same interface. With backend="snapshot" the store
+    is read-only and serves the index snapshot last published under
+    snapshot_path from memory-mapped files (see publish_index_snapshot);
+    quantization "int8" makes it scan a quantized copy and
+    re-score the best rescore_factor * limit candidates in float32.
+    
+    Chunk text is also kept in a BM25 LexicalIndex (persisted at
+    lexical_index_path), which search uses in "lexical" and "hybrid" modes.
+    It is loaded at startup in those modes and otherwise on first use; a
+    snapshot store reads the copy published with its snapshot generation.
+    """
+    
+    BACKENDS = ("chroma", "numpy", "snapshot")
+    # Content metadata fields stored as code arrays for mask filters
+    INDEXED_FIELDS = {"course_content": ("course_title", "lesson_number")}
+    SEARCH_MODES = ("vector", "lexical", "hybrid")
+    # File name of the lexical index inside a snapshot generation
+    SNAPSHOT_LEXICAL_INDEX = "lexical_index.json"
+    # Reciprocal rank fusion constant and candidates taken from each ranking per result
+    RRF_K = 60
+    HYBRID_CANDIDATES = 4
+    
+    def __init__(self, 
+                 chroma_path: str, 
+                 embedding_model: str, 
+                 max_results: int = 5, 
+                 embedding_cache_size: int = 1024,
+                 embedding_store_path: Optional[str] = None,
+                 backend: str = "chroma",
+                 numpy_path: Optional[str] = None,
+                 snapshot_path: Optional[str] = None,
+                 quantization: str = "float32",
+                 rescore_factor: int = 4,
+                 lexical_index_path: Optional[str] = None,
+                 search_mode: str = "vector"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown vector backend: {backend}")
+        if search_mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {search_mode}")
         self.max_results = max_results
+        self.backend = backend
+        self.search_mode = search_mode
+        self.numpy_path = numpy_path or chroma_path
+        self.snapshot_path = snapshot_path
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        if backend == "snapshot" and not snapshot_path:
+            raise ValueError("The snapshot backend needs a snapshot path")
+        self._snapshot_directory = current_snapshot(snapshot_path) if backend == "snapshot" else None
         # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=chroma_path,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        self.client = None
+        if backend == "chroma":
+            self.client = chromadb.PersistentClient(
+                path=chroma_path,
+                settings=Settings(anonymized_telemetry=False)
+            )
         
         # Set up sentence transformer embedding function
         self.embedding_function = chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
             model_name=embedding_model
         )
+        # Query embeddings are shared by both collections and reused across requests
+        self.query_embedding_cache = EmbeddingCache(self.embedding_function, embedding_model, embedding_cache_size)
+        # Chunk embeddings persisted outside Chroma so rebuilds skip unchanged chunks
+        self.embedding_store = EmbeddingStore(embedding_store_path, embedding_model) if embedding_store_path else None
         
         # Create collections for different types of data
         self.course_catalog = self._create_collection("course_catalog")  # Course titles/instructors
         self.course_content = self._create_collection("course_content")  # Actual course material
+        
+        # Fingerprint of the stored corpus, recomputed lazily after writes;
+        # the write counter keeps a fingerprint computed during a write from being kept
+        self._corpus_version: Optional[str] = None
+        self._corpus_writes = 0
+        # Whether writes happened since the index snapshot was last published
+        self._snapshot_stale = False
+        
+        # Write-through copy of the course catalog so source links cost no I/O
+        self._catalog_lock = threading.RLock()
+        self._catalog: Dict[str, Dict[str, Any]] = {}
+        self._lesson_index: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        
+        # Local course-name resolution; the catalog query is only a fallback
+        self.course_resolver = CourseNameResolver(self.embed_texts, fallback=self._query_course_catalog)
+        self._load_catalog()
+        
+        # BM25 index over chunk text; None until loaded (vector mode never needs it)
+        self.lexical_index_path = lexical_index_path
+        self.lexical_index: Optional[LexicalIndex] = None
+        self._lexical_lock = threading.Lock()
+        if search_mode != "vector":
+            self._get_lexical_index()
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed query-like texts with the collections' model, going through the query embedding cache"""
+        return np.stack(self.query_embedding_cache.get_embeddings(texts))
     
     def _create_collection(self, name: str):
-        """Create or get a ChromaDB collection"""
+        """Create or get a collection of the configured backend"""
+        if self.backend == "numpy":
+            return NumpyCollection(self.numpy_path, name, self.embedding_function, self.INDEXED_FIELDS.get(name, ()))
+        if self.backend == "snapshot":
+            if self._snapshot_directory is None:
+                print(f"No index snapshot published under {self.snapshot_path} - serving an empty index")
+                return SnapshotCollection(None)
+            return SnapshotCollection(os.path.join(self._snapshot_directory, name), self.quantization, self.rescore_factor)
         return self.client.get_or_create_collection(
             name=name,
             embedding_function=self.embedding_function
@@ -62,7 +163,8 @@ class VectorStore:
                query: str,
                course_name: Optional[str] = None,
                lesson_number: Optional[int] = None,
-               limit: Optional[int] = None) -> SearchResults:
+               limit: Optional[int] = None,
+               mode: Optional[str] = None) -> SearchResults:
         """
         Main search interface that handles course resolution and content search.
         
@@ -71,10 +173,19 @@ class VectorStore:
             course_name: Optional course name/title to filter by
             lesson_number: Optional lesson number to filter by
             limit: Maximum results to return
+            mode: "vector" (embedding similarity), "lexical" (BM25, no model
+                inference) or "hybrid" (both rankings fused by reciprocal
+                rank); defaults to the store's search_mode
             
         Returns:
-            SearchResults object with documents and metadata
+            SearchResults object with documents and metadata. Distances are
+            embedding distances in vector mode and negated BM25 / fused
+            scores otherwise, so lower is better in every mode.
         """
+        mode = mode or self.search_mode
+        if mode not in self.SEARCH_MODES:
+            return SearchResults.empty(f"Unknown search mode: {mode}")
+        
         # Step 1: Resolve course name if provided
         course_title = None
         if course_name:
@@ -89,9 +200,13 @@ class VectorStore:
         # Use provided limit or fall back to configured max_results
         search_limit = limit if limit is not None else self.max_results
         
+        if mode == "lexical":
+            return self._lexical_search(query, course_title, lesson_number, search_limit)
+        if mode == "hybrid":
+            return self._hybrid_search(query, course_title, lesson_number, filter_dict, search_limit)
         try:
             results = self.course_content.query(
-                query_texts=[query],
+                query_embeddings=[self.embed_texts([query])[0].tolist()],
                 n_results=search_limit,
                 where=filter_dict
             )
@@ -99,11 +214,55 @@ class VectorStore:
         except Exception as e:
             return SearchResults.empty(f"Search error: {str(e)}")
     
+    def _lexical_search(self, query: str, course_title: Optional[str], lesson_number: Optional[int],
+                        limit: int) -> SearchResults:
+        hits = self._get_lexical_index().search(query, limit, course_title, lesson_number)
+        return SearchResults(
+            documents=[document for _, document, _, _ in hits],
+            metadata=[metadata for _, _, metadata, _ in hits],
+            distances=[-score for _, _, _, score in hits]
+        )
+    
+    def _hybrid_search(self, query: str, course_title: Optional[str], lesson_number: Optional[int],
+                       filter_dict: Optional[Dict], limit: int) -> SearchResults:
+        """Fuse vector and BM25 rankings with reciprocal rank fusion"""
+        candidates = limit * self.HYBRID_CANDIDATES
+        lexical_hits = self._get_lexical_index().search(query, candidates, course_title, lesson_number)
+        try:
+            results = self.course_content.query(
+                query_embeddings=[self.embed_texts([query])[0].tolist()],
+                n_results=candidates,
+                where=filter_dict
+            )
+        except Exception as e:
+            # The lexical ranking alone still answers when embedding fails
+            print(f"Vector search failed, using lexical results: {e}")
+            return self._lexical_search(query, course_title, lesson_number, limit)
+        
+        fused: Dict[str, float] = {}
+        entries: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        vector_hits = zip(results['ids'][0], results['documents'][0], results['metadatas'][0])
+        for ranking in (vector_hits, ((chunk_id, document, metadata) for chunk_id, document, metadata, _ in lexical_hits)):
+            for rank, (chunk_id, document, metadata) in enumerate(ranking):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.RRF_K + rank + 1)
+                entries[chunk_id] = (document, metadata)
+        
+        best = sorted(fused, key=lambda chunk_id: fused[chunk_id], reverse=True)[:limit]
+        return SearchResults(
+            documents=[entries[chunk_id][0] for chunk_id in best],
+            metadata=[entries[chunk_id][1] for chunk_id in best],
+            distances=[-fused[chunk_id] for chunk_id in best]
+        )
+    
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
+        """Find the best matching course title for a course name"""
+        return self.course_resolver.resolve(course_name)
+    
+    def _query_course_catalog(self, course_name: str) -> Optional[str]:
         """Use vector search to find best matching course by name"""
         try:
             results = self.course_catalog.query(
-                query_texts=[course_name],
+                query_embeddings=[self.embed_texts([course_name])[0].tolist()],
                 n_results=1
             )
             
@@ -132,10 +291,53 @@ class VectorStore:
             
         return {"lesson_number": lesson_number}
     
+    def get_corpus_version(self) -> str:
+        """
+        Get a fingerprint of the stored corpus.
+        
+        The version is a digest of every catalog entry and of every chunk's ID
+        and content hash, so any write that changes stored content (including
+        editing a chunk's text in place) changes it, and caches keyed by it are
+        invalidated automatically. Processes holding the same data agree on it.
+        """
+        version = self._corpus_version
+        if version is not None:
+            return version
+        
+        writes = self._corpus_writes
+        digest = hashlib.sha1()
+        with self._catalog_lock:
+            courses = sorted(self._catalog.items())
+        for title, course_meta in courses:
+            digest.update(json.dumps(course_meta, sort_keys=True).encode('utf-8'))
+            digest.update(b'\0')
+        
+        stored = self.course_content.get(include=["metadatas"])
+        hashes = {
+            chunk_id: (metadata or {}).get("content_hash")
+            for chunk_id, metadata in zip(stored['ids'], stored['metadatas'])
+        }
+        # Chunks written before content hashes existed are hashed from their text
+        unhashed = [chunk_id for chunk_id, content_hash in hashes.items() if not content_hash]
+        if unhashed:
+            legacy = self.course_content.get(ids=unhashed, include=["documents"])
+            for chunk_id, document in zip(legacy['ids'], legacy['documents']):
+                hashes[chunk_id] = self.content_hash(document or "")
+        for chunk_id in sorted(hashes):
+            digest.update(f"{chunk_id}\0{hashes[chunk_id]}\0".encode('utf-8'))
+        
+        version = digest.hexdigest()
+        if writes == self._corpus_writes:
+            self._corpus_version = version
+        return version
+    
+    def _corpus_changed(self):
+        self._corpus_writes += 1
+        self._corpus_version = None
+        self._snapshot_stale = True
+    
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
-
         course_text = course.title
         
         # Build lessons metadata and serialize as JSON string
@@ -147,121 +349,353 @@ class VectorStore:
                 "lesson_link": lesson.lesson_link
             })
         
-        self.course_catalog.add(
+        metadata = {
+            "title": course.title,
+            "instructor": course.instructor,
+            "course_link": course.course_link,
+            "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
+            "lesson_count": len(course.lessons)
+        }
+        # Upsert so re-ingesting an edited course refreshes its catalog entry
+        self.course_catalog.upsert(
             documents=[course_text],
-            metadatas=[{
-                "title": course.title,
-                "instructor": course.instructor,
-                "course_link": course.course_link,
-                "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
-                "lesson_count": len(course.lessons)
-            }],
+            metadatas=[metadata],
             ids=[course.title]
         )
+        self._remember_course(metadata)
+        self._corpus_changed()
     
-    def add_course_content(self, chunks: List[CourseChunk]):
-        """Add course content chunks to the vector store"""
+    def add_course_content(self, chunks: Union[ChunkBatch, List[CourseChunk]], embeddings: Optional[np.ndarray] = None):
+        """Add course content chunks to the vector store, embedding them unless embeddings are given"""
         if not chunks:
             return
         
-        documents = [chunk.content for chunk in chunks]
-        metadatas = [{
-            "course_title": chunk.course_title,
-            "lesson_number": chunk.lesson_number,
-            "chunk_index": chunk.chunk_index
-        } for chunk in chunks]
+        batch = ChunkBatch.from_chunks(chunks)
+        documents = batch.contents
+        metadatas = self._chunk_metadatas(batch)
         # Use title with chunk index for unique IDs
-        ids = [f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}" for chunk in chunks]
+        ids = self.chunk_ids(batch)
+        
+        if embeddings is None:
+            embeddings = self.embed_documents(documents)
         
         self.course_content.add(
             documents=documents,
+            embeddings=embeddings,
             metadatas=metadatas,
             ids=ids
         )
+        self._update_lexical_index(lambda index: index.add(ids, documents, metadatas))
+        self._corpus_changed()
+    
+    def sync_course_content(self, course_title: str, chunks: Union[ChunkBatch, List[CourseChunk]]) -> Dict[str, int]:
+        """
+        Bring a course's stored chunks in line with a new list of chunks.
+        
+        Chunks whose ID and content hash are unchanged are left untouched,
+        new or changed chunks are upserted and vanished chunks are deleted.
+        Embeddings of chunk texts already stored (even under another ID,
+        e.g. after an inserted paragraph shifts chunk indexes) are reused.
+        
+        Returns:
+            Counts of unchanged, upserted and deleted chunks and of reused
+            and computed embeddings
+        """
+        stored = self.course_content.get(where={"course_title": course_title}, include=["metadatas", "documents"])
+        stored_hashes = {}
+        for chunk_id, metadata, document in zip(stored['ids'], stored['metadatas'], stored['documents']):
+            # Chunks written before content hashes existed are hashed from their text
+            stored_hashes[chunk_id] = (metadata or {}).get("content_hash") or self.content_hash(document)
+        
+        batch = ChunkBatch.from_chunks(chunks)
+        new_ids = self.chunk_ids(batch)
+        new_hashes = [self.content_hash(content) for content in batch.contents]
+        changed = [
+            position for position, (chunk_id, content_hash) in enumerate(zip(new_ids, new_hashes))
+            if stored_hashes.get(chunk_id) != content_hash
+        ]
+        vanished = sorted(set(stored_hashes) - set(new_ids))
+        result = {
+            "unchanged": len(batch) - len(changed),
+            "upserted": len(changed),
+            "deleted": len(vanished),
+            "reused_embeddings": len(batch) - len(changed),
+            "computed_embeddings": 0
+        }
+        
+        if changed:
+            # Reuse stored vectors for texts that moved to a different chunk ID
+            ids_by_hash = {content_hash: chunk_id for chunk_id, content_hash in stored_hashes.items()}
+            reusable_ids = sorted({
+                ids_by_hash[new_hashes[position]] for position in changed
+                if new_hashes[position] in ids_by_hash
+            })
+            vectors_by_hash = {}
+            if reusable_ids:
+                existing = self.course_content.get(ids=reusable_ids, include=["embeddings"])
+                for chunk_id, vector in zip(existing['ids'], existing['embeddings']):
+                    vectors_by_hash[stored_hashes[chunk_id]] = np.asarray(vector, dtype=np.float32)
+            
+            to_embed = [batch.contents[position] for position in changed if new_hashes[position] not in vectors_by_hash]
+            if to_embed:
+                if self.embedding_store is not None:
+                    result["computed_embeddings"] = sum(not self.embedding_store.contains(text) for text in set(to_embed))
+                else:
+                    result["computed_embeddings"] = len(set(to_embed))
+                for text, vector in zip(to_embed, self.embed_documents(to_embed)):
+                    vectors_by_hash[self.content_hash(text)] = vector
+            result["reused_embeddings"] += len(changed) - result["computed_embeddings"]
+            
+            changed_batch = ChunkBatch(
+                [batch.contents[position] for position in changed],
+                [batch.course_titles[position] for position in changed],
+                [batch.lesson_numbers[position] for position in changed],
+                [batch.chunk_indexes[position] for position in changed]
+            )
+            changed_ids = [new_ids[position] for position in changed]
+            changed_metadatas = self._chunk_metadatas(changed_batch)
+            self.course_content.upsert(
+                ids=changed_ids,
+                documents=changed_batch.contents,
+                embeddings=np.stack([vectors_by_hash[new_hashes[position]] for position in changed]),
+                metadatas=changed_metadatas
+            )
+            self._update_lexical_index(lambda index: index.add(changed_ids, changed_batch.contents, changed_metadatas))
+        
+        if vanished:
+            self.course_content.delete(ids=vanished)
+            self._update_lexical_index(lambda index: index.remove(vanished))
+        
+        if changed or vanished:
+            self._corpus_changed()
+        return result
+    
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Hash a chunk's text"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+    
+    def _chunk_metadatas(self, batch: ChunkBatch) -> List[Dict[str, Any]]:
+        """Build the content collection metadata of each chunk in a batch"""
+        return [
+            {
+                "course_title": course_title,
+                "lesson_number": lesson_number,
+                "chunk_index": chunk_index,
+                "content_hash": self.content_hash(content)
+            }
+            for content, course_title, lesson_number, chunk_index in zip(
+                batch.contents, batch.course_titles, batch.lesson_numbers, batch.chunk_indexes
+            )
+        ]
+    
+    @staticmethod
+    def chunk_id(chunk: CourseChunk) -> str:
+        """Get the content collection ID of a chunk"""
+        return f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}"
+    
+    @staticmethod
+    def chunk_ids(batch: ChunkBatch) -> List[str]:
+        """Get the content collection IDs of a batch of chunks (same format as chunk_id)"""
+        return [
+            f"{course_title.replace(' ', '_')}_{chunk_index}"
+            for course_title, chunk_index in zip(batch.course_titles, batch.chunk_indexes)
+        ]
+    
+    def delete_course(self, course_title: str):
+        """Remove a course's catalog entry and all of its content chunks"""
+        self.course_content.delete(where={"course_title": course_title})
+        self.course_catalog.delete(ids=[course_title])
+        self._update_lexical_index(lambda index: index.remove_course(course_title))
+        with self._catalog_lock:
+            self._catalog.pop(course_title, None)
+            self._lesson_index.pop(course_title, None)
+        self.course_resolver.remove_titles([course_title])
+        self._corpus_changed()
+    
+    def embed_documents(self, documents: List[str]) -> np.ndarray:
+        """Embed chunk texts, reusing vectors from the persistent embedding store when enabled"""
+        if self.embedding_store is not None:
+            return self.embedding_store.get_embeddings(documents, self.embedding_function)
+        return np.asarray(self.embedding_function(documents), dtype=np.float32)
+    
+    def flush(self):
+        """Persist pending writes (lexical index and NumPy backend; Chroma persists on every write)"""
+        if self.backend == "numpy":
+            self.course_catalog.persist()
+            self.course_content.persist()
+        if self.lexical_index is not None and not self.read_only:
+            self.lexical_index.persist()
+    
+    def _get_lexical_index(self) -> LexicalIndex:
+        """
+        Get the lexical index, loading it on first use.
+        
+        A snapshot store reads the index published with its snapshot
+        generation; otherwise the index at lexical_index_path is loaded. The
+        index is rebuilt from the content collection if it is missing or out
+        of step (only a writable store persists the rebuilt index).
+        """
+        index = self.lexical_index
+        if index is not None:
+            return index
+        with self._lexical_lock:
+            if self.lexical_index is None:
+                path = self.lexical_index_path
+                if self.read_only:
+                    path = None
+                    if self._snapshot_directory:
+                        path = os.path.join(self._snapshot_directory, self.SNAPSHOT_LEXICAL_INDEX)
+                index = LexicalIndex(path)
+                if index.count() != self.course_content.count():
+                    self._rebuild_lexical_index(index)
+                self.lexical_index = index
+            return self.lexical_index
+    
+    def _update_lexical_index(self, write: Callable[[LexicalIndex], None]):
+        """
+        Apply a write to the lexical index if it is loaded.
+        
+        Otherwise its persisted copy is removed, since it no longer matches
+        the store, so the next load rebuilds it.
+        """
+        with self._lexical_lock:
+            if self.lexical_index is not None:
+                write(self.lexical_index)
+            elif self.lexical_index_path:
+                try:
+                    os.remove(self.lexical_index_path)
+                except FileNotFoundError:
+                    pass
+    
+    def _rebuild_lexical_index(self, index: LexicalIndex):
+        """Index the text of every stored chunk"""
+        stored = self.course_content.get(include=["documents", "metadatas"])
+        index.clear()
+        index.add(stored['ids'], stored['documents'], stored['metadatas'])
+        if not self.read_only:
+            index.persist()
+    
+    @property
+    def read_only(self) -> bool:
+        """Whether the store serves a snapshot and rejects writes"""
+        return self.backend == "snapshot"
+    
+    def publish_index_snapshot(self) -> Optional[str]:
+        """
+        Publish the stored corpus as a memory-mapped index snapshot under snapshot_path.
+        
+        Nothing is written when nothing changed since the last publish (in
+        this process) and the published snapshot has the current corpus
+        version and format. The snapshot info records the recall of
+        quantized search on the content collection; the lexical index is
+        published inside the generation so snapshot stores need not rebuild it.
+        
+        Returns:
+            Name of the new snapshot generation, or None if nothing was written
+        """
+        if not self.snapshot_path or self.read_only:
+            return None
+        corpus_version = self.get_corpus_version()
+        published = read_snapshot_info(self.snapshot_path)
+        if (not self._snapshot_stale and published is not None
+                and published.get("corpus_version") == corpus_version
+                and published.get("format") == SnapshotCollection.FORMAT):
+            return None
+        generation = publish_snapshot(
+            self.snapshot_path,
+            {"course_catalog": self.course_catalog, "course_content": self.course_content},
+            self.INDEXED_FIELDS,
+            corpus_version,
+            self.rescore_factor,
+            recall_collections=("course_content",),
+            extra_files={self.SNAPSHOT_LEXICAL_INDEX: self._get_lexical_index().write_copy}
+        )
+        self._snapshot_stale = False
+        print(f"Published index snapshot {generation}")
+        return generation
+    
+    def get_snapshot_info(self) -> Optional[Dict[str, Any]]:
+        """Info of the snapshot served (snapshot backend) or last published, if any"""
+        if not self.snapshot_path:
+            return None
+        info = read_snapshot_info(self.snapshot_path) or {}
+        if self.read_only:
+            info["serving"] = os.path.basename(self._snapshot_directory) if self._snapshot_directory else None
+            info["serving_quantization"] = self.quantization
+        return info
     
     def clear_all_data(self):
         """Clear all data from both collections"""
         try:
-            self.client.delete_collection("course_catalog")
-            self.client.delete_collection("course_content")
-            # Recreate collections
-            self.course_catalog = self._create_collection("course_catalog")
-            self.course_content = self._create_collection("course_content")
+            if self.backend == "numpy":
+                self.course_catalog.clear()
+                self.course_content.clear()
+                self.flush()
+            else:
+                self.client.delete_collection("course_catalog")
+                self.client.delete_collection("course_content")
+                # Recreate collections
+                self.course_catalog = self._create_collection("course_catalog")
+                self.course_content = self._create_collection("course_content")
         except Exception as e:
             print(f"Error clearing data: {e}")
+        self._update_lexical_index(lambda index: index.clear())
+        if self.lexical_index is not None:
+            self.lexical_index.persist()
+        with self._catalog_lock:
+            self._catalog.clear()
+            self._lesson_index.clear()
+        self.course_resolver.clear()
+        self._corpus_changed()
     
     def get_existing_course_titles(self) -> List[str]:
         """Get all existing course titles from the vector store"""
-        try:
-            # Get all documents from the catalog
-            results = self.course_catalog.get()
-            if results and 'ids' in results:
-                return results['ids']
-            return []
-        except Exception as e:
-            print(f"Error getting existing course titles: {e}")
-            return []
+        with self._catalog_lock:
+            return list(self._catalog)
     
     def get_course_count(self) -> int:
         """Get the total number of courses in the vector store"""
-        try:
-            results = self.course_catalog.get()
-            if results and 'ids' in results:
-                return len(results['ids'])
-            return 0
-        except Exception as e:
-            print(f"Error getting course count: {e}")
-            return 0
+        with self._catalog_lock:
+            return len(self._catalog)
     
     def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all courses in the vector store"""
-        import json
-        try:
-            results = self.course_catalog.get()
-            if results and 'metadatas' in results:
-                # Parse lessons JSON for each course
-                parsed_metadata = []
-                for metadata in results['metadatas']:
-                    course_meta = metadata.copy()
-                    if 'lessons_json' in course_meta:
-                        course_meta['lessons'] = json.loads(course_meta['lessons_json'])
-                        del course_meta['lessons_json']  # Remove the JSON string version
-                    parsed_metadata.append(course_meta)
-                return parsed_metadata
-            return []
-        except Exception as e:
-            print(f"Error getting courses metadata: {e}")
-            return []
+        with self._catalog_lock:
+            return [
+                {**course_meta, "lessons": [dict(lesson) for lesson in course_meta["lessons"]]}
+                for course_meta in self._catalog.values()
+            ]
 
     def get_course_link(self, course_title: str) -> Optional[str]:
         """Get course link for a given course title"""
-        try:
-            # Get course by ID (title is the ID)
-            results = self.course_catalog.get(ids=[course_title])
-            if results and 'metadatas' in results and results['metadatas']:
-                metadata = results['metadatas'][0]
-                return metadata.get('course_link')
-            return None
-        except Exception as e:
-            print(f"Error getting course link: {e}")
-            return None
+        with self._catalog_lock:
+            course_meta = self._catalog.get(course_title)
+            return course_meta.get('course_link') if course_meta else None
     
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
-        import json
+        with self._catalog_lock:
+            lesson = self._lesson_index.get(course_title, {}).get(lesson_number)
+            return lesson.get('lesson_link') if lesson else None
+    
+    def _load_catalog(self):
+        """Load the course catalog from ChromaDB into memory"""
         try:
-            # Get course by ID (title is the ID)
-            results = self.course_catalog.get(ids=[course_title])
-            if results and 'metadatas' in results and results['metadatas']:
-                metadata = results['metadatas'][0]
-                lessons_json = metadata.get('lessons_json')
-                if lessons_json:
-                    lessons = json.loads(lessons_json)
-                    # Find the lesson with matching number
-                    for lesson in lessons:
-                        if lesson.get('lesson_number') == lesson_number:
-                            return lesson.get('lesson_link')
-            return None
+            results = self.course_catalog.get()
         except Exception as e:
-            print(f"Error getting lesson link: {e}")
-    
\ No newline at end of file
+            print(f"Error loading course catalog: {e}")
+            return
+        for metadata in results.get('metadatas') or []:
+            self._remember_course(metadata)
+    
+    def _remember_course(self, metadata: Dict[str, Any]):
+        """Add or replace a course in the in-memory catalog"""
+        course_meta = dict(metadata)
+        course_meta['lessons'] = json.loads(course_meta.pop('lessons_json', None) or '[]')
+        with self._catalog_lock:
+            self._catalog[course_meta['title']] = course_meta
+            self._lesson_index[course_meta['title']] = {
+                lesson.get('lesson_number'): lesson for lesson in course_meta['lessons']
+            }
+        self.course_resolver.add_titles([course_meta['title']])
@@ -76,7 +76,7 @@ async function sendMessage() {
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
     try {
-        const response = await fetch(`${API_URL}/query`, {
+        const response = await fetch(`${API_URL}/query/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -87,18 +87,42 @@ async function sendMessage() {
             })
         });
 
-        if (!response.ok) throw new Error('查询失败');
+        if (!response.ok || !response.body) throw new Error('查询失败');
 
-        const data = await response.json();
-        
-        // Update session ID if new
-        if (!currentSessionId) {
-            currentSessionId = data.session_id;
-        }
+        let sources = null;
+        let sourcesDetail = null;
+        let answer = '';
+        let messageDiv = null;
 
-        // Replace loading message with response
-        loadingMessage.remove();
-        addMessage(data.answer, 'assistant', data.sources, false, data.sources_detail);
+        await readEventStream(response, (event, data) => {
+            if (event === 'sources') {
+                sources = data.sources;
+                sourcesDetail = data.sources_detail;
+            } else if (event === 'token') {
+                // Replace loading message with the streaming answer on first token
+                if (!messageDiv) {
+                    loadingMessage.remove();
+                    messageDiv = createStreamingMessage();
+                }
+                answer += data.text;
+                updateStreamingMessage(messageDiv, answer);
+            } else if (event === 'done') {
+                // Update session ID if new
+                if (!currentSessionId) {
+                    currentSessionId = data.session_id;
+                }
+                // Render the cleaned final answer with its sources
+                if (messageDiv) {
+                    messageDiv.remove();
+                } else {
+                    loadingMessage.remove();
+                }
+                messageDiv = null;
+                addMessage(data.answer, 'assistant', sources, false, sourcesDetail);
+            } else if (event === 'error') {
+                throw new Error(data.detail || '查询失败');
+            }
+        });
 
     } catch (error) {
         // Replace loading message with error
@@ -111,6 +135,46 @@ async function sendMessage() {
     }
 }
 
+// Read a Server-Sent Events response and dispatch each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            onEvent(event, data ? JSON.parse(data) : {});
+        }
+    }
+}
+
+function createStreamingMessage() {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message assistant';
+    messageDiv.innerHTML = '<div class="message-content"></div>';
+    chatMessages.appendChild(messageDiv);
+    return messageDiv;
+}
+
+function updateStreamingMessage(messageDiv, content) {
+    messageDiv.querySelector('.message-content').innerHTML = marked.parse(content);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
 function createLoadingMessage() {
     const messageDiv = document.createElement('div');
     messageDiv.className = 'message assistant';
@@ -0,0 +1,53 @@
+"""
+分块性能基准
+对比原逐句扫描实现与前缀和 + 二分查找实现在 docs 语料和合成长文本上的耗时
+
+用法: python tests/benchmarks/bench_chunk_text.py [合成文本字节数]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'unit'))
+
+from document_processor import DocumentProcessor
+from test_chunk_text import DOCS_PATH, reference_chunk_text, synthetic_text
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings), result
+
+
+def compare(label, text, chunk_size=800, chunk_overlap=100):
+    processor = DocumentProcessor(chunk_size, chunk_overlap)
+    old_seconds, old_chunks = best_of(lambda: reference_chunk_text(text, chunk_size, chunk_overlap))
+    new_seconds, new_chunks = best_of(lambda: processor.chunk_text(text))
+    assert new_chunks == old_chunks, f"{label}: 输出不一致"
+    print(f"{label:<28} {len(text) / 1e6:>7.2f} MB  {len(new_chunks):>7} 块  "
+          f"原实现 {old_seconds:>7.3f}s  新实现 {new_seconds:>7.3f}s  加速 {old_seconds / new_seconds:>5.2f}x")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    docs = ""
+    for name in sorted(os.listdir(DOCS_PATH)):
+        with open(os.path.join(DOCS_PATH, name), encoding="utf-8") as f:
+            docs += f.read() + "\n"
+    compare("docs 语料", docs)
+    compare("docs 语料 (chunk 200/50)", docs, 200, 50)
+
+    text = synthetic_text(random.Random(10), size)
+    compare("合成文本", text)
+    compare("合成文本 (chunk 4000/1000)", text, 4000, 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+索引快照启动基准
+对比 NumPy 后端加载（读入 .npy 与 JSON 元数据）与内存映射快照打开的耗时、
+进程私有内存增量，以及两者的检索延迟（随机单位向量，不含嵌入）
+
+用法: python tests/benchmarks/bench_index_snapshot.py [向量数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from index_snapshot import SnapshotCollection, current_snapshot, publish_snapshot
+from numpy_store import NumpyCollection
+
+DIMENSIONS = 384
+FIELDS = ("course_title", "lesson_number")
+
+
+def private_memory_mb():
+    """Anonymous (non-shared) memory of this process, Linux only"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def timed_open(factory):
+    memory_before = private_memory_mb()
+    started_at = time.perf_counter()
+    collection = factory()
+    return collection, (time.perf_counter() - started_at) * 1000, private_memory_mb() - memory_before
+
+
+def query_p50(collection, queries):
+    timings = []
+    for query in queries:
+        started_at = time.perf_counter()
+        collection.query(query_embeddings=[query], n_results=5, where={"course_title": "Course 3"})
+        timings.append(time.perf_counter() - started_at)
+    return np.percentile(timings, 50) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(0, count, 100)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = NumpyCollection(os.path.join(temp_dir, "numpy"), "course_content", None, FIELDS)
+        source.add(
+            ids=[f"chunk_{i}" for i in range(count)],
+            documents=[f"Chunk {i} of a lesson transcript about retrieval. " * 10 for i in range(count)],
+            embeddings=vectors,
+            metadatas=[{"course_title": f"Course {i % 20}", "lesson_number": i % 7, "chunk_index": i} for i in range(count)]
+        )
+        source.persist()
+        publish_snapshot(os.path.join(temp_dir, "snapshot"), {"course_content": source}, {"course_content": FIELDS}, "bench")
+        del source
+
+        snapshot_directory = os.path.join(current_snapshot(os.path.join(temp_dir, "snapshot")), "course_content")
+        loaded, load_ms, load_mb = timed_open(
+            lambda: NumpyCollection(os.path.join(temp_dir, "numpy"), "course_content", None, FIELDS))
+        mapped, map_ms, map_mb = timed_open(lambda: SnapshotCollection(snapshot_directory))
+
+        print(f"{count} 个向量 x {DIMENSIONS} 维")
+        print(f"NumPy 加载   {load_ms:8.1f}ms  私有内存 +{load_mb:.0f}MB  过滤检索 p50 {query_p50(loaded, queries):.2f}ms")
+        print(f"快照映射     {map_ms:8.1f}ms  私有内存 +{map_mb:.0f}MB  过滤检索 p50 {query_p50(mapped, queries):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+BM25 词法检索基准
+在 docs/ 语料（可按倍数复制放大）上测量倒排索引的构建耗时和查询延迟，
+词法检索无需模型推理，可作为嵌入模型繁忙时的快速回退
+
+用法: python tests/benchmarks/bench_lexical_search.py [复制倍数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from document_processor import DocumentProcessor
+from lexical_index import LexicalIndex
+
+DOCS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'docs')
+QUERIES = [
+    "MCP server", "computer use", "prompt caching", "tool use with Claude", "retrieval augmented generation",
+    "vector database embeddings", "evaluate model answers", "lesson 3 agents", "Chroma collection", "API key"
+]
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    processor = DocumentProcessor(800, 100)
+    chunks = []
+    for name in sorted(os.listdir(DOCS_PATH)):
+        chunks.extend(processor.process_course_document(os.path.join(DOCS_PATH, name))[1])
+
+    index = LexicalIndex()
+    started_at = time.perf_counter()
+    for copy in range(copies):
+        index.add(
+            [f"{copy}_{chunk.course_title}_{chunk.chunk_index}" for chunk in chunks],
+            [chunk.content for chunk in chunks],
+            [{"course_title": f"{chunk.course_title} {copy}", "lesson_number": chunk.lesson_number} for chunk in chunks]
+        )
+    build_seconds = time.perf_counter() - started_at
+
+    timings = []
+    for _ in range(5):
+        for query in QUERIES:
+            started_at = time.perf_counter()
+            index.search(query, 5)
+            timings.append(time.perf_counter() - started_at)
+    stats = index.get_stats()
+    print(f"{stats['chunks']} 个分块, {stats['terms']} 个词项, 构建 {build_seconds:.2f}s")
+    print(f"查询 p50 {np.percentile(timings, 50) * 1000:.2f}ms  p95 {np.percentile(timings, 95) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+量化检索基准
+在 docs/ 语料和合成语料（默认 100 万分块）上对比 float32 / int8 快照：
+扫描的向量内存、检索延迟，以及相对精确检索的召回率（有/无全精度重排）
+
+用法: python tests/benchmarks/bench_quantization.py [合成分块数] [查询数]
+docs/ 语料优先使用真实嵌入模型，模型不可用时退回测试用的词袋哈希嵌入
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'unit'))
+
+from document_processor import DocumentProcessor
+from index_snapshot import SnapshotCollection, measure_collection_recall, write_collection
+from quantization import QUANTIZATIONS, recall_queries
+
+DIMENSIONS = 384
+DOCS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'docs')
+
+
+def embed_docs():
+    processor = DocumentProcessor(800, 100)
+    texts = []
+    for name in sorted(os.listdir(DOCS_PATH)):
+        _, chunks = processor.process_course_document(os.path.join(DOCS_PATH, name))
+        texts.extend(chunk.content for chunk in chunks)
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+        return texts, np.asarray(model.encode(texts), dtype=np.float32), "all-MiniLM-L6-v2"
+    except Exception:
+        import fake_embedding
+        return texts, np.asarray(fake_embedding.FakeSentenceTransformer()(texts), dtype=np.float32), "词袋哈希（模型不可用）"
+
+
+def synthetic(count, clusters=2000, seed=0):
+    """Unit vectors around many centers, built block by block"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSIONS)).astype(np.float32)
+    vectors = np.empty((count, DIMENSIONS), dtype=np.float32)
+    for start in range(0, count, 100_000):
+        end = min(start + 100_000, count)
+        block = centers[rng.integers(0, clusters, end - start)] + rng.standard_normal((end - start, DIMENSIONS), dtype=np.float32)
+        vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def run(label, texts, vectors, query_count):
+    count = len(vectors)
+    data = {
+        "ids": [str(i) for i in range(count)],
+        "documents": texts,
+        "metadatas": [{"course_title": f"Course {i % 10}", "lesson_number": i % 8} for i in range(count)],
+        "embeddings": vectors
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        started_at = time.perf_counter()
+        write_collection(directory, data, ("course_title", "lesson_number"))
+        print(f"\n{label}: {count} 个分块, 写入快照 {time.perf_counter() - started_at:.1f}s")
+        started_at = time.perf_counter()
+        report = measure_collection_recall(directory)
+        print(f"  测量召回率 {time.perf_counter() - started_at:.1f}s")
+        del data
+
+        norms = np.einsum('ij,ij->i', vectors, vectors)
+        queries, exact = recall_queries(vectors, norms, k=5, sample=query_count, seed=1)
+        for mode in QUANTIZATIONS:
+            collection = SnapshotCollection(directory, quantization=mode)
+            timings, hits = [], 0
+            for query, expected in zip(queries, exact):
+                started_at = time.perf_counter()
+                result = collection.query([query], n_results=5)
+                timings.append(time.perf_counter() - started_at)
+                hits += len(set(expected.tolist()) & {int(i) for i in result["ids"][0]})
+            scan_mb = report[mode]["scan_bytes"] / 2**20 if mode in report else vectors.nbytes / 2**20
+            line = f"  {mode:<8} 扫描向量 {scan_mb:8.1f}MB  p50 {np.percentile(timings, 50) * 1000:8.2f}ms  召回率@5 {hits / exact.size:.3f}"
+            if mode in report:
+                line += f"  (发布时 召回率@10 {report[mode]['recall']:.3f}, 无重排 {report[mode]['recall_without_rescore']:.3f})"
+            print(line)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    texts, vectors, model = embed_docs()
+    run(f"docs/ 语料（{model}）", texts, vectors, 100)
+
+    vectors = synthetic(count)
+    run("合成语料", [f"chunk {i}" for i in range(count)], vectors, query_count)
+
+
+if __name__ == "__main__":
+    main()
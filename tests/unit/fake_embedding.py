@@ -0,0 +1,47 @@
+"""
+测试用的模拟嵌入函数
+用词袋哈希向量替代 SentenceTransformer，避免测试时下载模型
+"""
+import hashlib
+import re
+
+import numpy as np
+import chromadb.utils.embedding_functions as embedding_functions
+from chromadb.api.types import EmbeddingFunction
+
+DIMENSIONS = 384
+
+
+class FakeSentenceTransformer(EmbeddingFunction):
+    """词袋哈希嵌入：共享词语越多的文本余弦相似度越高"""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", **kwargs):
+        self.model_name = model_name
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        vectors = []
+        for text in input:
+            vector = np.zeros(DIMENSIONS, dtype=np.float32)
+            for word in re.findall(r'\w+', text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSIONS] += 1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return FakeSentenceTransformer()
+
+
+def install():
+    """用模拟嵌入替换 VectorStore 使用的 SentenceTransformerEmbeddingFunction"""
+    embedding_functions.SentenceTransformerEmbeddingFunction = FakeSentenceTransformer
@@ -0,0 +1,117 @@
+"""
+测试用的模拟LLM路由器和Claude客户端
+按OpenAI / Anthropic响应格式返回固定的工具调用和答案，避免测试时访问真实模型
+"""
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import ai_generator
+
+
+def tool_call_response(arguments, name="search_course_content"):
+    """构造包含一次工具调用的OpenAI格式响应"""
+    tool_call = SimpleNamespace(
+        id="call_1",
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments))
+    )
+    message = SimpleNamespace(content="", tool_calls=[tool_call])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeRouter:
+    """
+    模拟llm_router：工具调用轮次返回固定参数（或按消息计算的参数），答案轮次返回固定文本片段
+    fail使所有调用失败，fail_answer只让最终答案轮次失败
+    """
+
+    def __init__(self, answer_chunks, tool_arguments=None, fail=False, fail_answer=False):
+        self.answer_chunks = list(answer_chunks)
+        self.tool_arguments = tool_arguments
+        self.fail = fail
+        self.fail_answer = fail_answer
+        self.calls = []
+
+    def _tool_response(self, messages):
+        self.calls.append(("tools", messages))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        if self.tool_arguments is None:
+            message = SimpleNamespace(content="".join(self.answer_chunks), tool_calls=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        arguments = self.tool_arguments
+        if callable(arguments):
+            arguments = arguments(messages)
+        return tool_call_response(arguments)
+
+    def _answer(self, messages):
+        self.calls.append(("chat", messages))
+        if self.fail or self.fail_answer:
+            raise RuntimeError("model unavailable")
+        return "".join(self.answer_chunks)
+
+    def call_with_tools(self, messages, tools, **kwargs):
+        return self._tool_response(messages)
+
+    async def acall_with_tools(self, messages, tools, **kwargs):
+        return self._tool_response(messages)
+
+    def call_simple_chat(self, messages, **kwargs):
+        return self._answer(messages)
+
+    async def acall_simple_chat(self, messages, **kwargs):
+        return self._answer(messages)
+
+    def call_chat_stream(self, messages, **kwargs):
+        self.calls.append(("stream", messages))
+        if self.fail or self.fail_answer:
+            raise RuntimeError("model unavailable")
+        yield from self.answer_chunks
+
+
+class FakeClaudeMessages:
+    """模拟Anthropic messages接口：带工具的请求返回一次tool_use，其余返回固定答案"""
+
+    def __init__(self, answer_chunks, tool_input=None):
+        self.answer_chunks = list(answer_chunks)
+        self.tool_input = tool_input
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(("create", params))
+        if "tools" in params and self.tool_input is not None:
+            block = SimpleNamespace(type="tool_use", id="toolu_1", name="search_course_content", input=self.tool_input)
+            return SimpleNamespace(stop_reason="tool_use", content=[block])
+        block = SimpleNamespace(type="text", text="".join(self.answer_chunks))
+        return SimpleNamespace(stop_reason="end_turn", content=[block])
+
+    @contextmanager
+    def stream(self, **params):
+        self.calls.append(("stream", params))
+        yield SimpleNamespace(text_stream=iter(self.answer_chunks))
+
+
+class FakeAsyncClaudeMessages:
+    """FakeClaudeMessages的异步版本，共享调用记录"""
+
+    def __init__(self, messages: FakeClaudeMessages):
+        self._messages = messages
+
+    async def create(self, **params):
+        return self._messages.create(**params)
+
+
+def install_claude(generator, answer_chunks, tool_input=None) -> FakeClaudeMessages:
+    """让AI生成器以Claude提供商运行并使用模拟客户端"""
+    messages = FakeClaudeMessages(answer_chunks, tool_input)
+    generator.provider = "claude"
+    generator.model = "claude-test"
+    generator.client = SimpleNamespace(messages=messages)
+    generator.async_client = SimpleNamespace(messages=FakeAsyncClaudeMessages(messages))
+    return messages
+
+
+def install(router: FakeRouter) -> FakeRouter:
+    """让AI生成器使用模拟路由器"""
+    ai_generator.llm_router = router
+    return router
@@ -0,0 +1,105 @@
+"""
+答案缓存测试
+验证精确匹配、LRU淘汰、TTL过期、SQLite持久化、语料版本失效以及SQLite按时间和行数过期
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from answer_cache import AnswerCache
+
+SOURCES = ["MCP - Lesson 1"]
+SOURCES_DETAIL = [{"title": "MCP - Lesson 1", "course_link": None, "lesson_link": None}]
+
+
+def test_normalized_query_hits():
+    """大小写和空白不同的相同问题命中同一条缓存"""
+    cache = AnswerCache(max_entries=10)
+    key = cache.make_key("What is MCP?", None, "v1")
+    cache.put(key, "MCP is a protocol", SOURCES, SOURCES_DETAIL, "v1")
+
+    hit = cache.get(cache.make_key("  what is   mcp ", None, "v1"))
+    assert hit is not None
+    assert hit.answer == "MCP is a protocol"
+    assert hit.sources == SOURCES
+
+
+def test_history_is_part_of_key():
+    """不同的对话历史不共享缓存"""
+    cache = AnswerCache(max_entries=10)
+    key = cache.make_key("What about lesson 2?", "User: What is MCP?", "v1")
+    cache.put(key, "answer", SOURCES, SOURCES_DETAIL, "v1")
+
+    assert cache.get(cache.make_key("What about lesson 2?", None, "v1")) is None
+    assert cache.get(cache.make_key("What about lesson 2?", "User: What is RAG?", "v1")) is None
+
+
+def test_lru_eviction_and_ttl():
+    """超过容量时淘汰最久未使用的条目，过期条目不再返回"""
+    cache = AnswerCache(max_entries=2, ttl_seconds=0.2)
+    keys = [cache.make_key(f"question {i}", None, "v1") for i in range(3)]
+    for key in keys:
+        cache.put(key, "answer", SOURCES, SOURCES_DETAIL, "v1")
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) is not None
+    assert cache.get_stats()["evictions"] == 1
+
+    time.sleep(0.25)
+    assert cache.get(keys[2]) is None
+
+
+def test_sqlite_tier_and_corpus_version():
+    """SQLite层在重启后仍可命中，语料版本变化后旧条目失效"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "answers.sqlite3")
+
+        cache = AnswerCache(max_entries=10, db_path=db_path)
+        key = cache.make_key("What is MCP?", None, "v1")
+        cache.put(key, "MCP is a protocol", SOURCES, SOURCES_DETAIL, "v1")
+
+        restarted = AnswerCache(max_entries=10, db_path=db_path)
+        hit = restarted.get(restarted.make_key("What is MCP?", None, "v1"))
+        assert hit is not None
+        assert hit.sources_detail == SOURCES_DETAIL
+        assert restarted.get_stats()["disk_hits"] == 1
+
+        assert restarted.get(restarted.make_key("What is MCP?", None, "v2")) is None
+        restarted.put(restarted.make_key("What is RAG?", None, "v2"), "answer", SOURCES, SOURCES_DETAIL, "v2")
+        # 仍在旧语料版本上的其他进程照常读取自己的条目
+        reopened = AnswerCache(max_entries=10, db_path=db_path)
+        assert reopened.get(key) is not None
+
+
+def test_sqlite_rows_expire_by_age_and_count():
+    """SQLite中超过TTL的行和超出行数上限的最旧行在写入时删除"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "answers.sqlite3")
+        cache = AnswerCache(max_entries=10, ttl_seconds=0.2, db_path=db_path, max_disk_entries=2)
+        old_key = cache.make_key("old question", None, "v1")
+        cache.put(old_key, "answer", SOURCES, SOURCES_DETAIL, "v1")
+        time.sleep(0.25)
+
+        keys = [cache.make_key(f"question {i}", None, "v2") for i in range(3)]
+        for key in keys:
+            cache.put(key, "answer", SOURCES, SOURCES_DETAIL, "v2")
+            time.sleep(0.01)
+
+        rows = {row[0] for row in cache._db.execute("SELECT key FROM answers")}
+        assert rows == set(keys[1:])
+
+
+if __name__ == "__main__":
+    test_normalized_query_hits()
+    print("[PASS] 归一化查询命中缓存")
+    test_history_is_part_of_key()
+    print("[PASS] 对话历史参与缓存键")
+    test_lru_eviction_and_ttl()
+    print("[PASS] LRU淘汰与TTL过期")
+    test_sqlite_tier_and_corpus_version()
+    print("[PASS] SQLite持久化与语料版本失效")
+    test_sqlite_rows_expire_by_age_and_count()
+    print("[PASS] SQLite按时间和行数过期")
@@ -0,0 +1,191 @@
+"""
+异步查询管线测试
+验证aquery返回答案和来源、并发查询的来源互不干扰、工具或答案轮次失败时不缓存，
+以及同步、异步和流式三种驱动器对DeepSeek和Claude执行相同的生成流程
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+import fake_embedding
+fake_embedding.install()
+import fake_llm
+
+from config import Config
+from models import Course, CourseChunk, Lesson
+from rag_system import RAGSystem
+
+COURSES = {
+    "MCP: Build Rich-Context AI Apps with Anthropic": "MCP servers expose tools and resources to clients.",
+    "Prompt Compression and Query Optimization": "Prompt compression shortens long prompts before retrieval."
+}
+ANSWER = "**Answer** from the course materials about the requested topic, with an example."
+
+
+def create_system(temp_dir, semantic_cache=False):
+    rag_config = Config()
+    rag_config.CHROMA_PATH = os.path.join(temp_dir, "chroma")
+    rag_config.EMBEDDING_STORE_PATH = ""
+    rag_config.PARSE_CACHE_PATH = ""
+    rag_config.LEXICAL_INDEX_PATH = ""
+    rag_config.INGEST_MANIFEST_PATH = ""
+    rag_config.SPECULATIVE_RETRIEVAL = False
+    rag_config.SEMANTIC_CACHE_ENABLED = semantic_cache
+    rag = RAGSystem(rag_config)
+    for index, (title, text) in enumerate(COURSES.items()):
+        rag.vector_store.add_course_metadata(Course(
+            title=title, instructor="Teacher", lessons=[Lesson(lesson_number=1, title="Intro")]
+        ))
+        rag.vector_store.add_course_content([
+            CourseChunk(content=text, course_title=title, lesson_number=1, chunk_index=index)
+        ])
+    return rag
+
+
+def search_question(messages):
+    """工具调用参数取自用户问题本身，便于区分并发查询"""
+    question = messages[-1]["content"].split(": ", 1)[1]
+    return {"query": question}
+
+
+def test_aquery_answers_with_sources():
+    router = fake_llm.install(fake_llm.FakeRouter([ANSWER], tool_arguments=search_question))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+        session_id = rag.session_manager.create_session()
+
+        answer, sources, sources_detail = asyncio.run(rag.aquery("How do MCP servers expose tools?", session_id))
+        assert answer == ANSWER
+        assert sources[0] == "MCP: Build Rich-Context AI Apps with Anthropic - Lesson 1"
+        assert len(sources_detail) == len(sources)
+        assert [kind for kind, _ in router.calls] == ["tools", "chat"]
+        # 工具结果作为tool消息随最终答案轮次发送
+        assert router.calls[1][1][-1]["role"] == "tool"
+        assert "How do MCP servers expose tools?" in rag.session_manager.get_conversation_history(session_id)
+
+        # 相同问题命中答案缓存，不再调用模型
+        assert asyncio.run(rag.aquery("How do MCP servers expose tools?"))[:2] == (answer, sources)
+        assert len(router.calls) == 2
+
+
+def test_concurrent_aqueries_keep_their_sources():
+    fake_llm.install(fake_llm.FakeRouter([ANSWER], tool_arguments=search_question))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+
+        async def scenario():
+            return await asyncio.gather(*(
+                rag.aquery(question) for question in
+                ["How do MCP servers expose tools?", "What does prompt compression shorten?"] * 3
+            ))
+
+        for position, (_, sources, _) in enumerate(asyncio.run(scenario())):
+            expected = "MCP" if position % 2 == 0 else "Prompt Compression"
+            assert sources[0].startswith(expected)
+
+
+def test_aquery_failure_is_not_cached():
+    fake_llm.install(fake_llm.FakeRouter([], fail=True))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+        answer, sources, _ = asyncio.run(rag.aquery("How do MCP servers expose tools?"))
+        assert "技术问题" in answer and sources == []
+
+        router = fake_llm.install(fake_llm.FakeRouter([ANSWER], tool_arguments=search_question))
+        assert asyncio.run(rag.aquery("How do MCP servers expose tools?"))[0] == ANSWER
+        assert len(router.calls) == 2
+
+
+def test_failed_answer_round_is_not_cached():
+    """工具轮次已记录来源而最终答案轮次失败时，致歉文本不进入任何缓存"""
+    question = "How do MCP servers expose tools?"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir, semantic_cache=True)
+
+        def stream_answer(query):
+            events = list(rag.query_stream(query))
+            sources = next(data for event, data in events if event == "sources")["sources"]
+            return events[-1][1]["answer"], sources, None
+
+        drivers = [rag.query, lambda query: asyncio.run(rag.aquery(query)), stream_answer]
+        for run in drivers:
+            router = fake_llm.install(fake_llm.FakeRouter([ANSWER], tool_arguments=search_question, fail_answer=True))
+            answer, sources, _ = run(question)
+            assert "技术问题" in answer and sources
+            assert [kind for kind, _ in router.calls][0] == "tools"
+
+            router = fake_llm.install(fake_llm.FakeRouter([ANSWER], tool_arguments=search_question))
+            assert run(question)[0] == ANSWER
+            assert len(router.calls) == 2
+            rag.answer_cache.clear()
+            rag.semantic_cache.clear()
+
+
+def run_all_drivers(generator, tool_manager):
+    """用三种驱动器执行同一个工具调用问题，返回答案和各自记录的来源"""
+    results = []
+    tools = tool_manager.get_tool_definitions()
+    question = "Answer this question about course materials: How do MCP servers expose tools?"
+
+    tool_manager.reset_sources()
+    results.append((generator.generate_response(question, tools=tools, tool_manager=tool_manager),
+                    tool_manager.get_last_sources()))
+
+    async def run_async():
+        tool_manager.reset_sources()
+        answer = await generator.agenerate_response(question, tools=tools, tool_manager=tool_manager)
+        return answer, tool_manager.get_last_sources()
+    results.append(asyncio.run(run_async()))
+
+    tool_manager.reset_sources()
+    events = list(generator.generate_response_stream(question, tools=tools, tool_manager=tool_manager))
+    assert [event["type"] for event in events][0] == "tool_result"
+    results.append((events[-1]["answer"], tool_manager.get_last_sources()))
+    return results
+
+
+def test_drivers_share_one_flow():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+        generator, tool_manager = rag.ai_generator, rag.tool_manager
+
+        router = fake_llm.install(fake_llm.FakeRouter([ANSWER], tool_arguments=search_question))
+        results = run_all_drivers(generator, tool_manager)
+        assert results[0][0] == ANSWER and results[0][1]
+        assert results == [results[0]] * 3
+        assert [kind for kind, _ in router.calls] == ["tools", "chat", "tools", "chat", "tools", "stream"]
+
+        claude = fake_llm.install_claude(generator, [ANSWER], tool_input={"query": "MCP servers expose tools"})
+        results = run_all_drivers(generator, tool_manager)
+        assert results[0][0] == ANSWER and results[0][1]
+        assert results == [results[0]] * 3
+        assert [kind for kind, _ in claude.calls] == ["create", "create", "create", "create", "create", "stream"]
+        # 最终答案轮次包含工具结果且不再提供工具
+        final_params = claude.calls[1][1]
+        assert "tools" not in final_params and final_params["messages"][-1]["content"][0]["type"] == "tool_result"
+
+        # 单轮模式没有工具步骤，只调用一次模型
+        claude.calls.clear()
+        assert generator.generate_with_context("What is MCP?", "MCP servers expose tools.") == ANSWER
+        assert asyncio.run(generator.agenerate_with_context("What is MCP?", "MCP servers expose tools.")) == ANSWER
+        events = list(generator.generate_with_context_stream("What is MCP?", "MCP servers expose tools."))
+        assert [event["type"] for event in events] == ["token", "done"]
+        assert [kind for kind, _ in claude.calls] == ["create", "create", "stream"]
+        assert claude.calls[0][1]["system"] == generator.CONTEXT_SYSTEM_PROMPT
+
+
+if __name__ == "__main__":
+    test_aquery_answers_with_sources()
+    print("[PASS] aquery返回答案和来源")
+    test_concurrent_aqueries_keep_their_sources()
+    print("[PASS] 并发aquery来源互不干扰")
+    test_aquery_failure_is_not_cached()
+    print("[PASS] 失败的回答不被缓存")
+    test_failed_answer_round_is_not_cached()
+    print("[PASS] 最终答案轮次失败时不缓存")
+    test_drivers_share_one_flow()
+    print("[PASS] 三种驱动器执行相同的生成流程")
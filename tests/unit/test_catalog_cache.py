@@ -0,0 +1,77 @@
+"""
+课程目录内存缓存测试
+验证课程链接和课时链接从内存读取，写入和清空时同步更新，重启后从ChromaDB重新加载
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from models import Course, Lesson
+from vector_store import VectorStore
+
+COURSE = Course(
+    title="MCP: Build Rich-Context AI Apps with Anthropic",
+    course_link="https://example.com/mcp",
+    instructor="Elie Schoppik",
+    lessons=[
+        Lesson(lesson_number=0, title="Introduction", lesson_link="https://example.com/mcp/0"),
+        Lesson(lesson_number=1, title="Why MCP", lesson_link="https://example.com/mcp/1"),
+    ]
+)
+
+
+class CountingCatalog:
+    """包装ChromaDB集合，统计 get 调用次数"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.gets = 0
+
+    def get(self, *args, **kwargs):
+        self.gets += 1
+        return self.collection.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_links_are_served_from_memory():
+    """添加课程后链接查询不再访问ChromaDB"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = VectorStore(temp_dir, "all-MiniLM-L6-v2")
+        store.add_course_metadata(COURSE)
+        store.course_catalog = CountingCatalog(store.course_catalog)
+
+        assert store.get_course_link(COURSE.title) == "https://example.com/mcp"
+        assert store.get_lesson_link(COURSE.title, 1) == "https://example.com/mcp/1"
+        assert store.get_lesson_link(COURSE.title, 7) is None
+        assert store.get_course_link("Unknown course") is None
+        assert store.get_existing_course_titles() == [COURSE.title]
+        assert store.get_course_count() == 1
+        assert store.get_all_courses_metadata()[0]["lessons"][0]["lesson_title"] == "Introduction"
+        assert store.course_catalog.gets == 0
+
+
+def test_catalog_reloads_and_clears():
+    """重启后从ChromaDB加载目录，清空数据后内存目录同步清空"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        VectorStore(temp_dir, "all-MiniLM-L6-v2").add_course_metadata(COURSE)
+
+        restarted = VectorStore(temp_dir, "all-MiniLM-L6-v2")
+        assert restarted.get_lesson_link(COURSE.title, 0) == "https://example.com/mcp/0"
+
+        restarted.clear_all_data()
+        assert restarted.get_course_count() == 0
+        assert restarted.get_course_link(COURSE.title) is None
+
+
+if __name__ == "__main__":
+    test_links_are_served_from_memory()
+    print("[PASS] 链接查询从内存目录读取")
+    test_catalog_reloads_and_clears()
+    print("[PASS] 目录重新加载与清空")
@@ -0,0 +1,72 @@
+"""
+列式分块批次测试
+验证 ChunkBatch 与 CourseChunk 列表可互换：按下标和迭代得到 CourseChunk 视图、
+切片仍为批次、可序列化，以及向量存储按批次写入的 ID 和元数据与逐个分块一致
+"""
+import os
+import pickle
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from models import ChunkBatch, CourseChunk
+from vector_store import VectorStore
+
+CHUNKS = [
+    CourseChunk(content="Lesson 0 content: intro", course_title="Course A", lesson_number=0, chunk_index=0),
+    CourseChunk(content="more intro", course_title="Course A", lesson_number=0, chunk_index=1),
+    CourseChunk(content="Course Course A Lesson 1 content: end", course_title="Course A", lesson_number=1, chunk_index=2),
+    CourseChunk(content="no lesson", course_title="Course A", lesson_number=None, chunk_index=3),
+]
+
+
+def test_batch_behaves_like_chunk_list():
+    batch = ChunkBatch.from_chunks(CHUNKS)
+    assert len(batch) == 4 and batch
+    assert not ChunkBatch()
+    assert batch[1] == CHUNKS[1]
+    assert batch[-1].lesson_number is None
+    assert list(batch) == CHUNKS
+    assert batch == CHUNKS and CHUNKS == batch
+    assert batch.contents == [chunk.content for chunk in CHUNKS]
+
+    head = batch[:2]
+    assert isinstance(head, ChunkBatch) and head == CHUNKS[:2]
+    head.extend(batch[2:])
+    assert head == batch
+    assert ChunkBatch.from_chunks(batch) is batch
+
+    restored = pickle.loads(pickle.dumps(batch))
+    assert restored == batch
+
+
+def test_store_writes_batches_like_chunk_lists():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = VectorStore(os.path.join(temp_dir, "chroma"), "all-MiniLM-L6-v2")
+        batch = ChunkBatch.from_chunks(CHUNKS[:3])
+        assert store.chunk_ids(batch) == [store.chunk_id(chunk) for chunk in CHUNKS[:3]]
+
+        store.add_course_content(batch)
+        stored = store.course_content.get(include=["metadatas", "documents"])
+        by_id = dict(zip(stored["ids"], zip(stored["documents"], stored["metadatas"])))
+        for chunk in CHUNKS[:3]:
+            document, metadata = by_id[store.chunk_id(chunk)]
+            assert document == chunk.content
+            assert metadata["lesson_number"] == chunk.lesson_number
+            assert metadata["chunk_index"] == chunk.chunk_index
+            assert metadata["content_hash"] == store.content_hash(chunk.content)
+
+        # 以 CourseChunk 列表同步时结果相同：内容未变的分块不写入
+        result = store.sync_course_content("Course A", CHUNKS[:3])
+        assert result["unchanged"] == 3 and result["upserted"] == 0
+
+
+if __name__ == "__main__":
+    test_batch_behaves_like_chunk_list()
+    print("[PASS] 批次与分块列表行为一致")
+    test_store_writes_batches_like_chunk_lists()
+    print("[PASS] 按批次写入与逐个分块一致")
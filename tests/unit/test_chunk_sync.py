@@ -0,0 +1,76 @@
+"""
+分块级差异同步测试
+验证只更新变化的分块、复用移动位置的分块嵌入，并删除消失的分块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from models import CourseChunk
+from vector_store import VectorStore
+
+TITLE = "Test Course"
+
+
+def make_chunks(texts):
+    return [CourseChunk(content=text, course_title=TITLE, lesson_number=1, chunk_index=i) for i, text in enumerate(texts)]
+
+
+def stored_documents(store):
+    stored = store.course_content.get(where={"course_title": TITLE}, include=["documents", "metadatas"])
+    by_index = sorted(zip(stored["metadatas"], stored["documents"]), key=lambda item: item[0]["chunk_index"])
+    return [document for _, document in by_index], [metadata for metadata, _ in by_index]
+
+
+def test_inserted_chunk_reuses_shifted_embeddings():
+    """插入一个分块后，位置后移的分块复用已有嵌入，只计算新分块"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = VectorStore(temp_dir, "all-MiniLM-L6-v2")
+        original = [f"Paragraph {i} about retrieval." for i in range(5)]
+        store.add_course_content(make_chunks(original))
+        before = store.course_content.get(ids=["Test_Course_4"], include=["embeddings"])["embeddings"][0]
+
+        edited = original[:2] + ["A brand new paragraph."] + original[2:]
+        result = store.sync_course_content(TITLE, make_chunks(edited))
+
+        assert result == {
+            "unchanged": 2, "upserted": 4, "deleted": 0,
+            "reused_embeddings": 5, "computed_embeddings": 1
+        }
+        documents, metadatas = stored_documents(store)
+        assert documents == edited
+        assert all(m["content_hash"] == VectorStore.content_hash(d) for m, d in zip(metadatas, documents))
+        # 原来第4个分块移动到第5个位置，嵌入保持不变
+        after = store.course_content.get(ids=["Test_Course_5"], include=["embeddings"])["embeddings"][0]
+        assert np.allclose(before, after)
+
+
+def test_removed_chunks_are_deleted_and_unchanged_course_is_untouched():
+    """消失的分块被删除，内容未变时不写入任何数据"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = VectorStore(temp_dir, "all-MiniLM-L6-v2")
+        texts = [f"Paragraph {i} about retrieval." for i in range(4)]
+        store.add_course_content(make_chunks(texts))
+
+        version = store.get_corpus_version()
+        result = store.sync_course_content(TITLE, make_chunks(texts))
+        assert result["upserted"] == 0 and result["deleted"] == 0
+        assert store.get_corpus_version() == version
+
+        result = store.sync_course_content(TITLE, make_chunks(texts[:2]))
+        assert result["deleted"] == 2
+        assert stored_documents(store)[0] == texts[:2]
+
+
+if __name__ == "__main__":
+    test_inserted_chunk_reuses_shifted_embeddings()
+    print("[PASS] 插入分块后复用已有嵌入")
+    test_removed_chunks_are_deleted_and_unchanged_course_is_untouched()
+    print("[PASS] 删除消失的分块，未变化的课程不写入")
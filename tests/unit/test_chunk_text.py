@@ -0,0 +1,111 @@
+"""
+分块算法一致性测试
+新的前缀和 + 二分查找实现必须与原逐句扫描实现输出完全相同
+"""
+import os
+import random
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from document_processor import DocumentProcessor
+
+DOCS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'docs')
+
+# 对比用的原始实现（逐句扫描，每个分块重新回溯计算重叠）
+def reference_chunk_text(text, chunk_size, chunk_overlap):
+    text = re.sub(r'\s+', ' ', text.strip())
+    sentence_endings = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])')
+    sentences = [s.strip() for s in sentence_endings.split(text) if s.strip()]
+
+    chunks = []
+    i = 0
+    while i < len(sentences):
+        current_chunk = []
+        current_size = 0
+        for j in range(i, len(sentences)):
+            total_addition = len(sentences[j]) + (1 if current_chunk else 0)
+            if current_size + total_addition > chunk_size and current_chunk:
+                break
+            current_chunk.append(sentences[j])
+            current_size += total_addition
+
+        chunks.append(' '.join(current_chunk))
+        if chunk_overlap > 0:
+            overlap_size = 0
+            overlap_sentences = 0
+            for k in range(len(current_chunk) - 1, -1, -1):
+                sentence_len = len(current_chunk[k]) + (1 if k < len(current_chunk) - 1 else 0)
+                if overlap_size + sentence_len <= chunk_overlap:
+                    overlap_size += sentence_len
+                    overlap_sentences += 1
+                else:
+                    break
+            i = max(i + len(current_chunk) - overlap_sentences, i + 1)
+        else:
+            i += len(current_chunk)
+    return chunks
+
+
+WORDS = ["the", "model", "Retrieval", "e.g.", "Dr.", "Mr.", "U.S.", "vector", "API", "i.e.", "Chunk", "embedding"]
+ENDINGS = [".", "!", "?", ".", ".", ""]
+SPACES = [" ", "  ", "\n", "\n\n", "\t", " \n ", "\u00a0", "\u2003 ", "\x1c", "\r\n"]
+
+
+def synthetic_text(rng, target_size):
+    """生成包含缩写、超长句、多种空白和标点的随机文本"""
+    parts = []
+    size = 0
+    while size < target_size:
+        length = rng.choice([1, 3, 8, 20, 200]) if rng.random() < 0.1 else rng.randint(2, 25)
+        words = [rng.choice(WORDS) for _ in range(length)]
+        words[0] = words[0].capitalize()
+        sentence = " ".join(words) + rng.choice(ENDINGS) + rng.choice(SPACES)
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+
+def assert_same_chunks(text, chunk_size, chunk_overlap):
+    processor = DocumentProcessor(chunk_size, chunk_overlap)
+    assert processor.chunk_text(text) == reference_chunk_text(text, chunk_size, chunk_overlap)
+
+
+def test_matches_reference_on_docs():
+    for name in sorted(os.listdir(DOCS_PATH)):
+        with open(os.path.join(DOCS_PATH, name), encoding="utf-8") as f:
+            text = f.read()
+        for chunk_size, chunk_overlap in [(800, 100), (200, 50), (800, 0), (100, 100)]:
+            assert_same_chunks(text, chunk_size, chunk_overlap)
+
+
+def test_matches_reference_on_synthetic_text():
+    rng = random.Random(17)
+    for _ in range(200):
+        text = synthetic_text(rng, rng.randint(0, 5000))
+        chunk_size = rng.choice([1, 10, 50, 200, 800])
+        chunk_overlap = rng.choice([0, 1, 20, 100, chunk_size, chunk_size * 2])
+        assert_same_chunks(text, chunk_size, chunk_overlap)
+
+
+def test_matches_reference_on_large_input():
+    text = synthetic_text(random.Random(10), 10_000_000)
+    assert_same_chunks(text, 800, 100)
+
+
+def test_edge_cases():
+    for text in ["", "   ", "One", "One. Two", "A" * 2000, "First sentence. " + "B" * 900 + ". Last one."]:
+        for chunk_size, chunk_overlap in [(800, 100), (10, 0), (10, 50)]:
+            assert_same_chunks(text, chunk_size, chunk_overlap)
+
+
+if __name__ == "__main__":
+    test_matches_reference_on_docs()
+    print("[PASS] docs 语料输出一致")
+    test_matches_reference_on_synthetic_text()
+    print("[PASS] 随机文本输出一致")
+    test_matches_reference_on_large_input()
+    print("[PASS] 10 MB 输入输出一致")
+    test_edge_cases()
+    print("[PASS] 边界情况输出一致")
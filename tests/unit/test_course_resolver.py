@@ -0,0 +1,112 @@
+"""
+课程名称解析器测试
+验证精确、大小写、缩写、前缀、词语和嵌入各阶段的解析结果、决策缓存和增量添加，
+以及目录回退查询期间不持有锁
+"""
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from fake_embedding import FakeSentenceTransformer
+from course_resolver import CourseNameResolver
+
+TITLES = [
+    "MCP: Build Rich-Context AI Apps with Anthropic",
+    "Advanced Retrieval for AI with Chroma",
+    "Building Towards Computer Use with Anthropic",
+    "Prompt Compression and Query Optimization",
+]
+
+
+def create_resolver():
+    embedder = FakeSentenceTransformer()
+    fallback_calls = []
+
+    def fallback(name):
+        fallback_calls.append(name)
+        return None
+
+    resolver = CourseNameResolver(embedder, fallback=fallback)
+    resolver.add_titles(TITLES)
+    return resolver, embedder, fallback_calls
+
+
+def test_lexical_stages_skip_embeddings():
+    """精确、大小写、缩写、前缀和词语匹配不需要计算嵌入"""
+    resolver, embedder, fallback_calls = create_resolver()
+
+    assert resolver.resolve(TITLES[1]) == TITLES[1]
+    assert resolver.resolve("advanced retrieval for ai with chroma") == TITLES[1]
+    assert resolver.resolve("MCP") == TITLES[0]
+    assert resolver.resolve("PCAQO") == TITLES[3]
+    assert resolver.resolve("Building Towards") == TITLES[2]
+    assert resolver.resolve("Chroma") == TITLES[1]
+
+    stats = resolver.get_stats()
+    assert [stats[stage] for stage in ("exact", "casefold", "alias", "prefix", "token")] == [1, 1, 2, 1, 1]
+    assert embedder.calls == 0
+    assert fallback_calls == []
+
+
+def test_embedding_stage_and_decision_cache():
+    """词语匹配不唯一时使用标题嵌入矩阵，重复查询命中决策缓存"""
+    resolver, embedder, fallback_calls = create_resolver()
+
+    assert resolver.resolve("anthropic computer use course") == TITLES[2]
+    assert resolver.resolve("anthropic computer use course") == TITLES[2]
+
+    stats = resolver.get_stats()
+    assert stats["embedding"] == 1
+    assert stats["cache_hits"] == 1
+    # 一次批量嵌入标题，一次嵌入查询
+    assert embedder.calls == 2
+    assert fallback_calls == []
+
+
+def test_incremental_add_and_fallback():
+    """新增课程后旧决策失效，没有标题时回退到目录查询"""
+    resolver = CourseNameResolver(FakeSentenceTransformer(), fallback=lambda name: "From catalog")
+    assert resolver.resolve("Anything") == "From catalog"
+
+    resolver.add_titles(TITLES[:1])
+    assert resolver.resolve("Anything") == TITLES[0]
+
+    resolver.add_titles(["Anything Goes: A Course"])
+    assert resolver.resolve("Anything") == "Anything Goes: A Course"
+
+
+def test_fallback_runs_without_lock():
+    """目录回退查询进行中时，统计和已缓存的解析不被阻塞"""
+    started, release = threading.Event(), threading.Event()
+
+    def slow_fallback(name):
+        started.set()
+        release.wait(5)
+        return "From catalog"
+
+    resolver = CourseNameResolver(FakeSentenceTransformer(), fallback=slow_fallback)
+    worker = threading.Thread(target=resolver.resolve, args=("Anything",))
+    worker.start()
+    assert started.wait(5)
+
+    reader = threading.Thread(target=resolver.get_stats)
+    reader.start()
+    reader.join(1)
+    stalled = reader.is_alive()
+    release.set()
+    worker.join()
+    assert not stalled
+    assert resolver.get_stats()["fallback"] == 1
+
+
+if __name__ == "__main__":
+    test_lexical_stages_skip_embeddings()
+    print("[PASS] 词法阶段无需嵌入")
+    test_embedding_stage_and_decision_cache()
+    print("[PASS] 嵌入阶段与决策缓存")
+    test_incremental_add_and_fallback()
+    print("[PASS] 增量添加与目录回退")
+    test_fallback_runs_without_lock()
+    print("[PASS] 目录回退不持有锁")
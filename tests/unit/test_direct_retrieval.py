@@ -0,0 +1,128 @@
+"""
+直接检索模式测试
+验证从问题中提取课程和课时过滤条件（全称、冒号前缀、缩写，取最长匹配）、
+无匹配时不加过滤、过滤过窄时退回无过滤检索，以及直接模式下的来源收集
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+import fake_embedding
+fake_embedding.install()
+import fake_llm
+
+from config import Config
+from course_resolver import course_aliases
+from models import Course, CourseChunk, Lesson
+from rag_system import RAGSystem
+from search_tools import CourseSearchTool
+
+MCP_TITLE = "MCP: Build Rich-Context AI Apps with Anthropic"
+RETRIEVAL_TITLE = "Advanced Retrieval for AI with Chroma"
+BASICS_TITLE = "Retrieval: The Basics"
+TITLES = [MCP_TITLE, RETRIEVAL_TITLE, BASICS_TITLE]
+
+
+class FakeStore:
+    def get_existing_course_titles(self):
+        return TITLES
+
+
+def test_derive_filters():
+    tool = CourseSearchTool(FakeStore())
+
+    assert tool.derive_filters("What does lesson 2 of MCP cover?") == (MCP_TITLE, 2)
+    assert tool.derive_filters("Summarize LESSON 10 of mcp, please") == (MCP_TITLE, 10)
+    assert tool.derive_filters("advanced retrieval for AI with Chroma: what is reranking?") == (RETRIEVAL_TITLE, None)
+    # 每个别名（全称、冒号前部分、缩写）都能识别课程
+    for title in TITLES:
+        for alias in course_aliases(title):
+            assert tool.derive_filters(f"tell me about {alias} lesson 1") == (title, 1), alias
+    # 多个别名命中时取最长的匹配（"retrieval" 同时是另一门课的冒号前缀）
+    assert tool.derive_filters("In Advanced Retrieval for AI with Chroma, what is retrieval?")[0] == RETRIEVAL_TITLE
+    assert tool.derive_filters("What is retrieval?")[0] == BASICS_TITLE
+
+    # 只匹配完整词语；没有匹配时不加过滤
+    assert tool.derive_filters("Do MCPs need servers?") == (None, None)
+    assert tool.derive_filters("What is RAG in lessons?") == (None, None)
+    assert tool.derive_filters("") == (None, None)
+
+
+def create_system(temp_dir):
+    rag_config = Config()
+    rag_config.CHROMA_PATH = os.path.join(temp_dir, "chroma")
+    rag_config.EMBEDDING_STORE_PATH = ""
+    rag_config.PARSE_CACHE_PATH = ""
+    rag_config.LEXICAL_INDEX_PATH = ""
+    rag_config.INGEST_MANIFEST_PATH = ""
+    rag_config.PIPELINE_MODE = "direct"
+    rag = RAGSystem(rag_config)
+    for title in (MCP_TITLE, RETRIEVAL_TITLE):
+        rag.vector_store.add_course_metadata(Course(
+            title=title, course_link=f"https://example.com/{len(title)}", instructor="Teacher",
+            lessons=[Lesson(lesson_number=n, title=f"Lesson {n}", lesson_link=f"https://example.com/{len(title)}/{n}")
+                     for n in (1, 2)]
+        ))
+        rag.vector_store.add_course_content([
+            CourseChunk(content=f"{title} lesson {n} covers servers, tools and clients.",
+                        course_title=title, lesson_number=n, chunk_index=n)
+            for n in (1, 2)
+        ])
+    return rag
+
+
+def test_retrieve_direct_filters_and_falls_back():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+
+        context = rag._retrieve_direct("What does lesson 2 of MCP cover about servers?")
+        assert rag.search_tool.last_sources == [f"{MCP_TITLE} - Lesson 2"]
+        assert context.startswith(f"[{MCP_TITLE} - Lesson 2]\n")
+        assert rag.search_tool.last_sources_detail == [{
+            "title": f"{MCP_TITLE} - Lesson 2",
+            "course_link": f"https://example.com/{len(MCP_TITLE)}",
+            "lesson_link": f"https://example.com/{len(MCP_TITLE)}/2"
+        }]
+
+        # 课时不存在时过滤结果为空，退回无过滤检索
+        context = rag._retrieve_direct("What does lesson 7 of MCP cover about servers?")
+        assert len(rag.search_tool.last_sources) == 4
+        assert "No relevant content found" not in context
+
+        # 没有可提取的过滤条件时直接无过滤检索
+        rag._retrieve_direct("Which lessons cover tools and clients?")
+        assert {source.split(" - ")[0] for source in rag.search_tool.last_sources} == {MCP_TITLE, RETRIEVAL_TITLE}
+
+
+def test_direct_mode_makes_one_generation_call():
+    router = fake_llm.install(fake_llm.FakeRouter(["Lesson 2 covers servers, tools and clients in depth."]))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+
+        answer, sources, sources_detail = rag.query("What does lesson 2 of MCP cover?")
+        assert answer == "Lesson 2 covers servers, tools and clients in depth."
+        assert sources == [f"{MCP_TITLE} - Lesson 2"]
+        assert sources_detail[0]["lesson_link"] == f"https://example.com/{len(MCP_TITLE)}/2"
+        # 只有一次生成调用，检索结果随问题一起发送
+        assert [kind for kind, _ in router.calls] == ["chat"]
+        messages = router.calls[0][1]
+        assert messages[0]["content"].startswith(rag.ai_generator.CONTEXT_SYSTEM_PROMPT)
+        assert f"[{MCP_TITLE} - Lesson 2]" in messages[-1]["content"]
+
+        # 异步版本把线程池中收集的来源带回调用方
+        answer, sources, _ = asyncio.run(rag.aquery("What does lesson 1 of Advanced Retrieval for AI with Chroma cover?"))
+        assert sources == [f"{RETRIEVAL_TITLE} - Lesson 1"]
+        assert len(router.calls) == 2
+
+
+if __name__ == "__main__":
+    test_derive_filters()
+    print("[PASS] 从问题中提取课程和课时")
+    test_retrieve_direct_filters_and_falls_back()
+    print("[PASS] 直接检索的过滤与回退")
+    test_direct_mode_makes_one_generation_call()
+    print("[PASS] 直接模式单次生成调用")
@@ -0,0 +1,123 @@
+"""
+文档目录监视测试
+验证连续修改被合并为一次重新导入，两次导入之间按占空比限速，
+以及没有导入清单时拒绝启动
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from docs_watcher import DocsWatcher
+
+
+class RecordingRAG:
+    """记录导入调用的替身，每次导入耗时固定"""
+    manifest = "manifest.json"
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.calls = []
+        self.reloaded = threading.Event()
+
+    def add_course_folder(self, folder_path):
+        self.calls.append(time.monotonic())
+        time.sleep(self.duration)
+        self.reloaded.set()
+        return 1, 3
+
+
+def write(folder, name, text):
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_burst_is_debounced():
+    with tempfile.TemporaryDirectory() as docs:
+        write(docs, "a.txt", "one")
+        rag = RecordingRAG()
+        watcher = DocsWatcher(rag, docs, poll_interval=0.02, debounce=0.2)
+        watcher.start()
+        try:
+            time.sleep(0.1)
+            assert rag.calls == []
+
+            # 一连串修改只触发一次导入
+            for i in range(5):
+                write(docs, "a.txt", "edit" * (i + 2))
+                write(docs, f"new{i}.txt", "x")
+                time.sleep(0.05)
+            assert rag.reloaded.wait(2.0)
+            time.sleep(0.3)
+            assert len(rag.calls) == 1
+            stats = watcher.get_stats()
+            assert stats["reloads"] == 1 and stats["courses"] == 1 and stats["chunks"] == 3
+        finally:
+            watcher.stop()
+        assert not watcher.get_stats()["running"]
+
+
+def test_reloads_are_throttled():
+    with tempfile.TemporaryDirectory() as docs:
+        rag = RecordingRAG(duration=0.1)
+        watcher = DocsWatcher(rag, docs, poll_interval=0.01, debounce=0.0, max_duty=0.25)
+        watcher.start()
+        try:
+            write(docs, "a.txt", "one")
+            assert rag.reloaded.wait(2.0)
+            # 导入刚结束就再次修改，下一次导入需等待 0.1 * 3 秒
+            write(docs, "b.txt", "two")
+            deadline = time.monotonic() + 2.0
+            while len(rag.calls) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert len(rag.calls) == 2
+            assert rag.calls[1] - rag.calls[0] >= 0.1 + 0.3
+        finally:
+            watcher.stop()
+
+
+def test_reload_errors_are_counted():
+    class FailingRAG:
+        manifest = "manifest.json"
+
+        def add_course_folder(self, folder_path):
+            raise RuntimeError("boom")
+
+    with tempfile.TemporaryDirectory() as docs:
+        watcher = DocsWatcher(FailingRAG(), docs, poll_interval=0.01, debounce=0.0)
+        watcher.start()
+        try:
+            write(docs, "a.txt", "one")
+            deadline = time.monotonic() + 2.0
+            while watcher.get_stats()["errors"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert watcher.get_stats()["errors"] == 1
+        finally:
+            watcher.stop()
+
+
+def test_requires_manifest():
+    """没有导入清单时已存在的课程不会重新导入，监视器拒绝启动"""
+    rag = RecordingRAG()
+    rag.manifest = None
+    with tempfile.TemporaryDirectory() as docs:
+        try:
+            DocsWatcher(rag, docs)
+        except ValueError as e:
+            assert "INGEST_MANIFEST_PATH" in str(e)
+        else:
+            raise AssertionError("DocsWatcher started without a manifest")
+
+
+if __name__ == "__main__":
+    test_burst_is_debounced()
+    print("[PASS] 连续修改合并为一次导入")
+    test_reloads_are_throttled()
+    print("[PASS] 导入按占空比限速")
+    test_reload_errors_are_counted()
+    print("[PASS] 导入错误计数")
+    test_requires_manifest()
+    print("[PASS] 没有导入清单时拒绝启动")
@@ -0,0 +1,76 @@
+"""
+查询嵌入缓存测试
+验证重复文本不重复编码、LRU淘汰、不同模型不共享缓存以及搜索复用查询嵌入
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from fake_embedding import FakeSentenceTransformer
+from embedding_cache import EmbeddingCache
+from models import Course, CourseChunk
+from vector_store import VectorStore
+
+
+def test_repeated_texts_are_encoded_once():
+    """同一批次和后续请求中的重复文本只编码一次"""
+    embedder = FakeSentenceTransformer()
+    cache = EmbeddingCache(embedder, "all-MiniLM-L6-v2", max_entries=10)
+
+    first = cache.get_embeddings(["what is mcp", "what is mcp", "chroma"])
+    second = cache.get_embeddings(["chroma"])
+
+    assert embedder.calls == 1
+    assert (first[0] == first[1]).all()
+    assert (first[2] == second[0]).all()
+    stats = cache.get_stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 2
+
+
+def test_lru_eviction_and_model_keys():
+    """超过容量淘汰最久未用的条目，模型名称参与缓存键"""
+    cache = EmbeddingCache(FakeSentenceTransformer(), "model-a", max_entries=2)
+    cache.get_embeddings(["one", "two"])
+    cache.get_embeddings(["one"])
+    cache.get_embeddings(["three"])
+
+    assert cache.get_stats()["entries"] == 2
+    cache.get_embeddings(["two"])
+    assert cache.get_stats()["misses"] == 4
+
+    other = EmbeddingCache(FakeSentenceTransformer(), "model-b")
+    assert cache.make_key("one") != other.make_key("one")
+
+
+def test_search_reuses_query_embeddings():
+    """重复搜索复用查询和课程名称的嵌入"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = VectorStore(temp_dir, "all-MiniLM-L6-v2")
+        store.add_course_metadata(Course(title="Advanced Retrieval for AI with Chroma", course_link="https://example.com", instructor="Anton"))
+        store.add_course_content([
+            CourseChunk(content="Query expansion improves retrieval", course_title="Advanced Retrieval for AI with Chroma",
+                        lesson_number=1, chunk_index=0)
+        ])
+
+        for _ in range(3):
+            results = store.search("query expansion", course_name="vector retrieval course")
+            assert results.documents == ["Query expansion improves retrieval"]
+
+        stats = store.query_embedding_cache.get_stats()
+        assert stats["misses"] == 3  # 查询、课程名称、课程标题
+        assert stats["hits"] == 2
+
+
+if __name__ == "__main__":
+    test_repeated_texts_are_encoded_once()
+    print("[PASS] 重复文本只编码一次")
+    test_lru_eviction_and_model_keys()
+    print("[PASS] LRU淘汰与模型键隔离")
+    test_search_reuses_query_embeddings()
+    print("[PASS] 搜索复用查询嵌入")
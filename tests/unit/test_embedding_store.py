@@ -0,0 +1,129 @@
+"""
+持久化嵌入存储测试
+验证未变化的分块在重建时不再调用模型、未提交的写入在重启后被丢弃，
+以及多个进程共用同一存储时追加的行互不错位
+"""
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from fake_embedding import FakeSentenceTransformer
+from embedding_store import EmbeddingStore
+from models import CourseChunk
+from vector_store import VectorStore
+
+CHUNKS = [
+    CourseChunk(content=f"Lesson content number {i}", course_title="Test Course", lesson_number=1, chunk_index=i)
+    for i in range(5)
+]
+
+
+def test_store_reuses_vectors_across_restarts():
+    """重启后已有文本直接读取，只计算新文本"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        embedder = FakeSentenceTransformer()
+        store = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        first = store.get_embeddings(["alpha", "beta", "alpha"], embedder)
+        assert first.shape == (3, 384)
+        assert embedder.calls == 1
+
+        restarted = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        second = restarted.get_embeddings(["beta", "gamma"], embedder)
+        assert np.array_equal(second[0], first[1])
+        assert embedder.calls == 2
+        assert restarted.get_stats() == {"reused": 1, "computed": 1, "vectors": 3, "model": "all-MiniLM-L6-v2"}
+
+        # 其他模型的存储文件不会被复用
+        other = EmbeddingStore(temp_dir, "other-model")
+        assert other.get_stats()["vectors"] == 0
+
+
+def test_uncommitted_rows_are_discarded():
+    """meta.json 未记录的尾部数据在重启时被截断"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        store.get_embeddings(["alpha"], FakeSentenceTransformer())
+        with open(os.path.join(temp_dir, "vectors.f32"), "ab") as f:
+            f.write(b"\0" * 100)
+
+        restarted = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        assert os.path.getsize(os.path.join(temp_dir, "vectors.f32")) == 384 * 4
+        assert restarted.get_embeddings(["alpha"], FakeSentenceTransformer()).shape == (1, 384)
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend')
+
+# 子进程：逐条追加文本的嵌入（与hash_embed相同的向量）
+APPEND_WORKER = """
+import hashlib, sys
+import numpy as np
+sys.path.insert(0, sys.argv[1])
+from embedding_store import EmbeddingStore
+embed = lambda texts: [np.frombuffer(hashlib.sha256(t.encode()).digest(), dtype=np.uint8).astype(np.float32) for t in texts]
+store = EmbeddingStore(sys.argv[2], "all-MiniLM-L6-v2")
+for text in sys.argv[3:]:
+    store.get_embeddings([text, "shared text"], embed)
+"""
+
+
+def hash_embed(texts):
+    return [np.frombuffer(hashlib.sha256(t.encode()).digest(), dtype=np.uint8).astype(np.float32) for t in texts]
+
+
+def test_stores_share_directory():
+    """同一目录上的多个存储实例（包括其他进程）追加时先读取已提交的行"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        second = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        first.get_embeddings(["alpha"], hash_embed)
+        second.get_embeddings(["beta", "alpha"], hash_embed)
+        first.get_embeddings(["gamma"], hash_embed)
+        assert first.get_stats()["vectors"] == 3
+
+        worker_texts = [[f"worker {w} text {i}" for i in range(20)] for w in range(4)]
+        workers = [
+            subprocess.Popen([sys.executable, "-c", APPEND_WORKER, BACKEND_DIR, temp_dir, *texts])
+            for texts in worker_texts
+        ]
+        assert [worker.wait(timeout=60) for worker in workers] == [0] * len(workers)
+
+        texts = ["alpha", "beta", "gamma", "shared text"] + [text for texts in worker_texts for text in texts]
+        reopened = EmbeddingStore(temp_dir, "all-MiniLM-L6-v2")
+        assert reopened.get_stats()["vectors"] == len(texts)
+        assert np.array_equal(reopened.get_embeddings(texts, hash_embed), np.stack(hash_embed(texts)))
+
+
+def test_rebuild_does_no_model_inference():
+    """清空集合后重新导入未变化的分块不调用嵌入模型"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = VectorStore(
+            os.path.join(temp_dir, "chroma"), "all-MiniLM-L6-v2",
+            embedding_store_path=os.path.join(temp_dir, "embeddings")
+        )
+        store.add_course_content(CHUNKS)
+        store.clear_all_data()
+        store.add_course_content(CHUNKS)
+
+        assert store.embedding_store.get_stats()["computed"] == len(CHUNKS)
+        assert store.embedding_store.get_stats()["reused"] == len(CHUNKS)
+        assert store.course_content.count() == len(CHUNKS)
+
+
+if __name__ == "__main__":
+    test_store_reuses_vectors_across_restarts()
+    print("[PASS] 重启后复用已存储的嵌入")
+    test_uncommitted_rows_are_discarded()
+    print("[PASS] 未提交的写入被丢弃")
+    test_stores_share_directory()
+    print("[PASS] 多个实例共用存储目录")
+    test_rebuild_does_no_model_inference()
+    print("[PASS] 重建未变化的语料无需模型推理")
@@ -0,0 +1,128 @@
+"""
+增量导入测试
+验证未变化的文件不被读取、修改的文件替换旧分块、仅修改时间的文件被跳过、删除的文件移除课程，
+原地修改分块文本后语料版本变化、缓存的答案失效，
+以及存储被清空后清单中的文件重新导入
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+import fake_embedding
+fake_embedding.install()
+import fake_llm
+
+from config import Config
+from rag_system import RAGSystem
+
+
+def write_course(folder, name, title, body):
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(f"Course Title: {title}\nCourse Link: https://example.com/{name}\nCourse Instructor: Teacher\n\n")
+        f.write(f"Lesson 1: Basics\nLesson Link: https://example.com/{name}/1\n{body}\n")
+
+
+def create_system(temp_dir, chroma_name="chroma"):
+    config = Config()
+    config.CHROMA_PATH = os.path.join(temp_dir, chroma_name)
+    config.EMBEDDING_STORE_PATH = os.path.join(temp_dir, "embeddings")
+    config.PARSE_CACHE_PATH = os.path.join(temp_dir, "parse_cache")
+    config.LEXICAL_INDEX_PATH = os.path.join(temp_dir, "lexical_index.json")
+    config.INGEST_MANIFEST_PATH = os.path.join(temp_dir, "manifest.json")
+    config.INGEST_WORKERS = 1
+    return RAGSystem(config)
+
+
+def test_incremental_reingestion():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        write_course(docs, "a.txt", "Course A", "Alpha content is short.")
+        write_course(docs, "b.txt", "Course B", "Beta content is short.")
+        write_course(docs, "c.txt", "Course C", "Gamma content is short.")
+
+        rag = create_system(temp_dir)
+        assert rag.add_course_folder(docs)[0] == 3
+
+        # 重启后未变化的文件不会被读取
+        rag = create_system(temp_dir)
+        assert rag.add_course_folder(docs) == (0, 0)
+        assert rag.ingestor.get_last_stats()["stages"]["read"]["files"] == 0
+
+        # 修改内容、仅更新时间、删除文件
+        time.sleep(0.01)
+        write_course(docs, "a.txt", "Course A", "Changed alpha content.")
+        os.utime(os.path.join(docs, "b.txt"))
+        os.remove(os.path.join(docs, "c.txt"))
+
+        assert rag.add_course_folder(docs)[0] == 1
+        stats = rag.ingestor.get_last_stats()
+        assert stats["unchanged_files"] == 1
+        assert stats["replaced_courses"] == 1
+
+        store = rag.vector_store
+        assert sorted(store.get_existing_course_titles()) == ["Course A", "Course B"]
+        contents = store.course_content.get(where={"course_title": "Course A"})["documents"]
+        assert len(contents) == 1 and "Changed alpha" in contents[0]
+        assert store.course_content.get(where={"course_title": "Course C"})["ids"] == []
+
+        # 只修改时间的文件已更新清单，再次导入时不再读取
+        rag.add_course_folder(docs)
+        assert rag.ingestor.get_last_stats()["stages"]["read"]["files"] == 0
+
+
+def test_edited_chunk_changes_corpus_version():
+    router = fake_llm.install(fake_llm.FakeRouter(["Alpha content is short."]))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        write_course(docs, "a.txt", "Course A", "Alpha content is short.")
+        rag = create_system(temp_dir)
+        rag.add_course_folder(docs)
+
+        version = rag.vector_store.get_corpus_version()
+        rag.query("What is alpha content?")
+        rag.query("What is alpha content?")
+        assert len(router.calls) == 1
+
+        # 课程标题和分块数量不变，只有分块文本变化
+        time.sleep(0.01)
+        write_course(docs, "a.txt", "Course A", "Alpha content is long.")
+        rag.add_course_folder(docs)
+        assert rag.vector_store.course_content.count() == 1
+        assert rag.vector_store.get_corpus_version() != version
+
+        rag.query("What is alpha content?")
+        assert len(router.calls) == 2
+
+
+def test_wiped_store_is_reingested():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        write_course(docs, "a.txt", "Course A", "Alpha content is short.")
+        assert create_system(temp_dir).add_course_folder(docs) == (1, 1)
+
+        # 另一个进程使用空的存储（如chroma_db被删除）但共享同一个清单
+        rag = create_system(temp_dir, chroma_name="wiped")
+        assert rag.add_course_folder(docs) == (1, 1)
+        assert rag.vector_store.get_existing_course_titles() == ["Course A"]
+
+        # 清空数据时清单一并清空
+        rag.clear_all_data()
+        assert rag.vector_store.get_existing_course_titles() == []
+        assert rag.add_course_folder(docs) == (1, 1)
+        assert rag.add_course_folder(docs) == (0, 0)
+
+
+if __name__ == "__main__":
+    test_incremental_reingestion()
+    print("[PASS] 增量导入")
+    test_edited_chunk_changes_corpus_version()
+    print("[PASS] 修改分块文本后缓存的答案失效")
+    test_wiped_store_is_reingested()
+    print("[PASS] 存储被清空后重新导入")
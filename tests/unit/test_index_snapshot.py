@@ -0,0 +1,132 @@
+"""
+索引快照测试
+验证发布的快照以内存映射方式提供与原索引一致的检索、词法索引和目录信息、只读、
+内容未变化时不重复发布，发布新版本后已打开的旧快照仍可读取，
+以及清理旧版本时不删除其他发布者正在写入或更新的版本
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+import fake_embedding
+fake_embedding.install()
+
+from config import Config
+from models import Course, CourseChunk, Lesson
+from rag_system import RAGSystem
+from vector_store import VectorStore
+
+
+def build_course(title, words):
+    course = Course(
+        title=title,
+        course_link=f"https://example.com/{len(title)}",
+        instructor="Teacher",
+        lessons=[Lesson(lesson_number=n, title=f"Lesson {n}", lesson_link=f"https://example.com/{title}/{n}") for n in range(2)]
+    )
+    chunks = [
+        CourseChunk(content=f"{title} chunk {i} about {words[i % len(words)]} and {words[(i + 1) % len(words)]}",
+                    course_title=title, lesson_number=i % 2, chunk_index=i)
+        for i in range(8)
+    ]
+    return course, chunks
+
+
+def create_store(temp_dir, backend):
+    return VectorStore(
+        os.path.join(temp_dir, "chroma"), "all-MiniLM-L6-v2", backend=backend,
+        numpy_path=os.path.join(temp_dir, "numpy"), snapshot_path=os.path.join(temp_dir, "snapshot")
+    )
+
+
+def test_snapshot_serves_searches():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = create_store(temp_dir, "numpy")
+        for title, words in [("Retrieval Basics", ["vectors", "search", "ranking"]),
+                             ("Agent Design", ["tools", "planning", "memory"])]:
+            course, chunks = build_course(title, words)
+            source.add_course_metadata(course)
+            source.add_course_content(chunks)
+        first = source.publish_index_snapshot()
+        assert first is not None
+        assert source.publish_index_snapshot() is None
+
+        served = create_store(temp_dir, "snapshot")
+        assert isinstance(served.course_content._matrix, np.memmap)
+        assert served.read_only and served.course_content.count() == 16
+        assert sorted(served.get_existing_course_titles()) == ["Agent Design", "Retrieval Basics"]
+        assert served.get_lesson_link("Agent Design", 1) == "https://example.com/Agent Design/1"
+        assert served.get_corpus_version() == source.get_corpus_version()
+        for query, course_name, lesson in [("vectors ranking", None, None), ("tools memory", "Agent", 1)]:
+            expected = source.search(query, course_name=course_name, lesson_number=lesson)
+            actual = served.search(query, course_name=course_name, lesson_number=lesson)
+            assert actual.documents == expected.documents and actual.metadata == expected.metadata
+            assert np.allclose(actual.distances, expected.distances)
+        assert served.course_content.get(ids=["Agent_Design_3"])["documents"] == [
+            "Agent Design chunk 3 about tools and planning"
+        ]
+        # 词法索引随快照版本发布，首次词法检索时从该版本读取
+        assert served.lexical_index is None
+        expected = source.search("tools memory", mode="lexical")
+        assert served.search("tools memory", mode="lexical").documents == expected.documents
+        assert served.lexical_index.path == os.path.join(served._snapshot_directory, VectorStore.SNAPSHOT_LEXICAL_INDEX)
+        assert os.path.exists(served.lexical_index.path)
+        try:
+            served.add_course_content(build_course("New", ["x"])[1])
+            assert False, "snapshot should be read-only"
+        except RuntimeError:
+            pass
+
+        # 发布新版本后旧版本目录被删除，已映射的旧快照仍可读取；
+        # 其他发布者正在写入的目录和更新的版本保留
+        snapshot_dir = os.path.join(temp_dir, "snapshot")
+        in_progress = os.path.join(snapshot_dir, "snapshot-1.tmp")
+        newer = os.path.join(snapshot_dir, f"snapshot-{2 ** 62}")
+        os.makedirs(in_progress)
+        os.makedirs(newer)
+        source.delete_course("Retrieval Basics")
+        second = source.publish_index_snapshot()
+        assert second not in (None, first)
+        assert not os.path.exists(os.path.join(snapshot_dir, first))
+        assert os.path.isdir(in_progress) and os.path.isdir(newer)
+        os.rmdir(newer)
+        assert served.course_content.count() == 16 and not served.search("vectors ranking").is_empty()
+        assert create_store(temp_dir, "snapshot").course_content.count() == 8
+
+
+def test_serving_system_skips_ingestion():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        with open(os.path.join(docs, "a.txt"), "w", encoding="utf-8") as f:
+            f.write("Course Title: Course A\nCourse Link: https://example.com/a\nCourse Instructor: Teacher\n\n"
+                    "Lesson 1: Basics\nLesson Link: https://example.com/a/1\nAlpha content about snapshots.\n")
+
+        config = Config()
+        config.CHROMA_PATH = os.path.join(temp_dir, "chroma")
+        config.EMBEDDING_STORE_PATH = ""
+        config.PARSE_CACHE_PATH = ""
+        config.LEXICAL_INDEX_PATH = ""
+        config.INGEST_MANIFEST_PATH = ""
+        config.INGEST_WORKERS = 1
+        config.INDEX_SNAPSHOT_PATH = os.path.join(temp_dir, "snapshot")
+        assert RAGSystem(config).add_course_folder(docs)[0] == 1
+
+        config.VECTOR_BACKEND = "snapshot"
+        worker = RAGSystem(config)
+        assert worker.add_course_folder(docs) == (0, 0)
+        assert worker.get_course_analytics()["total_courses"] == 1
+        assert worker.vector_store.search("snapshots", course_name="Course A").documents
+        assert worker.vector_store.get_snapshot_info()["counts"] == {"course_catalog": 1, "course_content": 1}
+
+
+if __name__ == "__main__":
+    test_snapshot_serves_searches()
+    print("[PASS] 快照检索与原索引一致")
+    test_serving_system_skips_ingestion()
+    print("[PASS] 只读工作进程直接使用快照")
@@ -0,0 +1,128 @@
+"""
+导入流水线测试
+验证多进程解析的结果与串行处理一致、所有写入都在同一个写入线程中完成，
+以及有界队列限制嵌入阶段领先写入阶段的批次数
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from document_processor import DocumentProcessor
+from ingestion import CourseIngestor
+
+
+class RecordingStore:
+    """模拟向量存储，记录写入内容、写入线程以及嵌入/写入的批次数"""
+
+    def __init__(self, write_delay=0.0):
+        self.write_delay = write_delay
+        self.courses = []
+        self.chunks = []
+        self.threads = set()
+        self.embedded_batches = 0
+        self.written_batches = 0
+        self.max_lead = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, documents):
+        with self._lock:
+            self.embedded_batches += 1
+            self.max_lead = max(self.max_lead, self.embedded_batches - self.written_batches)
+        return np.zeros((len(documents), 4), dtype=np.float32)
+
+    def add_course_metadata(self, course):
+        self.threads.add(threading.current_thread().name)
+        self.courses.append(course)
+
+    def add_course_content(self, chunks, embeddings=None):
+        self.threads.add(threading.current_thread().name)
+        assert embeddings is not None and len(embeddings) == len(chunks)
+        time.sleep(self.write_delay)
+        self.chunks.extend(chunks)
+        with self._lock:
+            self.written_batches += 1
+
+
+def write_course(folder, index, sentences=40):
+    path = os.path.join(folder, f"course{index}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Course Title: Course {index}\nCourse Link: https://example.com/{index}\nCourse Instructor: Teacher\n\n")
+        for lesson in range(3):
+            f.write(f"Lesson {lesson}: Topic {lesson}\nLesson Link: https://example.com/{index}/{lesson}\n")
+            f.write(" ".join(f"Sentence {n} of lesson {lesson} in course {index}." for n in range(sentences)) + "\n")
+    return path
+
+
+def test_parallel_ingestion_matches_serial_parsing():
+    """多进程解析得到与串行解析相同的课程和分块，已存在的课程被跳过"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [write_course(temp_dir, i) for i in range(4)]
+        processor = DocumentProcessor(800, 100)
+        store = RecordingStore()
+        ingestor = CourseIngestor(store, processor, workers=2, batch_size=5)
+
+        courses, chunks = ingestor.ingest(paths, skip_titles={"Course 3"})
+
+        expected = [processor.process_course_document(path) for path in paths[:3]]
+        assert courses == 3
+        assert chunks == sum(len(course_chunks) for _, course_chunks in expected)
+        assert sorted(c.title for c in store.courses) == ["Course 0", "Course 1", "Course 2"]
+        assert sorted(c.content for c in store.chunks) == sorted(c.content for _, cc in expected for c in cc)
+        assert store.threads == {"ingest-writer"}
+
+        stats = ingestor.get_last_stats()["stages"]
+        assert stats["parse"]["files"] == 4
+        assert stats["write"]["files"] == 3
+        assert stats["embed"]["chunks"] == chunks
+
+
+def test_bounded_queues_apply_backpressure():
+    """写入较慢时嵌入阶段最多领先队列容量个批次"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [write_course(temp_dir, i, sentences=80) for i in range(3)]
+        store = RecordingStore(write_delay=0.01)
+        ingestor = CourseIngestor(store, DocumentProcessor(200, 0), workers=1, batch_size=2, queue_size=1)
+
+        ingestor.ingest(paths, skip_titles=set())
+
+        assert store.written_batches > 20
+        # 队列中1个、写入线程手中1个、嵌入线程刚完成等待放入的1个
+        assert store.max_lead <= 3
+        stats = ingestor.get_last_stats()["stages"]
+        assert stats["write"]["utilization"] > stats["embed"]["utilization"]
+
+
+def test_large_files_are_streamed_in_parts():
+    """超过阈值的文件边读边解析，分块按批次分段传递，结果与整体解析一致"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [write_course(temp_dir, i) for i in range(3)]
+        processor = DocumentProcessor(200, 50)
+        store = RecordingStore()
+        ingestor = CourseIngestor(store, processor, workers=2, batch_size=4, stream_threshold=0)
+
+        courses, chunks = ingestor.ingest(paths, skip_titles={"Course 2"})
+
+        expected = [processor.process_course_document(path) for path in paths[:2]]
+        assert courses == 2
+        assert [c.content for c in sorted(store.chunks, key=lambda c: (c.course_title, c.chunk_index))] == \
+            [c.content for _, cc in expected for c in cc]
+        # 课程元数据在最后一段写入，此时课时列表已完整
+        assert sorted(store.courses, key=lambda c: c.title) == [course for course, _ in expected]
+        stats = ingestor.get_last_stats()["stages"]
+        assert stats["parse"]["files"] == 3
+        assert stats["write"]["files"] == 2
+
+
+if __name__ == "__main__":
+    test_parallel_ingestion_matches_serial_parsing()
+    print("[PASS] 并行解析与串行结果一致，单线程写入")
+    test_bounded_queues_apply_backpressure()
+    print("[PASS] 有界队列产生背压")
+    test_large_files_are_streamed_in_parts()
+    print("[PASS] 大文件流式分段导入")
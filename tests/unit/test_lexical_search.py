@@ -0,0 +1,176 @@
+"""
+BM25 词法检索与混合检索测试
+验证倒排索引按 BM25 排序并支持课程/课时过滤、更新删除后与内容集合同步、
+持久化后重启可恢复（缺失时从集合重建）、向量模式首次使用时才加载，以及混合检索的排名融合和嵌入失败时的词法回退
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from lexical_index import LexicalIndex, tokenize
+from models import Course, CourseChunk, Lesson
+from vector_store import VectorStore
+
+CHUNKS = [
+    ("Course A", 1, "The MCP server exposes tools to the model over a simple protocol."),
+    ("Course A", 1, "Prompt caching lowers latency for long prompts."),
+    ("Course A", 2, "Computer use lets the model drive a desktop with screenshots and clicks."),
+    ("Course B", 1, "Retrieval with embeddings finds related passages."),
+    ("Course B", 2, "An MCP client connects to every configured MCP server at startup."),
+    ("Course B", 2, "Evaluations compare model answers against reference answers."),
+]
+
+
+def build_chunks():
+    return [
+        CourseChunk(content=text, course_title=title, lesson_number=lesson, chunk_index=i)
+        for i, (title, lesson, text) in enumerate(CHUNKS)
+    ]
+
+
+def create_store(temp_dir, lexical_name="lexical_index.json", search_mode="lexical"):
+    return VectorStore(
+        os.path.join(temp_dir, "chroma"), "all-MiniLM-L6-v2",
+        lexical_index_path=os.path.join(temp_dir, lexical_name),
+        search_mode=search_mode
+    )
+
+
+def fill(store):
+    for title in ("Course A", "Course B"):
+        store.add_course_metadata(Course(
+            title=title, instructor="Teacher",
+            lessons=[Lesson(lesson_number=n, title=f"Lesson {n}") for n in (1, 2)]
+        ))
+    store.add_course_content(build_chunks())
+
+
+def test_bm25_ranking_and_filters():
+    index = LexicalIndex()
+    chunks = build_chunks()
+    index.add(
+        [f"c{chunk.chunk_index}" for chunk in chunks],
+        [chunk.content for chunk in chunks],
+        [{"course_title": chunk.course_title, "lesson_number": chunk.lesson_number} for chunk in chunks]
+    )
+    assert tokenize("The MCP server_name") == ["mcp", "server", "name"]
+
+    # 词频更高的分块排在前面，停用词不参与评分
+    hits = index.search("what is MCP", 5)
+    assert [chunk_id for chunk_id, _, _, _ in hits] == ["c4", "c0"]
+    assert hits[0][3] > hits[1][3] > 0
+    assert index.search("the of and", 5) == []
+
+    assert [h[0] for h in index.search("MCP server", 5, course_title="Course A")] == ["c0"]
+    assert sorted(h[0] for h in index.search("model", 5, lesson_number=2)) == ["c2", "c5"]
+
+    # 相同 ID 再次加入时替换旧内容
+    index.add(["c0"], ["Nothing relevant here."], [{"course_title": "Course A", "lesson_number": 1}])
+    assert [h[0] for h in index.search("MCP", 5)] == ["c4"]
+    index.remove(["c4"])
+    assert index.search("MCP", 5) == []
+    assert index.count() == 5
+
+
+def test_index_follows_store_and_persists():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = create_store(temp_dir)
+        fill(store)
+        assert store.lexical_index.count() == store.course_content.count() == 6
+
+        result = store.search("MCP server", mode="lexical")
+        assert result.documents[0] == CHUNKS[4][2] and len(result.documents) == 2
+        assert result.distances[0] < result.distances[1] < 0
+        assert store.search("MCP", course_name="Course A", mode="lexical").documents == [CHUNKS[0][2]]
+        assert store.search("MCP", mode="fuzzy").error == "Unknown search mode: fuzzy"
+
+        # 同步和删除课程后索引随之更新
+        chunks = [chunk for chunk in build_chunks() if chunk.course_title == "Course B"][:2]
+        chunks[1] = chunks[1].model_copy(update={"content": "The client lists tools from each server."})
+        store.sync_course_content("Course B", chunks)
+        assert store.search("MCP", mode="lexical").documents == [CHUNKS[0][2]]
+        store.delete_course("Course A")
+        assert store.search("MCP", mode="lexical").is_empty()
+        assert store.lexical_index.count() == store.course_content.count() == 2
+        store.flush()
+
+        # 索引以纯数据的JSON保存
+        with open(os.path.join(temp_dir, "lexical_index.json"), encoding="utf-8") as f:
+            assert json.load(f)["format"] == LexicalIndex.FORMAT
+        reopened = create_store(temp_dir)
+        assert reopened.search("client tools", mode="lexical").documents == ["The client lists tools from each server."]
+
+        # 索引文件缺失时从内容集合重建
+        rebuilt = create_store(temp_dir, lexical_name="other.json")
+        assert rebuilt.lexical_index.count() == 2
+        assert os.path.exists(os.path.join(temp_dir, "other.json"))
+
+
+def test_vector_mode_loads_index_on_first_use():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = create_store(temp_dir)
+        fill(source)
+        source.flush()
+        index_path = os.path.join(temp_dir, "lexical_index.json")
+        assert os.path.exists(index_path)
+
+        # 向量模式启动时不加载索引；未加载时的写入使持久化的索引失效
+        store = create_store(temp_dir, search_mode="vector")
+        assert store.lexical_index is None
+        chunks = build_chunks()[:3]
+        chunks[0] = chunks[0].model_copy(update={"content": "Agents call tools in a loop."})
+        store.sync_course_content("Course A", chunks)
+        assert store.lexical_index is None and not os.path.exists(index_path)
+
+        # 首次词法检索时从内容集合重建并持久化
+        assert store.search("agents loop", mode="lexical").documents == ["Agents call tools in a loop."]
+        assert store.lexical_index.count() == store.course_content.count() == 6
+        assert os.path.exists(index_path)
+        assert create_store(temp_dir).search("agents loop").documents == ["Agents call tools in a loop."]
+
+
+def test_hybrid_fusion_and_fallback():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = create_store(temp_dir)
+        fill(store)
+
+        # 融合结果等于两种排名的倒数排名之和
+        query = "MCP server tools"
+        candidates = 3 * VectorStore.HYBRID_CANDIDATES
+        fused = {}
+        for mode in ("vector", "lexical"):
+            for rank, document in enumerate(store.search(query, mode=mode, limit=candidates).documents):
+                fused[document] = fused.get(document, 0.0) + 1.0 / (VectorStore.RRF_K + rank + 1)
+        result = store.search(query, mode="hybrid", limit=3)
+        assert result.error is None
+        assert result.documents == sorted(fused, key=fused.get, reverse=True)[:3]
+        assert result.distances == sorted(result.distances)
+
+        filtered = store.search("model", course_name="Course B", lesson_number=2, mode="hybrid")
+        assert filtered.documents
+        assert all(m["course_title"] == "Course B" and m["lesson_number"] == 2 for m in filtered.metadata)
+
+        # 嵌入失败时混合检索退回词法结果，纯向量检索返回错误
+        def fail(texts):
+            raise RuntimeError("embedding model saturated")
+        store.embed_texts = fail
+        fallback = store.search("MCP server", mode="hybrid")
+        assert fallback.documents == store.search("MCP server", mode="lexical").documents
+        assert store.search("MCP server", mode="vector").error.startswith("Search error")
+
+
+if __name__ == "__main__":
+    test_bm25_ranking_and_filters()
+    print("[PASS] BM25 排序与过滤")
+    test_index_follows_store_and_persists()
+    print("[PASS] 索引同步与持久化")
+    test_vector_mode_loads_index_on_first_use()
+    print("[PASS] 向量模式首次使用时加载索引")
+    test_hybrid_fusion_and_fallback()
+    print("[PASS] 混合检索融合与回退")
@@ -0,0 +1,142 @@
+"""
+NumPy 向量后端测试
+验证 NumpyCollection 与 Chroma 检索结果一致（含课程/课时过滤）、
+更新与删除后过滤仍正确，以及写入磁盘后重启可恢复
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import fake_embedding
+fake_embedding.install()
+
+from models import Course, CourseChunk, Lesson
+from numpy_store import NumpyCollection
+from vector_store import VectorStore
+
+TOPICS = ["vectors", "prompts", "agents", "retrieval", "evaluation", "tools"]
+
+
+def build_courses():
+    courses, chunks = [], []
+    for c in range(3):
+        title = f"Course {c} on {TOPICS[c]}"
+        courses.append(Course(
+            title=title,
+            course_link=f"https://example.com/{c}",
+            instructor="Teacher",
+            lessons=[Lesson(lesson_number=n, title=f"Lesson {n}", lesson_link=f"https://example.com/{c}/{n}") for n in range(3)]
+        ))
+        for i in range(12):
+            words = " ".join(TOPICS[(c + i + k) % len(TOPICS)] for k in range(3))
+            chunks.append(CourseChunk(
+                content=f"Chunk {i} of {title} covers {words}",
+                course_title=title,
+                lesson_number=i % 3,
+                chunk_index=i
+            ))
+    return courses, chunks
+
+
+def create_store(temp_dir, backend):
+    return VectorStore(
+        os.path.join(temp_dir, "chroma"), "all-MiniLM-L6-v2",
+        backend=backend, numpy_path=os.path.join(temp_dir, "numpy")
+    )
+
+
+def fill(store):
+    courses, chunks = build_courses()
+    for course in courses:
+        store.add_course_metadata(course)
+    store.add_course_content(chunks)
+    return courses
+
+
+def test_search_matches_chroma():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        chroma = create_store(temp_dir, "chroma")
+        numpy_store = create_store(temp_dir, "numpy")
+        fill(chroma)
+        fill(numpy_store)
+
+        assert numpy_store.course_content.count() == chroma.course_content.count() == 36
+        assert sorted(numpy_store.get_existing_course_titles()) == sorted(chroma.get_existing_course_titles())
+        for query, course_name, lesson in [
+            ("agents and tools", None, None),
+            ("retrieval evaluation", "Course 1", None),
+            ("prompts", None, 2),
+            ("vectors agents", "Course 2 on agents", 1),
+        ]:
+            expected = chroma.search(query, course_name=course_name, lesson_number=lesson)
+            actual = numpy_store.search(query, course_name=course_name, lesson_number=lesson)
+            assert actual.error is None and not actual.is_empty()
+            # 距离相同（平方 L2）；与第 k 名并列的结果可能不同，只比较更近的部分
+            assert np.allclose(actual.distances, expected.distances, atol=1e-4)
+            cutoff = actual.distances[-1] - 1e-4
+            closer = lambda results: {doc for doc, d in zip(results.documents, results.distances) if d < cutoff}
+            assert closer(actual) == closer(expected)
+            for metadata in actual.metadata:
+                assert lesson is None or metadata["lesson_number"] == lesson
+
+
+def test_updates_keep_filters_consistent():
+    collection = NumpyCollection(tempfile.mkdtemp(), "content", lambda texts: np.eye(4)[:len(texts)],
+                                 indexed_fields=("course",))
+    vectors = np.eye(4, dtype=np.float32)
+    collection.add(ids=["a", "b", "c", "d"], documents=["A", "B", "C", "D"], embeddings=vectors,
+                   metadatas=[{"course": "x"}, {"course": "y"}, {"course": "x"}, {"course": "y"}])
+    # 已存在的 ID 在 add 时被跳过，upsert 时被替换
+    collection.add(ids=["a"], documents=["A2"], embeddings=vectors[:1], metadatas=[{"course": "y"}])
+    assert collection.get(ids=["a"])["documents"] == ["A"]
+    collection.upsert(ids=["a"], documents=["A2"], embeddings=vectors[1:2], metadatas=[{"course": "y"}])
+
+    # 删除中间的行后，末尾行被移入空位，过滤仍然正确
+    collection.delete(where={"course": "x"})
+    assert collection.count() == 3
+    assert sorted(collection.get(where={"course": "y"})["ids"]) == ["a", "b", "d"]
+    assert collection.get(where={"course": "x"})["ids"] == []
+
+    result = collection.query(query_embeddings=[vectors[1]], n_results=2, where={"course": "y"})
+    assert sorted(result["ids"][0]) == ["a", "b"]
+    assert result["distances"][0] == [0.0, 0.0]
+    assert collection.query(query_embeddings=[vectors[1]], where={"course": "z"})["ids"] == [[]]
+
+
+def test_persisted_store_reloads():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = create_store(temp_dir, "numpy")
+        fill(store)
+        store.delete_course("Course 0 on vectors")
+        store.flush()
+        before = store.search("agents tools", course_name="Course 1", lesson_number=1)
+
+        reopened = create_store(temp_dir, "numpy")
+        assert reopened.get_course_count() == 2
+        assert reopened.course_content.count() == 24
+        assert reopened.get_lesson_link("Course 2 on agents", 1) == "https://example.com/2/1"
+        after = reopened.search("agents tools", course_name="Course 1", lesson_number=1)
+        assert after.documents == before.documents and np.allclose(after.distances, before.distances)
+
+        # 同步修改后的课程只改写变化的分块
+        _, chunks = build_courses()
+        course_chunks = [chunk for chunk in chunks if chunk.course_title == "Course 1 on prompts"][:10]
+        course_chunks[0] = course_chunks[0].model_copy(update={"content": "Rewritten first chunk"})
+        result = reopened.sync_course_content("Course 1 on prompts", course_chunks)
+        assert result["upserted"] == 1 and result["deleted"] == 2 and result["unchanged"] == 9
+
+        reopened.clear_all_data()
+        assert create_store(temp_dir, "numpy").course_content.count() == 0
+
+
+if __name__ == "__main__":
+    test_search_matches_chroma()
+    print("[PASS] 检索结果与 Chroma 一致")
+    test_updates_keep_filters_consistent()
+    print("[PASS] 更新和删除后过滤正确")
+    test_persisted_store_reloads()
+    print("[PASS] 持久化后重启恢复")
@@ -0,0 +1,108 @@
+"""
+解析缓存测试
+验证缓存的解析结果与重新解析一致、加载快于解析、分块设置变化时缓存失效，
+以及导入流水线命中缓存时跳过解析
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from document_processor import DocumentProcessor
+from ingest_manifest import IngestManifest
+from ingestion import CourseIngestor
+from parse_cache import ParseCache
+
+DOCS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'docs')
+
+
+def doc_paths():
+    return [os.path.join(DOCS_PATH, name) for name in sorted(os.listdir(DOCS_PATH))]
+
+
+def test_cached_parse_matches_and_loads_faster():
+    processor = DocumentProcessor(800, 100)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ParseCache(temp_dir, processor.settings_fingerprint())
+        parse_seconds = load_seconds = 0.0
+        for path in doc_paths():
+            content = processor.read_file(path)
+            content_hash = IngestManifest.hash_content(content)
+            assert cache.get(content_hash) is None
+
+            started_at = time.perf_counter()
+            course, chunks = processor.process_course_text(content, path)
+            parse_seconds += time.perf_counter() - started_at
+            cache.put(content_hash, course, chunks)
+
+            started_at = time.perf_counter()
+            cached_course, cached_chunks = cache.get(content_hash)
+            load_seconds += time.perf_counter() - started_at
+            assert cached_course == course
+            assert cached_chunks == chunks
+
+        assert load_seconds < parse_seconds
+        # 条目是纯数据的JSON文件
+        for name in os.listdir(cache.directory):
+            with open(os.path.join(cache.directory, name), encoding="utf-8") as f:
+                assert json.load(f)["format"] == ParseCache.FORMAT
+        stats = cache.get_stats()
+        assert stats["hits"] == 4 and stats["misses"] == 4 and stats["stores"] == 4
+
+
+def test_changed_settings_invalidate_entries():
+    path = doc_paths()[0]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        processor = DocumentProcessor(800, 100)
+        content = processor.read_file(path)
+        content_hash = IngestManifest.hash_content(content)
+        ParseCache(temp_dir, processor.settings_fingerprint()).put(
+            content_hash, *processor.process_course_text(content, path)
+        )
+        assert ParseCache(temp_dir, processor.settings_fingerprint()).get(content_hash) is not None
+
+        # 分块大小变化后旧条目被删除
+        resized = DocumentProcessor(400, 100)
+        assert resized.settings_fingerprint() != processor.settings_fingerprint()
+        assert ParseCache(temp_dir, resized.settings_fingerprint()).get(content_hash) is None
+        assert len(os.listdir(temp_dir)) == 1
+        assert ParseCache(temp_dir, processor.settings_fingerprint()).get(content_hash) is None
+
+
+class NullStore:
+    def embed_documents(self, documents):
+        return np.zeros((len(documents), 4), dtype=np.float32)
+
+    def add_course_metadata(self, course):
+        pass
+
+    def add_course_content(self, chunks, embeddings=None):
+        pass
+
+
+def test_ingestion_skips_parsing_cached_documents():
+    processor = DocumentProcessor(800, 100)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ParseCache(temp_dir, processor.settings_fingerprint())
+        first = CourseIngestor(NullStore(), processor, workers=2, parse_cache=cache)
+        assert first.ingest(doc_paths(), skip_titles=set()) == (4, 528)
+        assert cache.get_stats()["stores"] == 4
+
+        second = CourseIngestor(NullStore(), processor, workers=2, parse_cache=cache)
+        assert second.ingest(doc_paths(), skip_titles=set()) == (4, 528)
+        stats = cache.get_stats()
+        assert stats["hits"] == 4 and stats["stores"] == 4
+
+
+if __name__ == "__main__":
+    test_cached_parse_matches_and_loads_faster()
+    print("[PASS] 缓存结果一致且加载更快")
+    test_changed_settings_invalidate_entries()
+    print("[PASS] 分块设置变化使缓存失效")
+    test_ingestion_skips_parsing_cached_documents()
+    print("[PASS] 导入命中缓存时跳过解析")
@@ -0,0 +1,136 @@
+"""
+量化检索测试
+验证 int8 量化的误差、分块扫描与精确检索一致、量化快照检索
+经全精度重排后距离精确且召回率高，以及每个快照版本只测量一次召回率
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+import index_snapshot
+import quantization
+from index_snapshot import SnapshotCollection, measure_collection_recall, publish_snapshot, write_collection
+from numpy_store import nearest_rows
+
+
+def clustered_vectors(count, dimensions=64, clusters=20, seed=0):
+    """Unit vectors around a few centers, like embeddings of related chunks"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimensions))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def test_quantize_and_scan():
+    vectors = clustered_vectors(1000)
+    codes, scales = quantization.quantize(vectors, "int8")
+    assert codes.dtype == np.int8 and codes.nbytes * 4 == vectors.nbytes
+    assert np.abs(codes * scales[:, None] - vectors).max() <= scales.max() / 2 + 1e-6
+
+    # 分块扫描（块小于行数）与逐条精确检索结果一致
+    original_block = quantization.BLOCK_ROWS
+    quantization.BLOCK_ROWS = 128
+    try:
+        norms = np.einsum('ij,ij->i', vectors, vectors)
+        queries = vectors[:5] + 0.1
+        top = quantization.scan_top(vectors, None, norms, queries, 7)
+        for query, rows in zip(queries, top):
+            assert set(rows.tolist()) == set(nearest_rows(vectors, norms, query, 7)[0].tolist())
+    finally:
+        quantization.BLOCK_ROWS = original_block
+
+
+def test_quantized_snapshot_search():
+    vectors = clustered_vectors(3000)
+    data = {
+        "ids": [f"chunk_{i}" for i in range(len(vectors))],
+        "documents": [f"Chunk {i}" for i in range(len(vectors))],
+        "metadatas": [{"course_title": f"Course {i % 3}", "lesson_number": i % 5} for i in range(len(vectors))],
+        "embeddings": vectors
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        write_collection(directory, data, ("course_title", "lesson_number"))
+        assert SnapshotCollection(directory).recall_report == {}
+        report = measure_collection_recall(directory)
+        assert report["int8"]["recall"] >= report["int8"]["recall_without_rescore"]
+        assert report["int8"]["recall"] >= 0.95
+        assert report["int8"]["scan_bytes"] < vectors.nbytes / 3
+
+        exact = SnapshotCollection(directory)
+        queries = clustered_vectors(50, seed=2)
+        for mode in ("int8",):
+            quantized = SnapshotCollection(directory, quantization=mode)
+            assert quantized.recall_report == report
+            hits = 0
+            for query in queries:
+                expected = exact.query([query], n_results=5)
+                actual = quantized.query([query], n_results=5)
+                hits += len(set(expected["ids"][0]) & set(actual["ids"][0]))
+                # 重排后的距离是全精度距离
+                for chunk_id, distance in zip(actual["ids"][0], actual["distances"][0]):
+                    row = int(chunk_id.split("_")[1])
+                    assert abs(distance - float(np.sum((vectors[row] - query) ** 2))) < 1e-4
+            assert hits / (5 * len(queries)) >= 0.95
+
+            where = {"$and": [{"course_title": "Course 1"}, {"lesson_number": 2}]}
+            filtered = quantized.query([queries[0]], n_results=5, where=where)
+            assert len(filtered["ids"][0]) == 5
+            assert all(m["course_title"] == "Course 1" and m["lesson_number"] == 2 for m in filtered["metadatas"][0])
+            assert filtered["ids"] == exact.query([queries[0]], n_results=5, where=where)["ids"]
+
+
+class StaticCollection:
+    """返回固定数据的集合替身"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, include=None):
+        return self.data
+
+
+def test_recall_measured_once_per_generation():
+    vectors = clustered_vectors(500)
+    content = StaticCollection({
+        "ids": [f"chunk_{i}" for i in range(len(vectors))],
+        "documents": [f"Chunk {i}" for i in range(len(vectors))],
+        "metadatas": [{"course_title": "Course"} for _ in vectors],
+        "embeddings": vectors
+    })
+    catalog = StaticCollection({"ids": ["Course"], "documents": ["Course"], "metadatas": [{}], "embeddings": vectors[:1]})
+
+    measured = []
+    original = quantization.measure_recall
+
+    def counting_measure(*args, **kwargs):
+        measured.append(args[0].shape)
+        return original(*args, **kwargs)
+
+    index_snapshot.measure_recall = counting_measure
+    try:
+        with tempfile.TemporaryDirectory() as path:
+            publish_snapshot(path, {"course_catalog": catalog, "course_content": content}, {}, "v1",
+                             recall_collections=("course_content",))
+            info = index_snapshot.read_snapshot_info(path)
+    finally:
+        index_snapshot.measure_recall = original
+
+    # 每个量化模式只测量一次，且只针对内容集合
+    assert measured == [vectors.shape] * (len(quantization.QUANTIZATIONS) - 1)
+    assert list(info["quantization"]) == ["course_content"]
+    assert info["quantization"]["course_content"]["int8"]["recall"] >= 0.95
+    assert "float16" not in quantization.QUANTIZATIONS
+
+
+if __name__ == "__main__":
+    test_quantize_and_scan()
+    print("[PASS] 量化误差与分块扫描")
+    test_quantized_snapshot_search()
+    print("[PASS] 量化快照检索与召回率报告")
+    test_recall_measured_once_per_generation()
+    print("[PASS] 每个快照版本只测量一次召回率")
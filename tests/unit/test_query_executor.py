@@ -0,0 +1,115 @@
+"""
+查询执行器测试
+验证慢查询在线程池中执行时不会阻塞事件循环，以及并发查询的检索来源互不干扰
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from query_executor import QueryExecutor
+from search_tools import CourseSearchTool, ToolManager
+from vector_store import SearchResults
+
+
+def slow_query(delay: float) -> str:
+    """模拟阻塞的RAG查询"""
+    time.sleep(delay)
+    return "answer"
+
+
+def test_slow_queries_do_not_block_loop():
+    """慢查询执行期间事件循环仍能处理其他任务"""
+    executor = QueryExecutor(max_workers=4)
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        results = await asyncio.gather(
+            *(executor.run(slow_query, 0.2) for _ in range(4)),
+            heartbeat()
+        )
+        return results, ticks
+
+    start = time.perf_counter()
+    results, ticks = asyncio.run(scenario())
+    elapsed = time.perf_counter() - start
+
+    assert results[:4] == ["answer"] * 4
+    assert ticks == 10
+    # 4个查询并发执行，总耗时应接近单个查询耗时
+    assert elapsed < 0.6
+    executor.shutdown()
+
+
+def test_queue_depth_gauge():
+    """线程池满时排队深度应被正确记录"""
+    executor = QueryExecutor(max_workers=1)
+
+    async def scenario():
+        await asyncio.gather(*(executor.run(slow_query, 0.05) for _ in range(3)))
+
+    asyncio.run(scenario())
+    stats = executor.get_stats()
+
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["active"] == 0
+    assert stats["max_queue_depth"] >= 2
+    executor.shutdown()
+
+
+class FakeStore:
+    """按查询返回单条结果的模拟向量存储"""
+
+    def search(self, query, course_name=None, lesson_number=None, limit=None):
+        return SearchResults(documents=[query], metadata=[{"course_title": query, "lesson_number": None}], distances=[0.1])
+
+    def get_course_link(self, course_title):
+        return None
+
+    def get_lesson_link(self, course_title, lesson_number):
+        return None
+
+
+def test_sources_are_per_context_and_per_tool():
+    """来源按执行上下文和工具实例分别记录"""
+    first, second = CourseSearchTool(FakeStore()), CourseSearchTool(FakeStore())
+    manager = ToolManager()
+    manager.register_tool(first)
+
+    def run(query):
+        first.execute(query=query)
+        return manager.get_last_sources()
+
+    # 各自上下文中的检索只看到自己的来源
+    assert contextvars.copy_context().run(run, "alpha") == ["alpha"]
+    assert contextvars.copy_context().run(run, "beta") == ["beta"]
+    assert first.last_sources == [] and second.last_sources == []
+
+    first.execute(query="gamma")
+    assert first.last_sources == ["gamma"] and second.last_sources == []
+
+    async def scenario():
+        return await asyncio.gather(*(manager.run_with_sources(run, q) for q in ("one", "two", "three")))
+
+    # 线程池中执行的检索把来源带回调用方上下文，且并发查询互不干扰
+    assert asyncio.run(scenario()) == [["one"], ["two"], ["three"]]
+
+
+if __name__ == "__main__":
+    test_slow_queries_do_not_block_loop()
+    print("[PASS] 慢查询不阻塞事件循环")
+    test_queue_depth_gauge()
+    print("[PASS] 排队深度指标正确")
+    test_sources_are_per_context_and_per_tool()
+    print("[PASS] 检索来源按上下文隔离")
@@ -0,0 +1,90 @@
+"""
+语义答案缓存测试
+验证相似问题命中、数字不一致不命中、近似未命中计数、容量淘汰以及语料版本失效
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from answer_cache import SemanticAnswerCache, CachedAnswer
+
+# 模拟嵌入：每个问题对应一个固定向量，改写后的问题与原问题非常接近
+VECTORS = {
+    "What is MCP?": [1.0, 0.0, 0.0],
+    "what's MCP": [0.99, 0.05, 0.0],
+    "Explain MCP briefly": [0.9, 0.4, 0.0],
+    "How do I install Chroma?": [0.0, 1.0, 0.0],
+    "What does lesson 2 cover?": [0.0, 0.0, 1.0],
+    "What does lesson 3 cover?": [0.0, 0.01, 1.0],
+}
+
+
+def fake_embed(texts):
+    return np.array([VECTORS[text] for text in texts], dtype=np.float32)
+
+
+def make_entry(answer, corpus_version="v1"):
+    return CachedAnswer(answer=answer, sources=["MCP - Lesson 1"], sources_detail=[], corpus_version=corpus_version)
+
+
+def store(cache, query, answer, corpus_version="v1"):
+    cache.put(query, cache.embed_query(query), make_entry(answer, corpus_version))
+
+
+def lookup(cache, query, corpus_version="v1"):
+    return cache.lookup(query, cache.embed_query(query), corpus_version)
+
+
+def test_paraphrase_hits_and_near_miss():
+    """改写的问题命中缓存，相似度略低于阈值时计为近似未命中"""
+    cache = SemanticAnswerCache(fake_embed, max_entries=10, threshold=0.95, near_miss_margin=0.1)
+    store(cache, "What is MCP?", "MCP is a protocol")
+
+    hit = lookup(cache, "what's MCP")
+    assert hit is not None and hit.answer == "MCP is a protocol"
+
+    assert lookup(cache, "Explain MCP briefly") is None
+    assert lookup(cache, "How do I install Chroma?") is None
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["near_misses"] == 1
+    assert stats["misses"] == 1
+
+
+def test_numbers_must_match():
+    """向量接近但课程编号不同的问题不共享答案"""
+    cache = SemanticAnswerCache(fake_embed, max_entries=10, threshold=0.95)
+    store(cache, "What does lesson 2 cover?", "Lesson 2 answer")
+
+    assert lookup(cache, "What does lesson 3 cover?") is None
+    assert lookup(cache, "What does lesson 2 cover?").answer == "Lesson 2 answer"
+
+
+def test_eviction_and_corpus_version():
+    """超过容量时淘汰最久未使用的条目，语料版本变化后清空缓存"""
+    cache = SemanticAnswerCache(fake_embed, max_entries=2, threshold=0.95)
+    store(cache, "What is MCP?", "mcp")
+    store(cache, "How do I install Chroma?", "chroma")
+    assert lookup(cache, "What is MCP?") is not None
+
+    store(cache, "What does lesson 2 cover?", "lesson 2")
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    assert lookup(cache, "How do I install Chroma?") is None
+    assert lookup(cache, "What is MCP?") is not None
+
+    assert lookup(cache, "What is MCP?", corpus_version="v2") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+if __name__ == "__main__":
+    test_paraphrase_hits_and_near_miss()
+    print("[PASS] 改写问题命中与近似未命中计数")
+    test_numbers_must_match()
+    print("[PASS] 课程编号不同不命中")
+    test_eviction_and_corpus_version()
+    print("[PASS] 容量淘汰与语料版本失效")
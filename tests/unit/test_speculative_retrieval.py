@@ -0,0 +1,128 @@
+"""
+推测性检索测试
+验证模型的搜索参数与推测检索一致时复用结果，不一致时丢弃，
+以及推测检索线程全忙时跳过而不是排队
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from config import config
+from search_tools import ToolManager, CourseSearchTool
+from vector_store import SearchResults
+
+MCP_TITLE = "MCP: Build Rich-Context AI Apps with Anthropic"
+
+
+class FakeStore:
+    """模拟向量存储，记录搜索次数"""
+
+    def __init__(self):
+        self.searches = []
+
+    def search(self, query, course_name=None, lesson_number=None, limit=None):
+        self.searches.append((query, course_name, lesson_number))
+        time.sleep(0.05)
+        return SearchResults(
+            documents=[f"content for {query}"],
+            metadata=[{"course_title": MCP_TITLE, "lesson_number": lesson_number}],
+            distances=[0.1]
+        )
+
+    def get_existing_course_titles(self):
+        return [MCP_TITLE]
+
+    def get_course_link(self, course_title):
+        return "https://example.com/course"
+
+    def get_lesson_link(self, course_title, lesson_number):
+        return "https://example.com/lesson"
+
+
+def create_manager():
+    store = FakeStore()
+    manager = ToolManager()
+    manager.register_tool(CourseSearchTool(store))
+    return manager, store
+
+
+def test_matching_arguments_reuse_speculative_search():
+    """参数一致（归一化后）时复用推测检索结果"""
+    manager, store = create_manager()
+
+    session = manager.start_speculation("What does lesson 2 of MCP cover?")
+    session.execute_tool(
+        "search_course_content",
+        query="what does lesson 2 of mcp cover",
+        course_name="MCP",
+        lesson_number=2
+    )
+    session.finish()
+
+    stats = manager.get_speculation_stats()["search_course_content"]
+    assert len(store.searches) == 1
+    assert stats["hits"] == 1
+    assert manager.get_last_sources() == [f"{MCP_TITLE} - Lesson 2"]
+
+
+def test_different_arguments_discard_speculative_search():
+    """参数不一致时丢弃推测结果并执行模型请求的搜索"""
+    manager, store = create_manager()
+
+    session = manager.start_speculation("What is MCP?")
+    session.execute_tool("search_course_content", query="model context protocol")
+    session.finish()
+    time.sleep(0.1)
+
+    stats = manager.get_speculation_stats()["search_course_content"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 0
+    assert ("model context protocol", None, None) in store.searches
+
+
+def test_unused_speculation_is_counted():
+    """模型没有调用搜索工具时推测结果计为未使用"""
+    manager, _ = create_manager()
+
+    session = manager.start_speculation("What is MCP?")
+    session.finish()
+    time.sleep(0.1)
+
+    stats = manager.get_speculation_stats()["search_course_content"]
+    assert stats["unused"] == 1
+
+
+def test_busy_workers_skip_speculation():
+    """推测检索线程数由SPECULATIVE_WORKERS决定，全忙时不再启动新的推测检索"""
+    original_workers = config.SPECULATIVE_WORKERS
+    config.SPECULATIVE_WORKERS = 1
+    try:
+        manager, _ = create_manager()
+    finally:
+        config.SPECULATIVE_WORKERS = original_workers
+
+    first = manager.start_speculation("What is MCP?")
+    assert manager.start_speculation("What is RAG?") is None
+    first.finish()
+    time.sleep(0.1)
+
+    third = manager.start_speculation("What is RAG?")
+    assert third is not None
+    third.finish()
+    time.sleep(0.1)
+
+    stats = manager.get_speculation_stats()["search_course_content"]
+    assert stats["launched"] == 2 and stats["skipped"] == 1 and stats["unused"] == 2
+
+
+if __name__ == "__main__":
+    test_matching_arguments_reuse_speculative_search()
+    print("[PASS] 参数一致时复用推测检索")
+    test_different_arguments_discard_speculative_search()
+    print("[PASS] 参数不一致时丢弃推测检索")
+    test_unused_speculation_is_counted()
+    print("[PASS] 未使用的推测检索被记录")
+    test_busy_workers_skip_speculation()
+    print("[PASS] 线程全忙时跳过推测检索")
@@ -0,0 +1,196 @@
+"""
+流式响应测试
+验证<thinking>标签跨片段时被过滤、R1未加标签的思考内容在答案开始前被扣留，
+以及生成器、query_stream和SSE接口的事件顺序（token/sources/done/error）
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+import fake_embedding
+fake_embedding.install()
+import fake_llm
+
+from ai_generator import AIGenerator, _ThinkingStreamFilter
+from config import Config, config
+from models import Course, CourseChunk, Lesson
+from rag_system import RAGSystem
+
+TITLE = "MCP: Build Rich-Context AI Apps with Anthropic"
+ANSWER = "**MCP servers** expose tools and resources to clients over a standard protocol."
+# R1风格的输出：带标签的思考、未加标签的思考段落，然后才是答案
+R1_CHUNKS = [
+    "<thin", "king>plan the search</thi", "nking>Okay, the user is asking about MCP servers. Let me check",
+    " the search results.\n\nI need to", " summarize the lesson.\n\n**MCP servers** expose tools",
+    " and resources to clients over a", " standard protocol."
+]
+
+
+def create_system(temp_dir):
+    rag_config = Config()
+    rag_config.CHROMA_PATH = os.path.join(temp_dir, "chroma")
+    rag_config.EMBEDDING_STORE_PATH = ""
+    rag_config.PARSE_CACHE_PATH = ""
+    rag_config.LEXICAL_INDEX_PATH = ""
+    rag_config.INGEST_MANIFEST_PATH = ""
+    rag_config.SPECULATIVE_RETRIEVAL = False
+    return fill(RAGSystem(rag_config))
+
+
+def fill(rag):
+    rag.vector_store.add_course_metadata(Course(
+        title=TITLE, instructor="Teacher",
+        lessons=[Lesson(lesson_number=1, title="Servers", lesson_link="https://example.com/mcp/1")]
+    ))
+    rag.vector_store.add_course_content([
+        CourseChunk(content="MCP servers expose tools and resources to clients.",
+                    course_title=TITLE, lesson_number=1, chunk_index=0)
+    ])
+    return rag
+
+
+def test_thinking_tags_split_across_chunks():
+    thinking_filter = _ThinkingStreamFilter()
+    chunks = ["Hello <", "thin", "king>secret", " plan</thin", "king> world", " <thi"]
+    output = "".join(thinking_filter.feed(chunk) for chunk in chunks) + thinking_filter.flush()
+    assert output == "Hello  world <thi"
+
+    # 未闭合的思考内容在结束时丢弃
+    thinking_filter = _ThinkingStreamFilter()
+    assert thinking_filter.feed("Answer<thinking>never closed") == "Answer"
+    assert thinking_filter.flush() == ""
+
+
+def test_untagged_reasoning_is_held_back():
+    config.CLEAN_R1_THINKING = True
+    generator = AIGenerator()
+    events = list(generator._stream_answer(iter(R1_CHUNKS), clean=True))
+
+    tokens = [event["text"] for event in events if event["type"] == "token"]
+    assert [event["type"] for event in events][-1] == "done"
+    assert "".join(tokens) == ANSWER
+    assert events[-1]["answer"] == ANSWER
+    assert not any(word in token for token in tokens for word in ("plan the search", "Okay", "I need"))
+    # 找到答案开始后逐片段输出，而不是等到结束
+    assert len(tokens) > 1
+
+    # 无答案标记时，第一个被保留的完整段落即为答案开始
+    chunks = ["Hmm, let me look at", " lesson 1.\n\nMCP servers expose tools to clients", " through a standard protocol."]
+    events = list(generator._stream_answer(iter(chunks), clean=True))
+    assert "".join(e["text"] for e in events if e["type"] == "token") == events[-1]["answer"]
+    assert events[-1]["answer"].startswith("MCP servers")
+
+    # 直到结束都无法确定答案开始时，输出整体清理后的文本（过短时为原文）
+    events = list(generator._stream_answer(iter(["Okay.", " Maybe."]), clean=True))
+    assert [(e["type"], e.get("text")) for e in events[:-1]] == [("token", "Okay. Maybe.")]
+
+    # Claude的输出不做清理
+    events = list(generator._stream_answer(iter(["Okay, ", "sure."]), clean=False))
+    assert [e.get("text") for e in events if e["type"] == "token"] == ["Okay, ", "sure."]
+
+
+def test_generator_stream_events():
+    router = fake_llm.install(fake_llm.FakeRouter(R1_CHUNKS, tool_arguments={"query": "MCP servers"}))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+        events = list(rag.ai_generator.generate_response_stream(
+            "What do MCP servers do?",
+            tools=rag.tool_manager.get_tool_definitions(),
+            tool_manager=rag.tool_manager
+        ))
+        types = [event["type"] for event in events]
+        assert types[0] == "tool_result" and types[-1] == "done"
+        assert set(types[1:-1]) == {"token"}
+        assert [kind for kind, _ in router.calls] == ["tools", "stream"]
+        assert rag.tool_manager.get_last_sources() == [f"{TITLE} - Lesson 1"]
+
+        # 模型调用失败时以道歉文本结束，不抛出异常
+        fake_llm.install(fake_llm.FakeRouter([], fail=True))
+        events = list(rag.ai_generator.generate_response_stream(
+            "What do MCP servers do?",
+            tools=rag.tool_manager.get_tool_definitions(),
+            tool_manager=rag.tool_manager
+        ))
+        assert [event["type"] for event in events] == ["token", "done"]
+        assert "技术问题" in events[-1]["answer"]
+
+
+def test_query_stream_event_sequence():
+    fake_llm.install(fake_llm.FakeRouter(R1_CHUNKS, tool_arguments={"query": "MCP servers"}))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rag = create_system(temp_dir)
+        session_id = rag.session_manager.create_session()
+        events = list(rag.query_stream("What do MCP servers do?", session_id))
+
+        names = [name for name, _ in events]
+        assert names[0] == "sources" and names[-1] == "done"
+        assert set(names[1:-1]) == {"token"}
+        assert events[0][1]["sources"] == [f"{TITLE} - Lesson 1"]
+        assert events[0][1]["sources_detail"][0]["lesson_link"] == "https://example.com/mcp/1"
+        assert "".join(data["text"] for name, data in events if name == "token") == ANSWER
+        assert events[-1][1] == {"answer": ANSWER, "session_id": session_id}
+
+        # 缓存命中时按同样的顺序一次性返回
+        cached = list(rag.query_stream("What do MCP servers do?"))
+        assert [name for name, _ in cached] == ["sources", "token", "done"]
+        assert cached[1][1]["text"] == ANSWER
+
+
+def test_sse_endpoint():
+    from fastapi.testclient import TestClient
+
+    fake_llm.install(fake_llm.FakeRouter(R1_CHUNKS, tool_arguments={"query": "MCP servers"}))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config.CHROMA_PATH = os.path.join(temp_dir, "chroma")
+        for name in ("EMBEDDING_STORE_PATH", "PARSE_CACHE_PATH", "LEXICAL_INDEX_PATH", "INGEST_MANIFEST_PATH"):
+            setattr(config, name, "")
+        config.SPECULATIVE_RETRIEVAL = False
+
+        # app.py 按后端目录的相对路径挂载前端
+        cwd = os.getcwd()
+        os.chdir(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+        try:
+            import app
+        finally:
+            os.chdir(cwd)
+        fill(app.rag_system)
+        client = TestClient(app.app)
+
+        def read_events(response):
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = []
+            for block in response.text.strip().split("\n\n"):
+                name, data = block.split("\n")
+                events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+            return events
+
+        events = read_events(client.post("/api/query/stream", json={"query": "What do MCP servers do?"}))
+        names = [name for name, _ in events]
+        assert names[0] == "sources" and names[-1] == "done" and set(names[1:-1]) == {"token"}
+        assert events[-1][1]["answer"] == ANSWER and events[-1][1]["session_id"]
+
+        # 管线中途出错时以error事件结束
+        def failing_stream(query, session_id):
+            yield "sources", {"sources": [], "sources_detail": []}
+            raise RuntimeError("vector store unavailable")
+        app.rag_system.query_stream = failing_stream
+        events = read_events(client.post("/api/query/stream", json={"query": "anything"}))
+        assert events == [("sources", {"sources": [], "sources_detail": []}),
+                          ("error", {"detail": "vector store unavailable"})]
+
+
+if __name__ == "__main__":
+    test_thinking_tags_split_across_chunks()
+    print("[PASS] 跨片段的<thinking>标签被过滤")
+    test_untagged_reasoning_is_held_back()
+    print("[PASS] 未加标签的思考内容被扣留")
+    test_generator_stream_events()
+    print("[PASS] 生成器流式事件顺序")
+    test_query_stream_event_sequence()
+    print("[PASS] query_stream事件顺序")
+    test_sse_endpoint()
+    print("[PASS] SSE接口事件顺序")
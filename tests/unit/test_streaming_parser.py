@@ -0,0 +1,229 @@
+"""
+流式文档解析测试
+验证边读边解析逐课时产出的分块与整体读取解析的结果完全一致，
+并且两者都与原逐行解析实现的输出完全相同
+"""
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from document_processor import DocumentProcessor
+from models import Course, CourseChunk, Lesson
+
+DOCS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'docs')
+
+
+# 对比用的原始实现（整体读入后按行解析，课时完成时分块；分块本身由 test_chunk_text 对照）
+def reference_process_course_document(processor, file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    filename = os.path.basename(file_path)
+
+    lines = content.strip().split('\n')
+
+    course_title = filename
+    course_link = None
+    instructor_name = "Unknown"
+
+    if len(lines) >= 1 and lines[0].strip():
+        title_match = re.match(r'^Course Title:\s*(.+)$', lines[0].strip(), re.IGNORECASE)
+        if title_match:
+            course_title = title_match.group(1).strip()
+        else:
+            course_title = lines[0].strip()
+
+    for i in range(1, min(len(lines), 4)):
+        line = lines[i].strip()
+        if not line:
+            continue
+        link_match = re.match(r'^Course Link:\s*(.+)$', line, re.IGNORECASE)
+        if link_match:
+            course_link = link_match.group(1).strip()
+            continue
+        instructor_match = re.match(r'^Course Instructor:\s*(.+)$', line, re.IGNORECASE)
+        if instructor_match:
+            instructor_name = instructor_match.group(1).strip()
+            continue
+
+    course = Course(
+        title=course_title,
+        course_link=course_link,
+        instructor=instructor_name if instructor_name != "Unknown" else None
+    )
+
+    course_chunks = []
+    current_lesson = None
+    lesson_title = None
+    lesson_link = None
+    lesson_content = []
+    chunk_counter = 0
+
+    start_index = 3
+    if len(lines) > 3 and not lines[3].strip():
+        start_index = 4
+
+    i = start_index
+    while i < len(lines):
+        line = lines[i]
+        lesson_match = re.match(r'^Lesson\s+(\d+):\s*(.+)$', line.strip(), re.IGNORECASE)
+
+        if lesson_match:
+            if current_lesson is not None and lesson_content:
+                lesson_text = '\n'.join(lesson_content).strip()
+                if lesson_text:
+                    course.lessons.append(Lesson(lesson_number=current_lesson, title=lesson_title, lesson_link=lesson_link))
+                    for idx, chunk in enumerate(processor.chunk_text(lesson_text)):
+                        chunk_with_context = f"Lesson {current_lesson} content: {chunk}" if idx == 0 else chunk
+                        course_chunks.append(CourseChunk(
+                            content=chunk_with_context,
+                            course_title=course.title,
+                            lesson_number=current_lesson,
+                            chunk_index=chunk_counter
+                        ))
+                        chunk_counter += 1
+
+            current_lesson = int(lesson_match.group(1))
+            lesson_title = lesson_match.group(2).strip()
+            lesson_link = None
+
+            if i + 1 < len(lines):
+                next_line = lines[i + 1].strip()
+                link_match = re.match(r'^Lesson Link:\s*(.+)$', next_line, re.IGNORECASE)
+                if link_match:
+                    lesson_link = link_match.group(1).strip()
+                    i += 1
+
+            lesson_content = []
+        else:
+            lesson_content.append(line)
+
+        i += 1
+
+    if current_lesson is not None and lesson_content:
+        lesson_text = '\n'.join(lesson_content).strip()
+        if lesson_text:
+            course.lessons.append(Lesson(lesson_number=current_lesson, title=lesson_title, lesson_link=lesson_link))
+            for chunk in processor.chunk_text(lesson_text):
+                course_chunks.append(CourseChunk(
+                    content=f"Course {course_title} Lesson {current_lesson} content: {chunk}",
+                    course_title=course.title,
+                    lesson_number=current_lesson,
+                    chunk_index=chunk_counter
+                ))
+                chunk_counter += 1
+
+    if not course_chunks and len(lines) > 2:
+        remaining_content = '\n'.join(lines[start_index:]).strip()
+        if remaining_content:
+            for chunk in processor.chunk_text(remaining_content):
+                course_chunks.append(CourseChunk(content=chunk, course_title=course.title, chunk_index=chunk_counter))
+                chunk_counter += 1
+
+    return course, course_chunks
+
+
+EDGE_DOCUMENTS = [
+    "",
+    "\n\n   \n",
+    "Only a title",
+    "\n\n  Course Title: Leading Blank Lines\nCourse Link: https://example.com\nCourse Instructor: Unknown\n\nLesson 1: A\nText one.\n",
+    "Course Title: No Lessons\nCourse Link: https://example.com\nCourse Instructor: Ann\nBody text right after metadata. More body.\n",
+    "Course Title: Empty Lessons\n\n\n\nLesson 1: A\nLesson Link: https://l/1\nLesson 2: B\n\n\n",
+    "Course Title: Link Not After Header\nLink\nInstructor\n\nLesson 0: Intro\nSome text.\nLesson Link: https://late\nLesson 1: Next\nLesson Link: https://l/1\nMore text.",
+    "Course Title: CRLF\r\nCourse Link: https://c\r\nCourse Instructor: Bo\r\n\r\nLesson 1: A\r\nFirst lesson text.\r\nLesson 2: B\r\nSecond lesson text.\r\n",
+    # 缺少元数据行
+    "Course Title: No Link Or Instructor\n\nLesson 1: A\nText one.\nLesson 2: B\nText two.\n",
+    "Course Title: No Blank Line\nCourse Instructor: Cy\nLesson 1: A\nText one.\n",
+    "Lesson 1: Header Missing\nText one.\nLesson 2: B\nText two.\n",
+    "Course Title: Short\nCourse Link: https://c\n",
+    # 空课时夹在有内容的课时之间
+    "Course Title: Gaps\n\n\n\nLesson 1: A\nText one.\nLesson 2: Empty\n\n   \nLesson 3: C\nLesson Link: https://l/3\nText three.\n",
+    # 最后一个课时没有内容
+    "Course Title: Trailing\nCourse Link: https://c\nCourse Instructor: Di\n\nLesson 1: A\nText one. Second sentence.\nLesson 2: Last\nLesson Link: https://l/2\n",
+    "Course Title: Trailing Blank\n\n\n\nLesson 1: A\nText one.\nLesson 2: Last\n\n\n",
+]
+
+
+def write(folder, name, content):
+    path = os.path.join(folder, name)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    return path
+
+
+def assert_streaming_matches(processor, path):
+    with open(path, encoding="utf-8") as f:
+        expected_course, expected_chunks = processor.process_course_text(f.read(), path)
+
+    items = list(processor.iter_course_document(path))
+    assert items
+    assert all(course is items[0][0] for course, _ in items)
+    assert items[0][0] == expected_course
+    assert [chunk for _, chunks in items for chunk in chunks] == expected_chunks
+    return items
+
+
+def test_streaming_matches_whole_file_parsing():
+    processor = DocumentProcessor(200, 50)
+    for name in sorted(os.listdir(DOCS_PATH)):
+        items = assert_streaming_matches(processor, os.path.join(DOCS_PATH, name))
+        # 每完成一个有内容的课时产出一次
+        assert len(items) == len(items[0][0].lessons)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for index, content in enumerate(EDGE_DOCUMENTS):
+            assert_streaming_matches(processor, write(temp_dir, f"edge{index}.txt", content))
+
+
+def assert_matches_reference(processor, path):
+    expected_course, expected_chunks = reference_process_course_document(processor, path)
+    course, chunks = processor.process_course_document(path)
+    assert course == expected_course
+    assert list(chunks) == expected_chunks
+    streamed = [chunk for _, batch in processor.iter_course_document(path) for chunk in batch]
+    assert streamed == expected_chunks
+
+
+def test_parsing_matches_original_implementation():
+    for processor in (DocumentProcessor(800, 100), DocumentProcessor(200, 50)):
+        for name in sorted(os.listdir(DOCS_PATH)):
+            assert_matches_reference(processor, os.path.join(DOCS_PATH, name))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for index, content in enumerate(EDGE_DOCUMENTS):
+                assert_matches_reference(processor, write(temp_dir, f"edge{index}.txt", content))
+
+
+def test_lessons_are_yielded_before_file_is_read():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = write(temp_dir, "long.txt", "Course Title: Long\n\n\n\n" + "".join(
+            f"Lesson {n}: Part {n}\nText of part {n}.\n" for n in range(1000)
+        ))
+        items = DocumentProcessor(800, 100).iter_course_document(path)
+        course, chunks = next(items)
+        # 第一个课时产出时，后面的课时还未解析
+        assert [chunk.lesson_number for chunk in chunks] == [0]
+        assert len(course.lessons) == 1
+        items.close()
+
+
+def test_empty_document_uses_file_name():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = write(temp_dir, "empty.txt", "  \n")
+        course, chunks = DocumentProcessor(800, 100).process_course_document(path)
+        assert course.title == "empty.txt"
+        assert chunks == []
+
+
+if __name__ == "__main__":
+    test_streaming_matches_whole_file_parsing()
+    print("[PASS] 流式解析与整体解析一致")
+    test_parsing_matches_original_implementation()
+    print("[PASS] 解析结果与原实现一致")
+    test_lessons_are_yielded_before_file_is_read()
+    print("[PASS] 逐课时产出分块")
+    test_empty_document_uses_file_name()
+    print("[PASS] 空文档使用文件名作为标题")
@@ -0,0 +1,146 @@
+"""
+按词元分块测试
+验证词元计数的批量与缓存、按词元预算打包句子（含超长句切分与词元重叠），
+以及导入报告中的词元长度直方图和截断计数
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+from transformers import BertTokenizerFast
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+
+from document_processor import DocumentProcessor
+from ingestion import CourseIngestor
+from token_counter import TokenCounter, TokenReport
+
+WORDS = ["the", "model", "embeds", "each", "chunk", "course", "lesson", "vector", "search", "retrieval"]
+
+
+def make_counter(max_seq_length=256):
+    """用小词表构造离线 WordPiece 分词器"""
+    directory = tempfile.mkdtemp()
+    vocab_path = os.path.join(directory, "vocab.txt")
+    with open(vocab_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", ",", "##s"] + WORDS))
+    return TokenCounter(BertTokenizerFast(vocab_file=vocab_path), max_seq_length, "test-model")
+
+
+class CountingTokenizer:
+    """记录每次调用批量大小的分词器包装"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.batches = []
+
+    def num_special_tokens_to_add(self):
+        return self.tokenizer.num_special_tokens_to_add()
+
+    def __call__(self, texts, **kwargs):
+        self.batches.append(len(texts))
+        return self.tokenizer(texts, **kwargs)
+
+
+def sentence(words):
+    return " ".join(WORDS[i % len(WORDS)] for i in range(words)).capitalize() + "."
+
+
+def test_counts_are_batched_and_cached():
+    base = make_counter()
+    tokenizer = CountingTokenizer(base.tokenizer)
+    counter = TokenCounter(tokenizer, 256)
+
+    assert counter.special_tokens == 2
+    assert counter.count(["The model.", "Each chunks.", "The model."]) == [3, 4, 3]
+    assert tokenizer.batches == [2]  # 重复文本只分词一次
+    assert counter.count(["The model.", "Vector search."]) == [3, 3]
+    assert tokenizer.batches == [2, 1]
+    assert counter.get_stats()["hits"] == 2  # 批内重复 1 次 + 缓存命中 1 次
+    assert counter.sequence_lengths(["The model."]) == [5]
+
+
+def test_chunks_fit_token_budget():
+    counter = make_counter()
+    processor = DocumentProcessor(40, 10, counter)
+    sentences = [sentence(n) for n in [5, 12, 3, 30, 8, 70, 6, 2, 15]]
+    chunks = processor.chunk_text(" ".join(sentences))
+
+    counts = counter.count(chunks, cache=False)
+    assert all(count <= 40 for count in counts)
+    # 超长句（70 词）被切分，内容不丢失（重叠部分除外）
+    assert any("retrieval the" in chunk for chunk in chunks)
+    assert " ".join(sentences).split()[-1] == chunks[-1].split()[-1]
+    # 相邻分块按词元重叠：下一块以上一块结尾的句子开头
+    overlapping = [a for a, b in zip(chunks, chunks[1:]) if a.endswith(b.split(".")[0] + ".")]
+    assert overlapping
+
+    # 词元计数可加：分块的计数等于其中句子计数之和
+    pieces, lengths = processor._split_long_sentences(sentences)
+    assert sum(lengths) == sum(counter.count(pieces, cache=False))
+
+
+def test_character_chunking_is_unchanged_without_counter():
+    text = " ".join(sentence(n) for n in range(1, 40))
+    assert DocumentProcessor(100, 20).chunk_text(text) == DocumentProcessor(100, 20, None).chunk_text(text)
+
+
+class NullStore:
+    def __init__(self):
+        self.chunks = []
+
+    def embed_documents(self, documents):
+        return np.zeros((len(documents), 4), dtype=np.float32)
+
+    def add_course_metadata(self, course):
+        pass
+
+    def add_course_content(self, chunks, embeddings=None):
+        self.chunks.extend(chunks)
+
+
+def test_ingestion_reports_token_lengths():
+    counter = make_counter(max_seq_length=32)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "course.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Course Title: Tokens\n\n\n\nLesson 1: Short\n" + sentence(5) + "\n")
+            f.write("Lesson 2: Long\n" + " ".join(sentence(20) for _ in range(6)) + "\n")
+
+        store = NullStore()
+        ingestor = CourseIngestor(store, DocumentProcessor(800, 0), workers=1, token_counter=counter)
+        ingestor.ingest([path], skip_titles=set())
+
+        report = ingestor.get_last_stats()["tokens"]
+        lengths = counter.sequence_lengths([chunk.content for chunk in store.chunks])
+        assert report["chunks"] == len(store.chunks)
+        assert report["truncated_chunks"] == sum(1 for n in lengths if n > 32)
+        assert report["truncated_tokens"] == sum(n - 32 for n in lengths if n > 32)
+        assert sum(report["histogram"].values()) == report["chunks"]
+        assert report["truncated_chunks"] > 0
+
+
+def test_report_histogram_buckets():
+    report = TokenReport(256)
+    report.record([1, 32, 33, 256, 257, 600])
+    data = report.to_dict()
+    assert data["histogram"]["1-32"] == 2
+    assert data["histogram"]["33-64"] == 1
+    assert data["histogram"]["193-256"] == 1
+    assert data["histogram"]["257-384"] == 1
+    assert data["histogram"][">512"] == 1
+    assert data["truncated_chunks"] == 2 and data["truncated_tokens"] == 1 + 344
+
+
+if __name__ == "__main__":
+    test_counts_are_batched_and_cached()
+    print("[PASS] 词元计数批量处理并缓存")
+    test_chunks_fit_token_budget()
+    print("[PASS] 分块不超过词元预算")
+    test_character_chunking_is_unchanged_without_counter()
+    print("[PASS] 未启用词元计数时按字符分块不变")
+    test_ingestion_reports_token_lengths()
+    print("[PASS] 导入报告词元长度与截断数")
+    test_report_histogram_buckets()
+    print("[PASS] 直方图分桶")